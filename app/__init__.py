@@ -2,11 +2,12 @@ import os
 import sys
 from logging.config import dictConfig
 
+import click
 from flask import Flask, jsonify, redirect
 from flask.logging import default_handler
-from flask_swagger_ui import get_swaggerui_blueprint
 from sqlalchemy.exc import DBAPIError
 from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import import_string
 
 # add app to system path
@@ -15,11 +16,21 @@ sys.path.insert(
 )  # noqa
 
 # load dotenv in the base root
-from app.api_spec import spec
 from app.core.exceptions.app_exceptions import AppExceptionCase, app_exception_handler
-from app.core.extensions import cors, db, healthcheck, ma, migrate
+from app.core.extensions import (
+    admission_control,
+    compression,
+    cors,
+    db,
+    ma,
+    request_deadline,
+)
+from app.core.json_provider import OrjsonProvider
 from app.core.log import log_config
+from app.core.metrics import metrics
+from app.core.response_cache import PrecomputedResponse
 from app.health import HEALTH_CHECKS
+from config import Config
 
 APP_ROOT = os.path.join(os.path.dirname(__file__), "..")  # refers to application_top
 
@@ -30,10 +41,6 @@ dictConfig(log_config())
 SWAGGER_URL = "/api/v1/resource/docs"
 API_URL = "/static/swagger.json"
 
-SWAGGERUI_BLUEPRINT = get_swaggerui_blueprint(
-    SWAGGER_URL, API_URL, config={"app_name": "Flask Postgres Backend"}
-)
-
 
 def create_app(config="config.DevelopmentConfig"):
     """Construct the core application"""
@@ -41,6 +48,7 @@ def create_app(config="config.DevelopmentConfig"):
     basedir = os.path.abspath(os.path.dirname(__file__))
     path = os.path.join(basedir, "../instance")
     app = Flask(__name__, instance_relative_config=False, instance_path=path)
+    app.json = OrjsonProvider(app)
 
     app.logger.removeHandler(default_handler)
     with app.app_context():
@@ -49,23 +57,48 @@ def create_app(config="config.DevelopmentConfig"):
         if environment == "production":
             cfg = import_string("config.ProductionConfig")()
         app.config.from_object(cfg)
+        check_broker()
 
         # add extensions
         register_extensions(app)
         register_blueprints(app)
         register_swagger_definitions(app)
         register_health_check(app)
+        register_metrics(app)
+        register_commands(app)
         return app
 
 
+def check_broker():
+    """Events are only kept in memory without a broker, refused in production."""
+    from app.producer import broker_configured
+
+    if not broker_configured():
+        raise RuntimeError(
+            "KAFKA_BOOTSTRAP_SERVERS must be set in production, events cannot "
+            "be published"
+        )
+
+
 def register_extensions(flask_app):
     """Register Flask extensions."""
     from app.core.factory import factory
+    from app.core.repository import cache_invalidator
 
+    if flask_app.config["PROXY_FIX_X_FOR"]:
+        # remote_addr is the client the proxies forwarded the request for
+        flask_app.wsgi_app = ProxyFix(
+            flask_app.wsgi_app, x_for=flask_app.config["PROXY_FIX_X_FOR"]
+        )
     db.init_app(flask_app)
-    migrate.init_app(flask_app, db)
+    flask_app.cli.add_command(MigrateCommands(flask_app))
     ma.init_app(flask_app)
     factory.init_app(flask_app, db)
+    cache_invalidator.init_session(db.session)
+    compression.init_app(flask_app)
+    # the deadline starts before admission so time spent queueing counts
+    request_deadline.init_app(flask_app, db.session)
+    admission_control.init_app(flask_app)
     cors.init_app(flask_app, resources={r"/api/*": {"origins": "*"}}, allow_headers="*")
 
     @flask_app.errorhandler(HTTPException)
@@ -83,12 +116,47 @@ def register_extensions(flask_app):
     return None
 
 
+class MigrateCommands(click.Group):
+    """
+    The `flask db` commands of Flask-Migrate. Flask-Migrate and alembic are
+    only imported when one of them runs, so servers never load them
+    """
+
+    def __init__(self, app: Flask):
+        super().__init__("db", help="Perform database migrations.")
+        self.app = app
+
+    def list_commands(self, ctx):
+        return self._migrate_commands().list_commands(ctx)
+
+    def get_command(self, ctx, name):
+        return self._migrate_commands().get_command(ctx, name)
+
+    def _migrate_commands(self) -> click.Group:
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as migrate_commands
+
+        if "migrate" not in self.app.extensions:
+            Migrate(self.app, db)
+        return migrate_commands
+
+
 def register_blueprints(app):
     from .api.api_v1 import api
 
     """Register Flask blueprints."""
-    app.register_blueprint(SWAGGERUI_BLUEPRINT, url_prefix=SWAGGER_URL)
     api.init_app(app)
+    if not app.config["API_DOCS_ENABLED"]:
+        return None
+
+    from flask_swagger_ui import get_swaggerui_blueprint
+
+    app.register_blueprint(
+        get_swaggerui_blueprint(
+            SWAGGER_URL, API_URL, config={"app_name": "Flask Postgres Backend"}
+        ),
+        url_prefix=SWAGGER_URL,
+    )
 
     @app.route("/")
     def index():
@@ -98,27 +166,219 @@ def register_blueprints(app):
 
 
 def register_swagger_definitions(app):
-    with app.test_request_context():
-        for fn_name in app.view_functions:
-            if fn_name == "static":
-                continue
-            print(f"Loading swagger docs for function: {fn_name}")
-            view_fn = app.view_functions[fn_name]
-            spec.path(view=view_fn)
-
-    @app.route("/static/swagger.json")
-    def create_swagger_spec():
-        """
-        Swagger API definition.
-        """
-        return jsonify(spec.to_dict())
+    """
+    Build the OpenAPI document once, or load the one written at build time by
+    `flask openapi_spec`, and serve it from memory
+    """
+    if not app.config["API_DOCS_ENABLED"]:
+        return None
+
+    spec_file = app.config["API_SPEC_FILE"]
+    if spec_file and os.path.exists(spec_file):
+        with open(spec_file, "rb") as file:
+            body = file.read()
+    else:
+        from app.api_spec import generate_spec
+
+        body = app.json.dumps_bytes(generate_spec(app))
+    api_spec = PrecomputedResponse(body, max_age=app.config["API_SPEC_MAX_AGE"])
+    app.extensions["api_spec"] = api_spec
+    app.add_url_rule(API_URL, "create_swagger_spec", view_func=api_spec.response)
+    return None
 
 
 def register_health_check(app: Flask):
-    for check in HEALTH_CHECKS:
-        if callable(check):
-            healthcheck.add_check(check)
+    def run_health_check():
+        healthcheck = app.extensions.get("healthcheck")
+        if healthcheck is None:
+            # the healthcheck package is slow to import, load it on first use
+            from healthcheck import HealthCheck
+
+            healthcheck = HealthCheck()
+            for check in HEALTH_CHECKS:
+                if callable(check):
+                    healthcheck.add_check(check)
+            app.extensions["healthcheck"] = healthcheck
+        return healthcheck.run()
+
+    app.add_url_rule("/api/v1/healthcheck", "healthcheck", view_func=run_health_check)
+    return None
+
+
+def register_metrics(app: Flask):
     app.add_url_rule(
-        "/api/v1/healthcheck", "healthcheck", view_func=lambda: healthcheck.run()
+        "/api/v1/metrics", "metrics", view_func=lambda: jsonify(metrics.snapshot())
+    )
+    return None
+
+
+def register_commands(app: Flask):
+    @app.cli.command("cache_warm")
+    @click.option("--limit", "-l", "limit", type=int, default=Config.CACHE_WARM_LIMIT)
+    @click.option(
+        "--source",
+        "-s",
+        "source",
+        type=click.Choice(["recency", "access_log"]),
+        default=Config.CACHE_WARM_SOURCE,
+    )
+    @click.option(
+        "--batch-size",
+        "-b",
+        "batch_size",
+        type=int,
+        default=Config.CACHE_WARM_BATCH_SIZE,
+    )
+    @click.option(
+        "--rate-limit",
+        "-r",
+        "rate_limit",
+        type=float,
+        default=Config.CACHE_WARM_RATE_LIMIT,
+    )
+    def cache_warm(limit, source, batch_size, rate_limit):
+        from app.repositories import ResourceRepository
+        from app.schema import ResourceSchema
+        from app.services import get_cache_service
+
+        repository = ResourceRepository(
+            redis_service=get_cache_service(), resource_schema=ResourceSchema()
+        )
+        count = repository.warm_cache(
+            limit=limit, source=source, batch_size=batch_size, rate_limit=rate_limit
+        )
+        print(f"warmed cache with {count} resources")
+
+    @app.cli.command("outbox_relay")
+    @click.option(
+        "--batch-size",
+        "-b",
+        "batch_size",
+        type=int,
+        default=Config.OUTBOX_RELAY_BATCH_SIZE,
+    )
+    @click.option(
+        "--poll-interval",
+        "-p",
+        "poll_interval",
+        type=float,
+        default=Config.OUTBOX_RELAY_POLL_INTERVAL,
     )
+    def outbox_relay(batch_size, poll_interval):
+        """publish the events of the outbox until interrupted"""
+        from app.outbox import OutboxRelay
+        from app.producer import get_producer
+        from app.repositories import EventOutboxRepository
+
+        if not Config.KAFKA_BOOTSTRAP_SERVERS:
+            # the in-memory broker acknowledges every event, the relay would
+            # delete them without publishing them anywhere
+            raise click.ClickException(
+                "KAFKA_BOOTSTRAP_SERVERS must be set to relay the outbox"
+            )
+        relay = OutboxRelay(
+            EventOutboxRepository(),
+            get_producer(),
+            batch_size=batch_size,
+            poll_interval=poll_interval,
+        )
+        try:
+            relay.run()
+        except KeyboardInterrupt:
+            relay.stop()
+
+    @app.cli.command("consume")
+    @click.option(
+        "--workers", "-w", "workers", type=int, default=Config.CONSUMER_WORKERS
+    )
+    @click.option(
+        "--batch-size",
+        "-b",
+        "batch_size",
+        type=int,
+        default=Config.CONSUMER_BATCH_SIZE,
+    )
+    def consume(workers, batch_size):
+        """handle the events of the subscribed topics until interrupted"""
+        from app.consumer import (
+            ParallelConsumer,
+            build_event_handler,
+            build_source,
+            subscribed_topics,
+        )
+        from app.services import RedisService
+
+        if not Config.KAFKA_BOOTSTRAP_SERVERS:
+            # the in-memory broker of this process never receives an event
+            raise click.ClickException(
+                "KAFKA_BOOTSTRAP_SERVERS must be set to consume events"
+            )
+        consumer = ParallelConsumer(
+            app,
+            build_source(subscribed_topics()),
+            handler_factory=build_event_handler,
+            dedup_store=RedisService(),
+            workers=workers,
+            batch_size=batch_size,
+        )
+        try:
+            consumer.run()
+        except KeyboardInterrupt:
+            consumer.stop()
+
+    @app.cli.command("openapi_spec")
+    @click.option("--output", "-o", "output", type=click.Path(dir_okay=False))
+    def openapi_spec(output):
+        """write the OpenAPI document, to be loaded with API_SPEC_FILE"""
+        from config import ProductionConfig
+
+        api_spec = app.extensions.get("api_spec")
+        if api_spec is None:
+            raise click.ClickException("api docs are disabled")
+        output = output or app.config["API_SPEC_FILE"] or ProductionConfig.API_SPEC_FILE
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "wb") as file:
+            file.write(api_spec.body)
+        print(f"wrote OpenAPI document to {output}")
+
+    @app.cli.command("startup_profile")
+    @click.option("--limit", "-l", "limit", type=int, default=25)
+    @click.option(
+        "--sort",
+        "-s",
+        "sort",
+        type=click.Choice(["cumulative", "self"]),
+        default="cumulative",
+    )
+    @click.option("--config", "-c", "config", default="config.DevelopmentConfig")
+    @click.option("--output", "-o", "output", type=click.Path(dir_okay=False))
+    def startup_profile(limit, sort, config, output):
+        """report the import cost of each module when the app starts"""
+        from app.core.startup_profile import profile_startup
+
+        startup_seconds, timings = profile_startup(config)
+        import_us = sum(timing.self_us for timing in timings)
+        timings.sort(key=lambda timing: getattr(timing, f"{sort}_us"), reverse=True)
+        print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for timing in timings[:limit]:
+            print(
+                f"{timing.cumulative_us / 1000:>14.1f} "
+                f"{timing.self_us / 1000:>9.1f}  {timing.module}"
+            )
+        print(
+            f"{len(timings)} modules imported in {import_us / 1000:.1f} ms, "
+            f"app created in {startup_seconds * 1000:.1f} ms"
+        )
+        if output:
+            with open(output, "wb") as file:
+                file.write(
+                    app.json.dumps_bytes(
+                        {
+                            "startup_ms": startup_seconds * 1000,
+                            "import_ms": import_us / 1000,
+                            "modules": [timing._asdict() for timing in timings],
+                        }
+                    )
+                )
+
     return None
@@ -1,4 +1,4 @@
-from .endpoints import resource
+from .endpoints import batch, resource
 
 
 def init_app(app):
@@ -9,3 +9,4 @@ def init_app(app):
     :return:
     """
     app.register_blueprint(resource, url_prefix="/api/v1/resource")
+    app.register_blueprint(batch, url_prefix="/api/v1/batch")
@@ -1 +1,2 @@
+from .batch_view import batch
 from .resource_view import resource
@@ -0,0 +1,83 @@
+from flask import Blueprint
+
+from app.core import Result
+from app.core.batch import run_batch
+from app.core.idempotency import idempotent
+from app.core.service_result import handle_result
+from app.schema import BatchSchema
+from app.services import RedisService
+from app.utils import auth_required, validator
+
+batch = Blueprint("batch", __name__)
+
+
+@batch.route("/", methods=["POST"])
+@auth_required()
+@idempotent(cache_service=RedisService())
+@validator(schema=BatchSchema)
+def run_batch_operations(data: dict):
+    """
+    ---
+    post:
+      description: run several operations on the resource endpoints in one
+        request. The token of the batch authenticates every operation and,
+        when atomic is set, the operations run in a single transaction
+      security:
+        - bearerAuth: []
+      parameters:
+        - in: header
+          name: Idempotency-Key
+          required: false
+          schema:
+            type: string
+          description: repeats of the key get the response of the first
+            request without running it again
+      requestBody:
+        required: true
+        content:
+          application/json:
+            schema: BatchSchema
+      responses:
+        '200':
+          description: returns the status and body of each operation, in
+            order. Operations rolled back or not run by an atomic batch have
+            the status 424
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  results:
+                    type: array
+                    items: BatchResultSchema
+        '400':
+          description: invalid batch
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  app_exception:
+                    type: str
+                    example: ValidationException
+                  errorMessage:
+                    type: str
+                    example: "{'operations': ['Missing data for required field.']}"
+        '401':
+          description: Unauthorized
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  app_exception:
+                    type: str
+                    example: Unauthorized
+                  errorMessage:
+                    type: str
+                    example: missing authentication token
+      tags:
+          - Batch
+    """
+    results = run_batch(data["operations"], atomic_batch=data["atomic"])
+    return handle_result(Result({"results": results}, 200))
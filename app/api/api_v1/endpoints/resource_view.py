@@ -1,8 +1,15 @@
-import pinject
+import threading
+import uuid
+
 from flask import Blueprint, request
+from werkzeug.local import LocalProxy
 
 from app.controllers import ResourceController
-from app.core.service_result import handle_result
+from app.core.admission import bulkhead
+from app.core.idempotency import idempotent
+from app.core.response_cache import cached_response
+from app.core.service_result import handle_result, handle_stream
+from app.models import ResourceModel
 from app.repositories import ResourceRepository
 from app.schema import (
     CreateResourceSchema,
@@ -10,31 +17,101 @@ from app.schema import (
     ResourceSchema,
     UpdateResourceSchema,
 )
-from app.services import AuthService, RedisService
+from app.services import AuthService, RedisService, get_cache_service
 from app.utils import arg_validator, auth_required, validator
+from app.utils.auth import TOKEN_PAYLOAD
+from config import Config
 
 resource = Blueprint("resource", __name__)
 
-obj_graph = pinject.new_object_graph(
-    modules=None,
-    classes=[
-        ResourceController,
-        ResourceRepository,
-        ResourceSchema,
-        RedisService,
-        AuthService,
-    ],
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+_resource_controller = None
+_resource_controller_lock = threading.Lock()
+
+
+def get_resource_controller() -> ResourceController:
+    """
+    build the object graph on first use instead of at import, so commands and
+    workers that never serve a resource request do not pay for it. Concurrent
+    first requests wait for a single graph
+    """
+    global _resource_controller
+    if _resource_controller is None:
+        with _resource_controller_lock:
+            if _resource_controller is None:
+                _resource_controller = build_resource_controller()
+    return _resource_controller
+
+
+def build_resource_controller() -> ResourceController:
+    import pinject
+
+    class CacheBindingSpec(pinject.BindingSpec):
+        @pinject.provides(in_scope=pinject.SINGLETON)
+        def provide_redis_service(self):
+            return get_cache_service()
+
+    obj_graph = pinject.new_object_graph(
+        modules=None,
+        classes=[
+            ResourceController,
+            ResourceRepository,
+            ResourceSchema,
+            AuthService,
+        ],
+        binding_specs=[CacheBindingSpec()],
+    )
+    return obj_graph.provide(ResourceController)
+
+
+resource_controller: ResourceController = LocalProxy(get_resource_controller)
+resource_cache_service = LocalProxy(
+    lambda: get_resource_controller().resource_repository.cache_service
 )
-resource_controller: ResourceController = obj_graph.provide(ResourceController)
+
+
+def wants_ndjson():
+    return (
+        request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+        == NDJSON_MIMETYPE
+    )
+
+
+def wants_stream(per_page: int, **kwargs):
+    return wants_ndjson() or per_page >= Config.STREAM_MIN_PAGE_SIZE
+
+
+def wants_export():
+    # runs before the arguments are validated
+    per_page = request.args.get("per_page", default=0, type=int)
+    return wants_stream(per_page)
+
+
+response_cache = cached_response(
+    cache_service=resource_cache_service,
+    model=ResourceModel,
+)
+idempotent_write = idempotent(cache_service=RedisService())
 
 
 @resource.route("/", methods=["POST"])
+@idempotent_write
 @validator(schema=CreateResourceSchema)
-def create_resource():
+def create_resource(data: dict):
     """
     ---
     post:
       description: create a resource
+      parameters:
+        - in: header
+          name: Idempotency-Key
+          required: false
+          schema:
+            type: string
+          description: repeats of the key get the response of the first
+            request without running it again
       requestBody:
         required: true
         content:
@@ -68,18 +145,25 @@ def create_resource():
           - Resource
     """
 
-    data = request.json
     result = resource_controller.create_resource(data)
     return handle_result(result, schema=ResourceSchema)
 
 
 @resource.route("/", methods=["GET"])
+@bulkhead("export", when=wants_export)
 @arg_validator(schema=ResourceRequestArgumentSchema, param="page|per_page")
-def get_all_resources():
+@cached_response(
+    cache_service=resource_cache_service,
+    model=ResourceModel,
+    unless=wants_stream,
+)
+def get_all_resources(page: int, per_page: int):
     """
     ---
     get:
-      description: retrieve all resources
+      description: retrieve all resources. Pages of at least
+        STREAM_MIN_PAGE_SIZE resources, and requests accepting
+        application/x-ndjson, are streamed
       parameters:
         - in: query
           name: page
@@ -101,17 +185,29 @@ def get_all_resources():
               schema:
                 type: array
                 items: ResourceSchema
+            application/x-ndjson:
+              schema: ResourceSchema
       tags:
           - Resource
     """
-    query_param = request.args
-    result = resource_controller.get_all_resources(query_param)
+    if wants_stream(per_page):
+        result = resource_controller.stream_resources(
+            page, per_page, chunk_size=Config.STREAM_CHUNK_SIZE
+        )
+        return handle_stream(
+            result,
+            schema=ResourceSchema,
+            ndjson=wants_ndjson(),
+            chunk_size=Config.STREAM_CHUNK_SIZE,
+        )
+    result = resource_controller.get_all_resources(page, per_page)
     return handle_result(result, schema=ResourceSchema, many=True)
 
 
 @resource.route("/<string:resource_id>", methods=["GET"])
 @arg_validator(schema=ResourceRequestArgumentSchema, param="resource_id")
-def get_resource(resource_id):
+@response_cache
+def get_resource(resource_id: uuid.UUID):
     """
     ---
     get:
@@ -151,9 +247,10 @@ def get_resource(resource_id):
 
 @resource.route("/<string:resource_id>", methods=["PATCH"])
 @auth_required()
+@idempotent_write
 @arg_validator(schema=ResourceRequestArgumentSchema, param="resource_id")
 @validator(schema=UpdateResourceSchema)
-def update_resource(resource_id):
+def update_resource(resource_id: uuid.UUID, data: dict):
     """
     ---
     patch:
@@ -167,6 +264,13 @@ def update_resource(resource_id):
           schema:
             type: string
           description: id of resource
+        - in: header
+          name: Idempotency-Key
+          required: false
+          schema:
+            type: string
+          description: repeats of the key get the response of the first
+            request without running it again
       requestBody:
         required: true
         content:
@@ -221,7 +325,6 @@ def update_resource(resource_id):
           - Resource
     """
 
-    data = request.json
     result = resource_controller.update_resource(resource_id, data)
     return handle_result(result, schema=ResourceSchema)
 
@@ -229,7 +332,7 @@ def update_resource(resource_id):
 @resource.route("/<string:resource_id>", methods=["DELETE"])
 @auth_required()
 @arg_validator(schema=ResourceRequestArgumentSchema, param="resource_id")
-def delete_resource(resource_id):
+def delete_resource(resource_id: uuid.UUID):
     """
     ---
     delete:
@@ -309,7 +412,7 @@ def get_access_token():
 
 @resource.route("/refresh-token", methods=["GET"])
 @arg_validator(schema=ResourceRequestArgumentSchema, param="refresh_token")
-def get_refresh_token():
+def get_refresh_token(refresh_token: str):
     """
     ---
     get:
@@ -339,6 +442,37 @@ def get_refresh_token():
       tags:
           - Resource
     """
-    query_params = request.args
-    result = resource_controller.get_refresh_token(query_params)
+    result = resource_controller.get_refresh_token(refresh_token)
+    return handle_result(result)
+
+
+@resource.route("/revoke-token", methods=["POST"])
+@auth_required()
+def revoke_access_token():
+    """
+    ---
+    post:
+      description: revoke the access token of the request before it expires
+      security:
+        - bearerAuth: []
+      responses:
+        '204':
+          description: the token is revoked
+        '401':
+          description: Unauthorized
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  app_exception:
+                    type: str
+                    example: Unauthorized
+                  errorMessage:
+                    type: str
+                    example: token revoked
+      tags:
+          - Resource
+    """
+    result = resource_controller.revoke_token(request.environ[TOKEN_PAYLOAD])
     return handle_result(result)
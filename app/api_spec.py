@@ -8,7 +8,18 @@ from apispec.ext.marshmallow import MarshmallowPlugin
 from apispec_webframeworks.flask import FlaskPlugin
 from marshmallow_enum import EnumField
 
-# Create an APISpec
+# get swagger.json file path
+swagger_json_path = os.path.dirname(__file__) + "/static/swagger.json"
+
+# Security
+api_key_scheme = {"type": "apiKey", "in": "header", "name": "X-API-Key"}
+bearer_scheme = {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
+
+# add swagger tags that are used for endpoint annotation
+tags = [
+    {"name": "Resource", "description": "Api Endpoints To Operate on Resources"},
+    {"name": "Batch", "description": "Api Endpoint To Run Several Operations"},
+]
 
 
 def enum_to_properties(self, field, **kwargs):
@@ -20,40 +31,45 @@ def enum_to_properties(self, field, **kwargs):
     return {}
 
 
-marshmallow_plugin = MarshmallowPlugin()
-
-# get swagger.json file path
-swagger_json_path = os.path.dirname(__file__) + "/static/swagger.json"
-
-# load swagger.json file
-with open(swagger_json_path) as apispec_info:
-    spec_info = json.load(apispec_info).get("info")
+def create_spec() -> APISpec:
+    """
+    :return: {APISpec} a spec with the info, security schemes and tags of the api
+    """
+    with open(swagger_json_path) as apispec_info:
+        spec_info = json.load(apispec_info).get("info")
 
-spec = APISpec(
-    title=spec_info.get("title"),
-    version="1.0.0",
-    openapi_version="3.0.2",
-    plugins=[FlaskPlugin(), marshmallow_plugin],
-    info=spec_info,
-)
+    marshmallow_plugin = MarshmallowPlugin()
+    spec = APISpec(
+        title=spec_info.get("title"),
+        version="1.0.0",
+        openapi_version="3.0.2",
+        plugins=[FlaskPlugin(), marshmallow_plugin],
+        info=spec_info,
+    )
+    marshmallow_plugin.converter.add_attribute_function(enum_to_properties)
 
-marshmallow_plugin.converter.add_attribute_function(enum_to_properties)
+    spec.components.security_scheme("ApiKeyAuth", api_key_scheme)
+    spec.components.security_scheme("bearerAuth", bearer_scheme)
 
-# Security
-api_key_scheme = {"type": "apiKey", "in": "header", "name": "X-API-Key"}
-bearer_scheme = {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
-spec.components.security_scheme("ApiKeyAuth", api_key_scheme)
-spec.components.security_scheme("bearerAuth", bearer_scheme)
+    # register schemas with spec
+    # example
+    # spec.components.schema("", schema=)
 
-# register schemas with spec
-# example
-# spec.components.schema("", schema=)
+    for tag in tags:
+        spec.tag(tag)
+    return spec
 
-# add swagger tags that are used for endpoint annotation
-tags = [
-    {"name": "Resource", "description": "Api Endpoints To Operate on Resources"},
-]
 
-for tag in tags:
-    print(f"Adding tag: {tag['name']}")
-    spec.tag(tag)
+def generate_spec(app) -> dict:
+    """
+    document every view of the application
+    :param app: {Flask} the application with its blueprints registered
+    :return: {dict} the OpenAPI document
+    """
+    spec = create_spec()
+    with app.test_request_context():
+        for fn_name, view_fn in app.view_functions.items():
+            if fn_name == "static":
+                continue
+            spec.path(view=view_fn)
+    return spec.to_dict()
@@ -0,0 +1,67 @@
+"""
+ASGI entry point, served with gunicorn with GUNICORN_WORKER_CLASS=uvicorn,
+`uvicorn app.asgi:app` or `python -m app.asgi`.
+
+Flask runs behind the WSGI middleware of uvicorn (a2wsgi when installed), in a
+pool of ASGI_THREADS threads per process. The views are synchronous, so every
+request in flight still holds a thread; the ASGI servers only spare a thread
+to idle keep-alive connections and slow uploads.
+"""
+import asyncio
+import logging
+
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+from app import create_app
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+flask_app = create_app()
+app = WSGIMiddleware(flask_app, workers=Config.ASGI_THREADS)
+
+
+def serve(server: str = Config.ASGI_SERVER):
+    """
+    run the app with uvicorn or hypercorn. HTTP/2 is only offered by
+    hypercorn, negotiated with ALPN when ASGI_CERTFILE is set
+    :param server: {str} "uvicorn" or "hypercorn"
+    :return: {None}
+    """
+    if Config.WARMUP_ENABLED:
+        from app.core.warmup import warm_up
+
+        warm_up(flask_app)
+    if server == "uvicorn":
+        import uvicorn
+
+        if Config.ASGI_HTTP2:
+            logger.warning("uvicorn does not support HTTP/2, serving HTTP/1.1")
+        host, _, port = Config.ASGI_BIND.rpartition(":")
+        uvicorn.run(
+            app,
+            host=host,
+            port=int(port),
+            timeout_keep_alive=Config.ASGI_KEEPALIVE_TIMEOUT,
+            ssl_certfile=Config.ASGI_CERTFILE,
+            ssl_keyfile=Config.ASGI_KEYFILE,
+        )
+    elif server == "hypercorn":
+        from hypercorn.asyncio import serve as hypercorn_serve
+        from hypercorn.config import Config as HypercornConfig
+
+        config = HypercornConfig()
+        config.bind = [Config.ASGI_BIND]
+        config.keep_alive_timeout = Config.ASGI_KEEPALIVE_TIMEOUT
+        config.certfile = Config.ASGI_CERTFILE
+        config.keyfile = Config.ASGI_KEYFILE
+        config.alpn_protocols = (
+            ["h2", "http/1.1"] if Config.ASGI_HTTP2 else ["http/1.1"]
+        )
+        asyncio.run(hypercorn_serve(app, config))
+    else:
+        raise ValueError(f"unknown ASGI server {server}, expected uvicorn|hypercorn")
+
+
+if __name__ == "__main__":
+    serve()
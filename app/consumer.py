@@ -0,0 +1,374 @@
+import logging
+import threading
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import orjson
+
+from app.core.exceptions import HTTPException
+from app.core.metrics import metrics
+from app.events import ServiceEventSubscription, event_key
+from config import Config
+
+try:
+    import confluent_kafka
+except ImportError:  # pragma: no cover
+    confluent_kafka = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Message:
+    topic: str
+    partition: int
+    offset: int
+    key: str
+    value: dict
+
+    @property
+    def lane(self):
+        """
+        messages of one lane are handled in order: the key of the record, or
+        of the event for records published without one, else the partition
+        """
+        key = self.key if self.key is not None else event_key(self.value)
+        return key if key is not None else (self.topic, self.partition)
+
+    @property
+    def event_id(self) -> str:
+        """
+        id set by the producer, the same for every delivery of the event
+        """
+        meta = self.value.get("meta") or {}
+        return meta.get("event_id") or f"{self.topic}:{self.partition}:{self.offset}"
+
+
+class InMemorySource:
+    """
+    Consumes the topics of the in-memory broker of app.producer, for tests and
+    local development. Records are spread over `partitions` by key like Kafka
+    does, records without one in turn, and `rewind` redelivers every record
+    after the last commit, as a restarted consumer would.
+
+    :param broker: {InMemoryBroker} the broker the events were published to
+    :param topics: {list} topics to consume
+    :param partitions: {int} partitions of each topic
+    """
+
+    def __init__(self, broker, topics: list, partitions: int = 4):
+        self.broker = broker
+        self.topics = topics
+        self.partitions = partitions
+        self.committed = {}
+        self._read = {topic: 0 for topic in topics}
+        self._logs = defaultdict(list)
+        self._positions = defaultdict(int)
+
+    def poll_batch(self, max_records: int, timeout: float) -> list:
+        """
+        :param max_records: {int} messages returned at most
+        :param timeout: {float} seconds to wait when no message is available
+        :return: {list} messages in offset order within each partition
+        """
+        self._fetch()
+        batch = []
+        for (topic, partition), log in self._logs.items():
+            position = self._positions[(topic, partition)]
+            taken = log[position : position + max_records - len(batch)]
+            batch += [
+                Message(topic, partition, position + index, key, orjson.loads(value))
+                for index, (key, value) in enumerate(taken)
+            ]
+            self._positions[(topic, partition)] += len(taken)
+            if len(batch) >= max_records:
+                break
+        if not batch:
+            time.sleep(timeout)
+        return batch
+
+    def commit(self, offsets: dict):
+        """
+        :param offsets: {dict} next offset to read of each (topic, partition)
+        """
+        self.committed.update(offsets)
+
+    def seek(self, offsets: dict):
+        """
+        :param offsets: {dict} next offset to read of each (topic, partition)
+        """
+        self._positions.update(offsets)
+
+    def rewind(self):
+        self._positions = defaultdict(int, self.committed)
+
+    def close(self):
+        return None
+
+    def _fetch(self):
+        for topic in self.topics:
+            start = self._read[topic]
+            records = self.broker.records(topic, start)
+            self._read[topic] += len(records)
+            for index, (key, value) in enumerate(records, start):
+                if key is None:
+                    partition = index % self.partitions
+                else:
+                    partition = zlib.crc32(key) % self.partitions
+                self._logs[(topic, partition)].append(
+                    (key.decode() if key is not None else None, value)
+                )
+
+
+class KafkaSource:
+    """
+    Consumes Kafka through confluent_kafka, committing offsets only when asked
+    """
+
+    def __init__(self, bootstrap_servers: str, group_id: str, topics: list):
+        if confluent_kafka is None:
+            raise RuntimeError(
+                "KAFKA_BOOTSTRAP_SERVERS is set but confluent-kafka is not "
+                "installed, install the kafka extra"
+            )
+        self._consumer = confluent_kafka.Consumer(
+            {
+                "bootstrap.servers": bootstrap_servers,
+                "group.id": group_id,
+                "enable.auto.commit": False,
+                "auto.offset.reset": "earliest",
+            }
+        )
+        self._consumer.subscribe(topics)
+
+    def poll_batch(self, max_records: int, timeout: float) -> list:
+        batch = []
+        for record in self._consumer.consume(max_records, timeout):
+            if record.error():
+                logger.error(f"consumer error: {record.error()}")
+                continue
+            key = record.key()
+            batch.append(
+                Message(
+                    record.topic(),
+                    record.partition(),
+                    record.offset(),
+                    key.decode() if key is not None else None,
+                    orjson.loads(record.value()),
+                )
+            )
+        return batch
+
+    def commit(self, offsets: dict):
+        self._consumer.commit(
+            offsets=[
+                confluent_kafka.TopicPartition(topic, partition, offset)
+                for (topic, partition), offset in offsets.items()
+            ],
+            asynchronous=False,
+        )
+
+    def seek(self, offsets: dict):
+        for (topic, partition), offset in offsets.items():
+            self._consumer.seek(
+                confluent_kafka.TopicPartition(topic, partition, offset)
+            )
+
+    def close(self):
+        self._consumer.close()
+
+
+class ParallelConsumer:
+    """
+    Runs event handlers on a pool of threads. Each polled batch is split in
+    lanes by key, whatever the topic, see `Message.lane`; the messages of a
+    lane are handled in order by one thread while lanes run in parallel, so
+    events about one customer are never reordered. Offsets are committed once
+    per batch after every lane finished.
+
+    Delivery is at least once: a batch interrupted before its commit is
+    delivered again. The ids of handled events are kept in `dedup_store` for
+    `dedup_ttl` seconds, and redelivered events are skipped; they are read
+    and written once per batch. A lane stops at the first event its handler
+    fails on, which is logged and counted. Offsets are then committed only up
+    to the first event left of each partition, and the source is rewound to
+    them, so the event and those after it are delivered again after
+    `poll_timeout` seconds.
+
+    :param app: {Flask} application whose context the handlers run in
+    :param source: {InMemorySource|KafkaSource} where messages are polled from
+    :param handler_factory: {callable} returns the EventHandlerInterface
+    handling one event, handlers keep per-event state and are not shared
+    between threads
+    :param dedup_store: {RedisService} store of the ids of handled events,
+    None to handle redelivered events again
+    :param workers: {int} threads handling events
+    :param batch_size: {int} messages polled at once
+    :param poll_timeout: {float} seconds to wait for messages
+    :param dedup_ttl: {int} seconds the id of a handled event is kept
+    """
+
+    def __init__(
+        self,
+        app,
+        source,
+        handler_factory,
+        dedup_store=None,
+        workers: int = Config.CONSUMER_WORKERS,
+        batch_size: int = Config.CONSUMER_BATCH_SIZE,
+        poll_timeout: float = Config.CONSUMER_POLL_TIMEOUT,
+        dedup_ttl: int = Config.CONSUMER_DEDUP_TTL,
+    ):
+        self.app = app
+        self.source = source
+        self.handler_factory = handler_factory
+        self.dedup_store = dedup_store
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_timeout = poll_timeout
+        self.dedup_ttl = dedup_ttl
+        self._stopped = threading.Event()
+
+    def run(self, max_batches: int = None):
+        """
+        poll, handle and commit batches until `stop` is called
+        :param max_batches: {int} return after this many non empty batches
+        """
+        batches = 0
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="consumer"
+        ) as executor:
+            while not self._stopped.is_set():
+                batch = self.source.poll_batch(self.batch_size, self.poll_timeout)
+                if not batch:
+                    continue
+                if not self.process_batch(batch, executor):
+                    # wait before the failed events are delivered again
+                    self._stopped.wait(self.poll_timeout)
+                batches += 1
+                if max_batches is not None and batches >= max_batches:
+                    break
+        self.source.close()
+
+    def stop(self):
+        self._stopped.set()
+
+    def process_batch(self, batch: list, executor: ThreadPoolExecutor):
+        """
+        :param batch: {list} messages polled at once
+        :param executor: {ThreadPoolExecutor} pool the lanes run on
+        :return: {bool} False when an event failed and is delivered again
+        """
+        started = time.monotonic()
+        fresh = self._drop_handled(batch)
+        lanes = defaultdict(list)
+        for message in fresh:
+            lanes[message.lane].append(message)
+        handled = []
+        for lane_handled in executor.map(self._handle_lane, lanes.values()):
+            handled += lane_handled
+        self._mark_handled(handled)
+
+        offsets, retried = {}, {}
+        handled_ids = {id(message) for message in handled}
+        for message in fresh:
+            if id(message) not in handled_ids:
+                position = (message.topic, message.partition)
+                retried[position] = min(
+                    retried.get(position, message.offset), message.offset
+                )
+        for message in batch:
+            position = (message.topic, message.partition)
+            offsets[position] = max(offsets.get(position, 0), message.offset + 1)
+        offsets.update(retried)
+        self.source.commit(offsets)
+        if retried:
+            self.source.seek(retried)
+        metrics.increment("consumer_events", len(batch))
+        metrics.set_gauge("consumer_batch_seconds", time.monotonic() - started)
+        return not retried
+
+    def _handle_lane(self, messages: list) -> list:
+        handled = []
+        with self.app.app_context():
+            for message in messages:
+                try:
+                    self.handler_factory().event_handler(message.value)
+                except Exception:  # noqa
+                    metrics.increment("consumer_failed")
+                    logger.exception(
+                        f"event {message.event_id} from {message.topic} failed"
+                    )
+                    # the next events of the lane must not overtake it
+                    break
+                handled.append(message)
+        return handled
+
+    def _drop_handled(self, batch: list) -> list:
+        if self.dedup_store is None:
+            return batch
+        try:
+            seen = self.dedup_store.get_many(
+                [f"consumed:{message.event_id}" for message in batch]
+            )
+        except HTTPException:
+            # the store is unavailable, handle everything again
+            return batch
+        fresh, ids = [], set()
+        for message, mark in zip(batch, seen):
+            # the same event may also be delivered twice within a batch
+            if mark is None and message.event_id not in ids:
+                fresh.append(message)
+                ids.add(message.event_id)
+        metrics.increment("consumer_duplicates", len(batch) - len(fresh))
+        return fresh
+
+    def _mark_handled(self, messages: list):
+        if self.dedup_store is None or not messages:
+            return
+        try:
+            self.dedup_store.set_many(
+                {f"consumed:{message.event_id}": 1 for message in messages},
+                ex=self.dedup_ttl,
+            )
+        except HTTPException:
+            pass
+
+
+def subscribed_topics() -> list:
+    """
+    :return: {list} CONSUMER_TOPICS, or the topic of every event of
+    ServiceEventSubscription
+    """
+    return Config.CONSUMER_TOPICS or [
+        event.upper() for event in ServiceEventSubscription.__members__
+    ]
+
+
+def build_event_handler():
+    """
+    :return: {EventSubscriptionHandler} handler of a single event, wired with
+    the controller of the service
+    """
+    from app.api.api_v1.endpoints.resource_view import get_resource_controller
+    from app.events import EventSubscriptionHandler
+
+    return EventSubscriptionHandler(customer_controller=get_resource_controller())
+
+
+def build_source(topics: list):
+    """
+    :param topics: {list} topics to consume
+    :return: {InMemorySource|KafkaSource} source reading KAFKA_BOOTSTRAP_SERVERS,
+    or the in-memory broker of the producer when it is not set
+    """
+    if Config.KAFKA_BOOTSTRAP_SERVERS:
+        return KafkaSource(
+            Config.KAFKA_BOOTSTRAP_SERVERS, Config.CONSUMER_GROUP, topics
+        )
+    from app.producer import get_producer
+
+    return InMemorySource(get_producer().broker, topics)
@@ -26,10 +26,13 @@ class ResourceController(Notifier):
 
         return Result(result, 201)
 
-    def get_all_resources(self, query_param: dict):
-        result = self.resource_repository.paginate(
-            page=int(query_param.get("page", 1)),
-            per_page=int(query_param.get("per_page", 10)),
+    def get_all_resources(self, page: int, per_page: int):
+        result = self.resource_repository.paginate(page=page, per_page=per_page)
+        return Result(result, 200)
+
+    def stream_resources(self, page: int, per_page: int, chunk_size: int):
+        result = self.resource_repository.stream_paginate(
+            page=page, per_page=per_page, chunk_size=chunk_size
         )
         return Result(result, 200)
 
@@ -69,10 +72,16 @@ class ResourceController(Notifier):
 
         return Result(token, 200)
 
-    def get_refresh_token(self, query_params: dict):
-        assert query_params, ASSERT_OBJECT_IS_DICT
+    def get_refresh_token(self, refresh_token: str):
+        assert refresh_token, "missing refresh token"
 
-        refresh_token = query_params.get("refresh_token")
         token = self.auth_service.refresh_token(refresh_token=refresh_token)
 
         return Result(token, 200)
+
+    def revoke_token(self, payload: dict):
+        assert payload, "missing token payload"
+
+        self.auth_service.revoke_token(payload)
+
+        return Result(None, 204)
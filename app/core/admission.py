@@ -0,0 +1,222 @@
+import threading
+import time
+
+from flask import current_app, request
+
+from app.core.deadline import remaining
+from app.core.exceptions import AppException
+from app.core.exceptions.app_exceptions import AppExceptionCase
+from app.core.metrics import metrics
+
+DEFAULT_BULKHEAD = "default"
+# environ key holding the bulkhead the request was admitted to
+ADMITTED_BULKHEAD = "app.bulkhead"
+# blueprints served without admission control
+EXEMPT_BLUEPRINTS = frozenset(["swagger_ui"])
+
+
+class Bulkhead:
+    """
+    Bounds the requests of a group of views running at once in the process, so
+    a slow group cannot take every thread and database connection from the
+    others.
+
+    The slots are shared by the threads or greenlets of one process only. A
+    sync worker serves one request at a time, so its bulkheads never fill up
+    and only bound the requests of gthread, gevent and uvicorn workers.
+
+    :param name: {str} name of the group
+    :param limit: {int} requests of the group running at once
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout: float) -> bool:
+        """
+        :param timeout: {float} seconds to wait for a slot
+        :return: {bool} False when no slot was freed in time
+        """
+        if not self._semaphore.acquire(timeout=timeout):
+            return False
+        with self._lock:
+            self._in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._semaphore.release()
+
+
+def bulkhead(name: str, when=None):
+    """
+    A decorator running the requests of a view in the named bulkhead instead of
+    the default one
+    :param name: {str} a bulkhead of ADMISSION_BULKHEADS
+    :param when: {callable} called without arguments during the request, the
+    request runs in the default bulkhead when it returns False
+    """
+
+    def assign_bulkhead(func):
+        func.bulkhead = (name, when)
+        return func
+
+    return assign_bulkhead
+
+
+def queued_for(header: str) -> float:
+    """
+    :param header: {str} the X-Request-Start header set by the proxy when it
+    received the request, in seconds, milliseconds or microseconds since the
+    epoch, optionally prefixed with "t=" as nginx sends it
+    :return: {float} seconds the request waited before reaching the app, 0 when
+    the header cannot be read
+    """
+    try:
+        started = float(header.strip().removeprefix("t="))
+    except ValueError:
+        return 0.0
+    # scale milliseconds and microseconds down to seconds
+    while started > 1e11:
+        started /= 1000
+    return max(time.time() - started, 0.0)
+
+
+def rate_limit_client() -> str:
+    """
+    :return: {str} the client whose bucket a request takes a token from: the
+    user of its access token, or else its address, which is the address the
+    proxy forwarded when PROXY_FIX_X_FOR is set. Invalid tokens fall back to the
+    address and are rejected by the view
+    """
+    credentials = request.headers.get("Authorization", "").split()
+    if len(credentials) == 2:
+        from app.utils.auth import decode_token
+
+        try:
+            user_id = decode_token(token=credentials[1]).get("id")
+        except AppExceptionCase:
+            user_id = None
+        if user_id:
+            return f"user:{user_id}"
+    return f"addr:{request.remote_addr or 'unknown'}"
+
+
+def parse_bulkheads(value: str) -> dict:
+    """
+    :param value: {str} bulkhead limits such as "default=16|export=2"
+    :return: {dict} limit of each bulkhead
+    """
+    limits = {}
+    for item in filter(None, value.split("|")):
+        name, _, limit = item.partition("=")
+        limits[name.strip()] = int(limit)
+    return limits
+
+
+class AdmissionControl:
+    """
+    Admission control in front of the blueprints. A request is rejected with
+    429 when the token bucket of its client in redis is empty, then waits at
+    most ADMISSION_QUEUE_TIMEOUT seconds for a slot of its bulkhead and is
+    rejected with 503 when none frees up, instead of queueing until the
+    database pool times out. Both responses carry Retry-After.
+
+    Requests of sync workers mostly queue in the listen socket, before the app
+    sees them. The time since the proxy received a request, read from the
+    ADMISSION_REQUEST_START_HEADER header, counts against the same budget, so
+    requests that already waited too long are shed without being served.
+
+    Views outside blueprints, such as the health check and metrics, are always
+    admitted.
+    """
+
+    def init_app(self, app):
+        if not app.config.get("ADMISSION_ENABLED"):
+            return
+        bulkheads = {
+            name: Bulkhead(name, limit)
+            for name, limit in parse_bulkheads(
+                app.config["ADMISSION_BULKHEADS"]
+            ).items()
+        }
+        for name, bulkhead_ in bulkheads.items():
+            metrics.register_gauge(
+                f"bulkhead.{name}.in_flight",
+                lambda bulkhead_=bulkhead_: bulkhead_.in_flight,
+            )
+        rate_limiter = None
+        if app.config["ADMISSION_RATE_LIMIT"] > 0:
+            from app.services.rate_limit_service import RateLimitService
+
+            rate_limiter = RateLimitService(
+                rate=app.config["ADMISSION_RATE_LIMIT"],
+                burst=app.config["ADMISSION_RATE_BURST"],
+            )
+        app.extensions["admission_control"] = (bulkheads, rate_limiter)
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+
+    # noinspection PyMethodMayBeStatic
+    def _admit(self):
+        if request.blueprint is None or request.blueprint in EXEMPT_BLUEPRINTS:
+            return None
+        bulkheads, rate_limiter = current_app.extensions["admission_control"]
+
+        if rate_limiter is not None:
+            allowed, retry_after = rate_limiter.take(rate_limit_client())
+            if not allowed:
+                metrics.increment("admission_shed_rate_limited")
+                raise AppException.TooManyRequests(
+                    error_message="rate limit exceeded", retry_after=retry_after
+                )
+
+        timeout = current_app.config["ADMISSION_QUEUE_TIMEOUT"]
+        request_start = request.headers.get(
+            current_app.config["ADMISSION_REQUEST_START_HEADER"]
+        )
+        if request_start is not None:
+            timeout -= queued_for(request_start)
+            if timeout <= 0:
+                metrics.increment("admission_shed_queued")
+                raise AppException.ServiceUnavailable(
+                    error_message="request queued for too long",
+                    retry_after=current_app.config["ADMISSION_RETRY_AFTER"],
+                )
+
+        view = current_app.view_functions.get(request.endpoint)
+        name, when = getattr(view, "bulkhead", (DEFAULT_BULKHEAD, None))
+        if when is not None and not when():
+            name = DEFAULT_BULKHEAD
+        admitted = bulkheads.get(name) or bulkheads.get(DEFAULT_BULKHEAD)
+        if admitted is None:
+            return None
+        left = remaining()
+        if left is not None:
+            timeout = min(timeout, left)
+        if not admitted.acquire(timeout=timeout):
+            metrics.increment("admission_shed_over_capacity")
+            metrics.increment(f"admission_shed_over_capacity.{admitted.name}")
+            raise AppException.ServiceUnavailable(
+                error_message=f"{admitted.name} requests over capacity",
+                retry_after=current_app.config["ADMISSION_RETRY_AFTER"],
+            )
+        request.environ[ADMITTED_BULKHEAD] = admitted
+        return None
+
+    # noinspection PyMethodMayBeStatic
+    def _release(self, exc=None):
+        # streamed responses keep the request context, and the slot, until
+        # the last chunk is sent
+        admitted = request.environ.pop(ADMITTED_BULKHEAD, None)
+        if admitted is not None:
+            admitted.release()
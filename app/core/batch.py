@@ -0,0 +1,98 @@
+from urllib.parse import urlsplit
+
+from flask import current_app, request
+
+from app.core.deadline import DEADLINE
+from app.core.exceptions import AppException
+from app.core.extensions import db
+from app.core.metrics import metrics
+from app.core.repository import atomic
+from app.utils.auth import TOKEN_PAYLOAD
+
+# blueprints whose views may be called by the operations of a batch
+BATCH_BLUEPRINTS = frozenset(["resource"])
+ROLLED_BACK = {"status": 424, "body": {"errorMessage": "rolled back"}}
+NOT_RUN = {"status": 424, "body": {"errorMessage": "not run"}}
+
+
+class BatchAborted(Exception):
+    pass
+
+
+def run_batch(operations: list, atomic_batch: bool = False) -> list:
+    """
+    Run the operations of a batch in order by dispatching each one to its view
+    in the request of the batch, so they are validated and answered exactly as
+    separate requests would be. The token checked for the batch is reused by
+    every operation and the operations share the deadline of the batch.
+    Without atomic, the cache is invalidated as each operation commits, so
+    later operations read its writes; an atomic batch invalidates once it
+    commits and does not use the cache while it runs.
+
+    :param operations: {list} dicts with the method, path and body of each
+    operation, paths may carry a query string
+    :param atomic_batch: {bool} run every operation in one transaction, the
+    first failing operation rolls back the ones before it and the rest are not
+    run. Otherwise each operation commits on its own
+    :return: {list} the status and body of the response of each operation
+    """
+    environ = {
+        key: request.environ[key]
+        for key in (TOKEN_PAYLOAD, DEADLINE)
+        if key in request.environ
+    }
+
+    results = []
+    if not atomic_batch:
+        for operation in operations:
+            results.append(run_operation(operation, environ))
+            if results[-1]["status"] >= 400:
+                db.session.rollback()
+    else:
+        try:
+            with atomic(db.session):
+                for operation in operations:
+                    results.append(run_operation(operation, environ))
+                    if results[-1]["status"] >= 400:
+                        raise BatchAborted
+        except BatchAborted:
+            failed = results.pop()
+            results = [dict(ROLLED_BACK) for _ in results] + [failed]
+            results += [dict(NOT_RUN)] * (len(operations) - len(results))
+            metrics.increment("batch_rollbacks")
+    metrics.increment("batch_requests")
+    metrics.increment("batch_operations", len(operations))
+    return results
+
+
+def run_operation(operation: dict, environ: dict) -> dict:
+    """
+    :param operation: {dict} the method, path and body of the operation
+    :param environ: {dict} WSGI environ keys added to the request of the operation
+    :return: {dict} the status and JSON body of the response
+    """
+    app = current_app._get_current_object()
+    url = urlsplit(operation["path"])
+    with app.test_request_context(
+        url.path,
+        method=operation["method"],
+        query_string=url.query,
+        json=operation["body"],
+        environ_overrides=environ,
+    ):
+        try:
+            if request.routing_exception is not None:
+                raise request.routing_exception
+            if request.blueprint not in BATCH_BLUEPRINTS:
+                raise AppException.ValidationException(
+                    error_message=f"{operation['path']} cannot be batched"
+                )
+            response = app.make_response(
+                app.view_functions[request.endpoint](**request.view_args)
+            )
+        except Exception as e:  # noqa
+            response = app.make_response(app.handle_user_exception(e))
+        return {
+            "status": response.status_code,
+            "body": response.get_json(force=True, silent=True),
+        }
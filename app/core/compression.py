@@ -0,0 +1,95 @@
+import gzip
+
+from flask import current_app, request
+
+from app.core.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# preferred first, brotli is only offered when the package is installed
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+COMPRESSIBLE_MIMETYPES = frozenset(
+    [
+        "application/json",
+        "application/javascript",
+        "text/css",
+        "text/html",
+        "text/plain",
+    ]
+)
+
+
+def accepted_encoding():
+    """
+    :return: {str} the encoding preferred by the Accept-Encoding header of the
+    request, None when no supported encoding is accepted or compression is off
+    """
+    if not current_app.config.get("COMPRESSION_ENABLED"):
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    :param data: {bytes} the body to compress
+    :param encoding: {str} "br" or "gzip"
+    :return: {bytes} the compressed body
+    """
+    if encoding == "br":
+        return brotli.compress(
+            data, quality=current_app.config.get("COMPRESSION_BROTLI_QUALITY")
+        )
+    return gzip.compress(
+        data, compresslevel=current_app.config.get("COMPRESSION_GZIP_LEVEL")
+    )
+
+
+def no_compression(func):
+    """
+    A decorator excluding the responses of a view from compression
+    :param func: {function} the view
+    """
+    func.no_compression = True
+    return func
+
+
+class Compression:
+    """
+    Compress responses with the encoding negotiated through Accept-Encoding.
+    Responses smaller than COMPRESSION_MIN_SIZE, streamed responses, responses
+    that already have a Content-Encoding and views decorated with
+    `no_compression` are sent as they are.
+    """
+
+    def init_app(self, app):
+        app.after_request(self._compress_response)
+
+    # noinspection PyMethodMayBeStatic
+    def _compress_response(self, response):
+        view = current_app.view_functions.get(request.endpoint)
+        if (
+            getattr(view, "no_compression", False)
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = accepted_encoding()
+        if not encoding:
+            return response
+        data = response.get_data()
+        if len(data) < current_app.config.get("COMPRESSION_MIN_SIZE"):
+            return response
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        metrics.increment(f"compression_{encoding}_responses")
+        metrics.increment("compression_saved_bytes", len(data) - len(response.data))
+        return response
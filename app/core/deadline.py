@@ -0,0 +1,152 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.exceptions import AppException
+from app.core.metrics import metrics
+
+# environ key holding the time.monotonic() value the request must be done by
+DEADLINE = "app.deadline"
+# environ key set once the request committed a transaction
+COMMITTED = "app.deadline_committed"
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+# set while the request runs work that must complete once it was started
+_exempt = ContextVar("deadline_exempt", default=False)
+
+
+def deadline(seconds: float):
+    """
+    A decorator giving the requests of a view another budget than
+    REQUEST_DEADLINE
+    :param seconds: {float} seconds the view may run for, 0 for no deadline
+    """
+
+    def assign_deadline(func):
+        func.deadline = seconds
+        return func
+
+    return assign_deadline
+
+
+@contextmanager
+def exempt():
+    """
+    run the block without checking the deadline, for the work that follows a
+    commit, such as cache invalidation. Once a write is committed the request
+    must not be answered with a 504, or the client would retry it
+    """
+    token = _exempt.set(True)
+    try:
+        yield
+    finally:
+        _exempt.reset(token)
+
+
+def remaining():
+    """
+    :return: {float} seconds left before the deadline of the current request,
+    None outside requests, for requests without a deadline, in `exempt` and
+    once the request committed a transaction
+    :raises AppException.DeadlineExceeded: when no time is left
+    """
+    if not has_request_context() or _exempt.get():
+        return None
+    if request.environ.get(COMMITTED):
+        return None
+    ends_at = request.environ.get(DEADLINE)
+    if ends_at is None:
+        return None
+    left = ends_at - time.monotonic()
+    if left <= 0:
+        raise deadline_exceeded()
+    return left
+
+
+def deadline_exceeded():
+    metrics.increment("deadline_exceeded")
+    return AppException.DeadlineExceeded(error_message="request deadline exceeded")
+
+
+class RequestDeadline:
+    """
+    Gives every request to the blueprints a deadline: REQUEST_DEADLINE
+    seconds, the budget of its view set with `deadline`, or less when the
+    client sends a shorter one in the REQUEST_DEADLINE_HEADER header.
+
+    The time left is propagated to Postgres as the statement_timeout of each
+    transaction, so a slow query is cancelled by the server and its connection
+    returned to the pool, and it bounds the redis calls of RedisService.
+    Requests out of time are answered with a 504, unless they committed a
+    transaction: the client would retry a write that succeeded, so the rest of
+    the request, such as reading back the written rows, runs to completion.
+    """
+
+    def init_app(self, app, session):
+        if not app.config.get("REQUEST_DEADLINE_ENABLED"):
+            return
+        app.before_request(self._start)
+        if not event.contains(session, "after_begin", set_statement_timeout):
+            event.listen(session, "after_begin", set_statement_timeout)
+        if not event.contains(session, "after_commit", mark_committed):
+            event.listen(session, "after_commit", mark_committed)
+        if not event.contains(Engine, "handle_error", raise_deadline_exceeded):
+            event.listen(Engine, "handle_error", raise_deadline_exceeded)
+
+    # noinspection PyMethodMayBeStatic
+    def _start(self):
+        if request.blueprint is None:
+            return None
+        view = current_app.view_functions.get(request.endpoint)
+        seconds = getattr(view, "deadline", current_app.config["REQUEST_DEADLINE"])
+        header_name = current_app.config["REQUEST_DEADLINE_HEADER"]
+        header = request.headers.get(header_name)
+        if header is not None:
+            try:
+                requested = float(header)
+            except ValueError:
+                raise AppException.ValidationException(
+                    error_message=f"{header_name} must be a number of seconds"
+                )
+            if requested <= 0:
+                raise deadline_exceeded()
+            # clients may only shorten the budget of the view
+            seconds = min(seconds, requested) if seconds else requested
+        if seconds:
+            request.environ.setdefault(DEADLINE, time.monotonic() + seconds)
+        return None
+
+
+def set_statement_timeout(session, transaction, connection):
+    """
+    limit the statements of a transaction begun during a request to the time
+    the request has left. SET LOCAL ends with the transaction, so the pooled
+    connection is returned without a timeout
+    """
+    left = remaining()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    connection.exec_driver_sql(
+        f"SET LOCAL statement_timeout = {max(int(left * 1000), 1)}"
+    )
+
+
+def mark_committed(session):
+    if has_request_context() and DEADLINE in request.environ:
+        request.environ[COMMITTED] = True
+
+
+def raise_deadline_exceeded(context):
+    """
+    report statements cancelled by the statement_timeout of a request as a
+    missed deadline instead of a database error
+    """
+    pgcode = getattr(context.original_exception, "pgcode", None)
+    if pgcode != QUERY_CANCELED or not has_request_context():
+        return
+    if DEADLINE in request.environ:
+        raise deadline_exceeded() from context.original_exception
@@ -1,6 +1,6 @@
 from typing import Union
 
-from flask import Response, current_app, json
+from flask import Response, current_app
 from sqlalchemy.exc import DBAPIError
 from werkzeug.exceptions import HTTPException
 
@@ -32,25 +32,29 @@ class AppExceptionCase(Exception):
 def app_exception_handler(exc):
     if isinstance(exc, DBAPIError):
         return Response(
-            json.dumps(
+            current_app.json.dumps_bytes(
                 {"app_exception": "Database Error", "errorMessage": exc.orig.pgerror}
             ),
             status=400,
         )
     if isinstance(exc, HTTPException):
         return Response(
-            json.dumps(
+            current_app.json.dumps_bytes(
                 {"app_exception": "HTTP Error", "errorMessage": exc.description}
             ),
             status=exc.code,
         )
-    return Response(
-        json.dumps(
+    response = Response(
+        current_app.json.dumps_bytes(
             {"app_exception": exc.exception_case, "errorMessage": exc.error_message}
         ),
         status=exc.status_code,
         mimetype="application/json",
     )
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(retry_after)
+    return response
 
 
 class AppException:
@@ -126,3 +130,56 @@ class AppException:
 
             status_code = 400
             AppExceptionCase.__init__(self, status_code, error_message, context)
+
+    class TooManyRequests(AppExceptionCase):
+        def __init__(
+            self,
+            error_message: Union[any, None],
+            retry_after: int = None,
+            context: Union[any] = None,
+        ):
+            """
+            Rate Limit Exceeded
+            :param retry_after: seconds before the client may retry
+            """
+            status_code = 429
+            self.retry_after = retry_after
+            AppExceptionCase.__init__(self, status_code, error_message, context)
+
+    class ServiceUnavailable(AppExceptionCase):
+        def __init__(
+            self,
+            error_message: Union[any, None],
+            retry_after: int = None,
+            context: Union[any] = None,
+        ):
+            """
+            Server Over Capacity
+            :param retry_after: seconds before the client may retry
+            """
+            status_code = 503
+            self.retry_after = retry_after
+            AppExceptionCase.__init__(self, status_code, error_message, context)
+
+    class Conflict(AppExceptionCase):
+        def __init__(
+            self,
+            error_message: Union[any, None],
+            retry_after: int = None,
+            context: Union[any] = None,
+        ):
+            """
+            Conflicting Request In Progress
+            :param retry_after: seconds before the client may retry
+            """
+            status_code = 409
+            self.retry_after = retry_after
+            AppExceptionCase.__init__(self, status_code, error_message, context)
+
+    class DeadlineExceeded(AppExceptionCase):
+        def __init__(self, error_message: Union[any, None], context: Union[any] = None):
+            """
+            Request Deadline Exceeded
+            """
+            status_code = 504
+            AppExceptionCase.__init__(self, status_code, error_message, context)
@@ -1,14 +1,16 @@
 from flask_cors import CORS
 from flask_marshmallow import Marshmallow
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
-from healthcheck import HealthCheck
 
+from app.core.admission import AdmissionControl
+from app.core.compression import Compression
+from app.core.deadline import RequestDeadline
 from app.utils import GUID
 
 db = SQLAlchemy()
-migrate = Migrate()
 ma = Marshmallow()
 cors = CORS()
-healthcheck = HealthCheck()
+compression = Compression()
+admission_control = AdmissionControl()
+request_deadline = RequestDeadline()
 db.__setattr__("GUID", GUID)
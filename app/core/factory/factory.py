@@ -1,5 +1,4 @@
 import click
-from faker import Faker
 from flask import Flask
 
 from app import factory
@@ -35,6 +34,8 @@ def run_seeder(count, model, db):
 
 
 def migrate(factory_class, db):
+    from faker import Faker
+
     fake = Faker()
     factory_class.db = db
     factory_class.fake = fake
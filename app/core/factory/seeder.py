@@ -1,10 +1,14 @@
-from faker import Faker
+from typing import TYPE_CHECKING
+
 from flask_sqlalchemy import SQLAlchemy
 
+if TYPE_CHECKING:
+    from faker import Faker
+
 
 class Seeder:
     db: SQLAlchemy().Model
-    fake: Faker
+    fake: "Faker"
 
     @classmethod
     def run(cls):
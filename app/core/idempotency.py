@@ -0,0 +1,163 @@
+import hashlib
+import math
+import time
+import uuid
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from app.core import deadline
+from app.core.exceptions import AppException, HTTPException
+from app.core.metrics import metrics
+from app.utils.auth import TOKEN_PAYLOAD
+from config import Config
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# seconds between two reads of a duplicate waiting for the first request
+POLL_INTERVAL = 0.05
+
+
+def idempotent(
+    cache_service,
+    ttl: int = Config.IDEMPOTENCY_TTL,
+    lock_timeout: float = Config.IDEMPOTENCY_LOCK_TIMEOUT,
+):
+    """
+    Replay the response of a write for requests repeating its Idempotency-Key
+    header, so a client retrying after a timeout does not write twice. The
+    status and body of the first response are kept in redis for `ttl` seconds
+    and sent again without calling the view. A duplicate arriving while the
+    first request runs waits for its response behind a lock.
+
+    The lock holds a token of its owner and outlives the deadline of the
+    request, so it cannot expire while the first request still runs, and the
+    first request only releases its own lock.
+
+    Responses of failed requests, errors raised by the view and 5xx
+    responses, are not kept, so the client may retry them. Requests without
+    the header, and every request while redis is unavailable, run as usual.
+
+    :param cache_service: {RedisService} service holding responses and locks
+    :param ttl: {int} seconds a response is replayed for
+    :param lock_timeout: {float} seconds a duplicate waits for the first request
+    """
+
+    def idempotent_view(func):
+        @wraps(func)
+        def view_wrapper(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None or not current_app.config["IDEMPOTENCY_ENABLED"]:
+                return func(*args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                raise AppException.ValidationException(
+                    error_message=f"{IDEMPOTENCY_HEADER} must have 1 to "
+                    f"{MAX_KEY_LENGTH} characters"
+                )
+            cache_key = idempotency_cache_key(key)
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+            owner = uuid.uuid4().hex
+            try:
+                stored = wait_for_response(
+                    cache_service, cache_key, lock_timeout, owner=owner
+                )
+            except HTTPException:
+                return func(*args, **kwargs)
+            if stored is not None:
+                return replay(stored, fingerprint)
+
+            try:
+                response = make_response(func(*args, **kwargs))
+                if response.status_code < 500 and not response.is_streamed:
+                    store_response(cache_service, cache_key, response, fingerprint, ttl)
+            finally:
+                release_lock(cache_service, cache_key, owner)
+            return response
+
+        return view_wrapper
+
+    return idempotent_view
+
+
+def idempotency_cache_key(key: str) -> str:
+    """
+    :param key: {str} the Idempotency-Key header of the request
+    :return: {str} cache key of the response, scoped to the user of the token
+    checked for the request, or to the address of the client for requests
+    without a token, the method and the path
+    """
+    user_id = request.environ.get(TOKEN_PAYLOAD, {}).get("id")
+    client = f"user:{user_id}" if user_id else f"addr:{request.remote_addr}"
+    return f"idempotency:{client}:{request.method}:{request.path}:{key}"
+
+
+def lock_ttl(lock_timeout: float) -> int:
+    """
+    :return: {int} seconds the lock of a request is kept: longer than the
+    request may run, its deadline or else the worker timeout, so a slow first
+    request does not let a duplicate in. A lock left by a crashed worker
+    expires after it
+    """
+    left = deadline.remaining() or current_app.config["GUNICORN_TIMEOUT"]
+    return math.ceil(max(left, lock_timeout)) + 1
+
+
+def wait_for_response(cache_service, cache_key: str, lock_timeout: float, owner: str):
+    """
+    :param owner: {str} token stored in the lock, to release only this lock
+    :return: {bytes} the stored response of the key, None once the caller
+    holds the lock and must run the view
+    :raises AppException.Conflict: when the first request still runs after
+    `lock_timeout` seconds
+    """
+    give_up_at = time.monotonic() + lock_timeout
+    while True:
+        stored = cache_service.get_raw(cache_key)
+        if stored is not None:
+            return stored
+        if cache_service.add(f"{cache_key}:lock", owner, ex=lock_ttl(lock_timeout)):
+            return None
+        if time.monotonic() >= give_up_at:
+            metrics.increment("idempotency_conflicts")
+            raise AppException.Conflict(
+                error_message=f"a request with this {IDEMPOTENCY_HEADER} is "
+                f"in progress",
+                retry_after=max(int(lock_timeout), 1),
+            )
+        time.sleep(POLL_INTERVAL)
+
+
+def store_response(cache_service, cache_key, response, fingerprint, ttl):
+    # the view is done, its writes are committed whatever time is left
+    try:
+        with deadline.exempt():
+            cache_service.set(
+                cache_key,
+                f"{response.status_code} {fingerprint} {response.mimetype}\n".encode()
+                + response.get_data(),
+                ex=ttl,
+            )
+    except HTTPException:
+        pass
+
+
+def release_lock(cache_service, cache_key: str, owner: str):
+    try:
+        with deadline.exempt():
+            cache_service.delete_if_equal(f"{cache_key}:lock", owner.encode())
+    except HTTPException:
+        pass
+
+
+def replay(stored: bytes, fingerprint: str):
+    head, _, body = stored.partition(b"\n")
+    status, stored_fingerprint, mimetype = head.decode().split(" ")
+    if stored_fingerprint != fingerprint:
+        raise AppException.ValidationException(
+            error_message=f"{IDEMPOTENCY_HEADER} was used with another request body"
+        )
+    metrics.increment("idempotency_replays")
+    response = current_app.response_class(body, status=int(status), mimetype=mimetype)
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
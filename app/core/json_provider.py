@@ -0,0 +1,59 @@
+import dataclasses
+import decimal
+
+import orjson
+from flask.json.provider import JSONProvider
+
+
+def _default(obj):
+    if dataclasses.is_dataclass(obj):
+        # read through the attributes, model attributes expired by a commit
+        # are missing from __dict__ which orjson would read directly
+        return {
+            field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)
+        }
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider of the application backed by orjson. UUID, datetime and date
+    objects are encoded natively as ISO 8601 strings, the format the schemas
+    use, and dataclasses such as the models are encoded field by field.
+
+    Keys are not sorted and the output is compact. Keyword arguments meant for
+    the standard json module are ignored.
+    """
+
+    default = staticmethod(_default)
+    mimetype = "application/json"
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(self, obj, **kwargs) -> str:
+        """
+        :param obj: {Any} data to serialize
+        :return: {str} the JSON document
+        """
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj) -> bytes:
+        """
+        :param obj: {Any} data to serialize
+        :return: {bytes} the UTF-8 encoded JSON document
+        """
+        return orjson.dumps(obj, default=self.default, option=self.option)
+
+    def loads(self, s, **kwargs):
+        """
+        :param s: {str|bytes} JSON document to deserialize
+        :return: {Any}
+        """
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
@@ -7,6 +7,8 @@ from flask import has_request_context, request
 
 from config import Config
 
+MAIL_HANDLERS = ("critical_mail_handler",)
+
 
 def get_full_class_name(obj):
     module = obj.__class__.__module__
@@ -54,7 +56,13 @@ class RequestFormatter(logging.Formatter):
 
 
 def log_config():
-    return {
+    """
+    the mail handlers are only configured when MAIL_SERVER is set, otherwise
+    every error would start a thread trying to reach an smtp server. The
+    gunicorn.error and gunicorn.access loggers are left to gunicorn, which logs
+    them to stdout, see gunicorn.conf.py
+    """
+    config = {
         "version": 1,
         "disable_existing_loggers": False,
         "loggers": {
@@ -66,20 +74,6 @@ def log_config():
                     "critical_mail_handler",
                 ],
             },
-            "gunicorn.error": {
-                "handlers": [
-                    "console_handler",
-                    "error_file_handler",
-                    "error_mail_handler",
-                ],
-                "level": "ERROR",
-                "propagate": False,
-            },
-            "gunicorn.access": {
-                "handlers": ["access_file_handler"],
-                "level": "INFO",
-                "propagate": False,
-            },
         },
         "handlers": {
             "console_handler": {
@@ -88,20 +82,6 @@ def log_config():
                 "formatter": "error_formatter",
                 "stream": "ext://sys.stdout",
             },
-            "error_mail_handler": {
-                "()": "app.core.log.MailHandler",
-                "formatter": "error_formatter",
-                "level": "ERROR",
-                "mailhost": (Config.MAIL_SERVER, Config.MAIL_SERVER_PORT),
-                "fromaddr": Config.DEFAULT_MAIL_SENDER_ADDRESS,
-                "toaddrs": Config.ADMIN_MAIL_ADDRESSES,
-                "subject": f"{Config.LOG_HEADER} {datetime.utcnow().date()}",
-                "credentials": (
-                    Config.DEFAULT_MAIL_SENDER_ADDRESS,
-                    Config.DEFAULT_MAIL_SENDER_PASSWORD,
-                ),
-                "secure": (),
-            },
             "error_file_handler": {
                 "class": "logging.handlers.TimedRotatingFileHandler",
                 "formatter": "error_formatter",
@@ -111,14 +91,6 @@ def log_config():
                 "interval": 30,
                 "backupCount": 2,
             },
-            "access_file_handler": {
-                "class": "logging.handlers.TimedRotatingFileHandler",
-                "formatter": "access_formatter",
-                "filename": "gunicorn.access.log",
-                "when": "D",
-                "interval": 30,
-                "backupCount": 2,
-            },
             "critical_mail_handler": {
                 "()": "app.core.log.MailHandler",
                 "formatter": "error_formatter",
@@ -135,9 +107,6 @@ def log_config():
             },
         },
         "formatters": {
-            "access_formatter": {
-                "format": "%(message)s",
-            },
             "error_formatter": {
                 "()": "app.core.log.RequestFormatter",
                 "format": """
@@ -147,3 +116,13 @@ def log_config():
             },
         },
     }
+    if not Config.MAIL_SERVER:
+        for name in MAIL_HANDLERS:
+            del config["handlers"][name]
+        for logger in config["loggers"].values():
+            logger["handlers"] = [
+                handler
+                for handler in logger["handlers"]
+                if handler not in MAIL_HANDLERS
+            ]
+    return config
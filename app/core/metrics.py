@@ -0,0 +1,53 @@
+import threading
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters and gauges. Gauges are either set directly or
+    registered as callables that are evaluated when a snapshot is taken, which
+    keeps the hot path free of bookkeeping for values such as queue depths.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._gauge_callbacks = {}
+
+    def increment(self, name: str, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value):
+        self._gauges[name] = value
+
+    def register_gauge(self, name: str, callback):
+        """
+        :param name: {str} name of the gauge
+        :param callback: {callable} returns the current value of the gauge
+        """
+        self._gauge_callbacks[name] = callback
+
+    def counter(self, name: str):
+        return self._counters.get(name, 0)
+
+    def gauge(self, name: str):
+        if name in self._gauge_callbacks:
+            return self._gauge_callbacks[name]()
+        return self._gauges.get(name)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        gauges = dict(self._gauges)
+        for name, callback in list(self._gauge_callbacks.items()):
+            gauges[name] = callback()
+        return {"counters": counters, "gauges": gauges}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+        self._gauges.clear()
+
+
+metrics = MetricsRegistry()
@@ -1 +1,6 @@
 from .base import SQLBaseRepository
+from .cache_invalidation import CacheInvalidator, cache_invalidator
+from .cache_warmer import CacheWarmer
+from .cached import cache_version_key, cached
+from .unit_of_work import atomic, in_atomic
+from .write_behind import WriteBehindExecutor, cache_write_behind
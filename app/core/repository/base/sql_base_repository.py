@@ -1,23 +1,76 @@
+from marshmallow import Schema
 from sqlalchemy import asc, desc
 from sqlalchemy.exc import DBAPIError, IntegrityError
 
 from app import db
 from app.core.exceptions.app_exceptions import AppException
 from app.core.repository.base.crud_repository_interface import CRUDRepositoryInterface
+from app.core.repository.cache_invalidation import cache_invalidator
+from app.core.repository.unit_of_work import ATOMIC
+from app.core.service_interfaces import CacheServiceInterface
 
 
 class SQLBaseRepository(CRUDRepositoryInterface):
     model: db.Model
+    # cache key of a single object formatted with its id, e.g. "resource_{}"
+    cache_key: str = None
+    # cache keys holding collections of objects, invalidated on every write
+    cache_collection_keys: tuple = ()
+    # model events that invalidate the versioned results of @cached methods
+    cache_version_events: frozenset = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.cache_version_events = cls.cache_version_events.union(
+            *(
+                getattr(attribute, "cache_invalidate_on", ())
+                for attribute in vars(cls).values()
+            )
+        )
 
-    def __init__(self):
+    def __init__(
+        self, cache_service: CacheServiceInterface = None, cache_schema: Schema = None
+    ):
         """
         Base class to be inherited by all repositories. This class comes with
-        base crud functionalities attached
+        base crud functionalities attached. When a cache service is passed, the
+        cache keys of every object written through the session are invalidated
+        once the transaction commits
 
         :param model: base model of the class to be used for queries
+        :param cache_service: cache holding objects of the model
+        :param cache_schema: schema used by @cached methods to store objects
         """
 
         self.db = db
+        self.cache_service = cache_service
+        self.cache_schema = cache_schema
+        if cache_service is not None and (
+            self.cache_key or self.cache_collection_keys or self.cache_version_events
+        ):
+            cache_invalidator.register(
+                self.model, cache_service, self.cache_keys, self.cache_version_events
+            )
+
+    def cache_keys(self, obj_id) -> list:
+        """
+        :param obj_id: id of the object that was written
+        :return: {list} cache keys to invalidate when the object is written
+        """
+        keys = list(self.cache_collection_keys)
+        if self.cache_key:
+            keys.append(self.cache_key.format(obj_id))
+        return keys
+
+    def commit(self):
+        """
+        commit the session, or only flush it inside `atomic`, which commits the
+        transaction once every write of its block succeeded
+        """
+        if self.db.session.info.get(ATOMIC):
+            self.db.session.flush()
+        else:
+            self.db.session.commit()
 
     def index(self) -> [db.Model]:
         """
@@ -43,7 +96,7 @@ class SQLBaseRepository(CRUDRepositoryInterface):
             obj_data = dict(obj_in)
             db_obj = self.model(**obj_data)
             self.db.session.add(db_obj)
-            self.db.session.commit()
+            self.commit()
             return db_obj
         except IntegrityError as e:
             raise AppException.OperationError(error_message=e.orig.args[0])
@@ -68,7 +121,7 @@ class SQLBaseRepository(CRUDRepositoryInterface):
                 if hasattr(db_obj, field):
                     setattr(db_obj, field, obj_in[field])
             self.db.session.add(db_obj)
-            self.db.session.commit()
+            self.commit()
             return db_obj
         except DBAPIError as e:
             raise AppException.OperationError(error_message=e.orig.args[0])
@@ -91,7 +144,7 @@ class SQLBaseRepository(CRUDRepositoryInterface):
                 if hasattr(db_obj, field):
                     setattr(db_obj, field, obj_in[field])
             self.db.session.add(db_obj)
-            self.db.session.commit()
+            self.commit()
             return db_obj
         except DBAPIError as e:
             raise AppException.OperationError(error_message=e.orig.args[0])
@@ -155,7 +208,7 @@ class SQLBaseRepository(CRUDRepositoryInterface):
         db_obj = self.find_by_id(obj_id)
         try:
             db.session.delete(db_obj)
-            db.session.commit()
+            self.commit()
         except DBAPIError as e:
             raise AppException.OperationError(error_message=e.orig.args[0])
 
@@ -168,7 +221,7 @@ class SQLBaseRepository(CRUDRepositoryInterface):
         db_obj = self.find(filter_param)
         try:
             db.session.delete(db_obj)
-            db.session.commit()
+            self.commit()
         except DBAPIError as e:
             raise AppException.OperationError(error_message=e.orig.args[0])
 
@@ -188,6 +241,26 @@ class SQLBaseRepository(CRUDRepositoryInterface):
         except DBAPIError as e:
             raise AppException.OperationError(error_message=e.orig.args[0])
 
+    def stream_paginate(self, page: int, per_page: int, chunk_size: int = 100):
+        """
+
+        This method yields the objects of a page without loading the whole page,
+        rows are fetched from the database in chunks as the caller iterates
+        :param page: the page number
+        :param per_page: the number of items to return for each page
+        :param chunk_size: the number of rows fetched from the database at once
+        :return: {generator} yields objects of type model
+        """
+        query = (
+            self.model.query.limit(per_page)
+            .offset((page - 1) * per_page)
+            .yield_per(chunk_size)
+        )
+        try:
+            yield from query
+        except DBAPIError as e:
+            raise AppException.OperationError(error_message=e.orig.args[0])
+
     def filter_paginate(
         self, filter_param: dict, page: int, per_page: int
     ) -> [db.Model]:
@@ -0,0 +1,119 @@
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+
+from app.core import deadline
+from app.core.exceptions import HTTPException
+from app.core.metrics import metrics
+from app.core.repository.cached import cache_version_key
+from app.core.repository.write_behind import cache_write_behind
+
+TOUCHED_KEYS = "cache_invalidation_touched"
+
+CacheRegistration = namedtuple(
+    "CacheRegistration", ["cache_service", "cache_keys", "version_events"]
+)
+
+
+class CacheInvalidator:
+    """
+    Cache invalidation bound to the SQLAlchemy session lifecycle.
+
+    Primary keys of registered models that are inserted, updated or deleted are
+    collected in `after_flush`. When the transaction commits, the cache keys of
+    every touched object are deleted with one command per cache service and the
+    version tags of models written with one of their `version_events` are bumped;
+    when it rolls back they are discarded, so the cache is never invalidated for
+    writes that did not reach the database.
+    """
+
+    def __init__(self):
+        self._registry = {}
+
+    def register(self, model, cache_service, cache_keys, version_events=()):
+        """
+        :param model: {Model} model whose writes invalidate the cache
+        :param cache_service: {CacheServiceInterface} cache holding the keys
+        :param cache_keys: {callable} returns the cache keys of a primary key
+        :param version_events: {set} model events that bump the version tag
+        """
+        self._registry[model] = CacheRegistration(
+            cache_service, cache_keys, frozenset(version_events)
+        )
+
+    def init_session(self, session):
+        for event_name, listener in (
+            ("after_flush", self._after_flush),
+            ("after_commit", self._after_commit),
+            ("after_rollback", self._after_rollback),
+        ):
+            if not event.contains(session, event_name, listener):
+                event.listen(session, event_name, listener)
+
+    def _after_flush(self, session, flush_context):
+        touched = session.info.setdefault(TOUCHED_KEYS, set())
+        for model_event, objects in (
+            ("insert", session.new),
+            ("update", session.dirty),
+            ("delete", session.deleted),
+        ):
+            for obj in objects:
+                if type(obj) not in self._registry:
+                    continue
+                primary_key = inspect(obj).mapper.primary_key_from_instance(obj)
+                touched.add((type(obj), model_event, primary_key[0]))
+
+    def _after_commit(self, session):
+        self._invalidate(session.info.pop(TOUCHED_KEYS, None))
+
+    def _invalidate(self, touched):
+        if not touched:
+            return
+
+        invalidations = {}
+        for model, model_event, primary_key in touched:
+            registration = self._registry[model]
+            _, keys, versions = invalidations.setdefault(
+                id(registration.cache_service),
+                (registration.cache_service, set(), set()),
+            )
+            keys.update(registration.cache_keys(primary_key))
+            if model_event in registration.version_events:
+                versions.add(cache_version_key(model))
+
+        write_behind = has_app_context() and current_app.config.get(
+            "CACHE_WRITE_BEHIND"
+        )
+        for cache_service, keys, versions in invalidations.values():
+            task = self._invalidation_task(
+                cache_service, sorted(keys), sorted(versions)
+            )
+            if write_behind and cache_write_behind.submit(
+                " ".join(sorted(keys | versions)), task
+            ):
+                continue
+            task()
+
+    def _after_rollback(self, session):
+        session.info.pop(TOUCHED_KEYS, None)
+
+    # noinspection PyMethodMayBeStatic
+    def _invalidation_task(self, cache_service, keys, versions):
+        def invalidate():
+            try:
+                # runs after the commit, the write must not fail the request
+                with deadline.exempt():
+                    if keys:
+                        cache_service.delete(*keys)
+                    for version_key in versions:
+                        cache_service.increment(version_key)
+                metrics.increment("cache_invalidated_keys", len(keys))
+                metrics.increment("cache_version_bumps", len(versions))
+            except HTTPException:
+                metrics.increment("cache_invalidation_failed")
+
+        return invalidate
+
+
+cache_invalidator = CacheInvalidator()
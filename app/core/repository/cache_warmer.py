@@ -0,0 +1,55 @@
+import time
+
+from app.core.service_interfaces import CacheServiceInterface
+
+
+class CacheWarmer:
+    """
+    Stream rows into the cache in pipelined batches. Rows are pulled lazily from
+    the iterable, so passing a query built with `yield_per` keeps memory bounded
+    and the rate limit throttles the database as well as the cache.
+
+    :param cache_service: {CacheServiceInterface} cache supporting set_many
+    :param batch_size: {int} number of keys written per pipeline
+    :param rate_limit: {float} maximum rows per second, 0 disables throttling
+    """
+
+    def __init__(
+        self,
+        cache_service: CacheServiceInterface,
+        batch_size: int = 100,
+        rate_limit: float = 0,
+    ):
+        assert batch_size > 0, "batch size should be greater than zero"
+        self.cache_service = cache_service
+        self.batch_size = batch_size
+        self.rate_limit = rate_limit
+
+    def warm(self, rows, cache_key, serialize) -> int:
+        """
+        :param rows: {iterable} rows to cache
+        :param cache_key: {callable} returns the cache key of a row
+        :param serialize: {callable} returns the cached representation of a row
+        :return: {int} number of rows cached
+        """
+        started = time.monotonic()
+        count = 0
+        batch = {}
+        for row in rows:
+            batch[cache_key(row)] = serialize(row)
+            if len(batch) >= self.batch_size:
+                self.cache_service.set_many(batch)
+                count += len(batch)
+                batch = {}
+                self._throttle(count, started)
+        if batch:
+            self.cache_service.set_many(batch)
+            count += len(batch)
+        return count
+
+    def _throttle(self, count: int, started: float):
+        if not self.rate_limit:
+            return
+        delay = count / self.rate_limit - (time.monotonic() - started)
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,125 @@
+import hashlib
+import inspect
+import json
+from functools import wraps
+
+from app.core.exceptions import HTTPException
+from app.core.metrics import metrics
+from app.core.repository.unit_of_work import in_atomic
+from app.core.serializer import get_serializer
+
+MODEL_EVENTS = ("insert", "update", "delete")
+
+
+def cache_version_key(model) -> str:
+    """
+    :param model: {Model} the model whose version tag is returned
+    :return: {str} cache key of the version tag of the model
+    """
+    return f"cache_version:{model.__tablename__}"
+
+
+def cached(
+    key: str = None, ttl: int = None, invalidate_on=MODEL_EVENTS, versioned=True
+):
+    """
+    Cache-aside decorator for methods of SQLBaseRepository subclasses. The
+    repository must have been created with a cache service and a cache schema,
+    otherwise the method always runs against the database.
+
+    Results are cached with the repository schema and returned as model objects
+    that are not bound to the session, so do not cache methods whose results are
+    modified and written back. Inside `atomic` the cache is neither read nor
+    written: the transaction may see its own uncommitted writes, which must not
+    outlive a rollback, and cached results may predate them.
+
+    :param key: {str} key template formatted with the method arguments, e.g.
+    "resource_{obj_id}". A key is derived from the arguments when omitted
+    :param ttl: {int} seconds before the cached result expires
+    :param invalidate_on: {list} model events ("insert", "update", "delete") that
+    bump the version tag of the model, invalidating every versioned key at once
+    :param versioned: {bool} prefix the key with the model version tag. Disable
+    it for keys that are invalidated by id, such as the cache_key of the
+    repository
+    """
+    invalid_events = set(invalidate_on) - set(MODEL_EVENTS)
+    assert not invalid_events, f"unknown model events {invalid_events}"
+
+    def cache_method(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def method_wrapper(self, *args, **kwargs):
+            cache_service = getattr(self, "cache_service", None)
+            cache_schema = getattr(self, "cache_schema", None)
+            if cache_service is None or cache_schema is None:
+                return func(self, *args, **kwargs)
+            if in_atomic(self.db.session):
+                return func(self, *args, **kwargs)
+
+            metric = f"{self.model.__tablename__}.{func.__name__}"
+            try:
+                cache_key = build_key(self, cache_service, *args, **kwargs)
+                data = cache_service.get(cache_key)
+            except HTTPException:
+                return func(self, *args, **kwargs)
+
+            if data is not None:
+                metrics.increment(f"{metric}.cache_hits")
+                return load_cached_result(self, cache_schema, data)
+
+            metrics.increment(f"{metric}.cache_misses")
+            result = func(self, *args, **kwargs)
+            if result is not None:
+                try:
+                    cache_service.set(
+                        cache_key,
+                        get_serializer(cache_schema).dumps(
+                            result, many=isinstance(result, list)
+                        ),
+                        ex=ttl,
+                    )
+                except HTTPException:
+                    pass
+            return result
+
+        def build_key(repository, cache_service, *args, **kwargs):
+            bound_arguments = signature.bind(repository, *args, **kwargs)
+            bound_arguments.apply_defaults()
+            arguments = dict(bound_arguments.arguments)
+            arguments.pop(next(iter(signature.parameters)))
+            table = repository.model.__tablename__
+            if key:
+                cache_key = key.format(*arguments.values(), **arguments)
+            else:
+                digest = hashlib.sha1(
+                    json.dumps(arguments, sort_keys=True, default=str).encode()
+                ).hexdigest()
+                cache_key = f"{func.__name__}:{digest}"
+            if versioned:
+                version = cache_service.get(cache_version_key(repository.model)) or 0
+                return f"{table}:v{version}:{cache_key}"
+            return cache_key if key else f"{table}:{cache_key}"
+
+        method_wrapper.cache_invalidate_on = (
+            frozenset(invalidate_on) if versioned else frozenset()
+        )
+        return method_wrapper
+
+    return cache_method
+
+
+def load_cached_result(repository, cache_schema, data):
+    """
+    turn a cached result back into model objects
+    :param repository: {SQLBaseRepository} repository owning the cached method
+    :param cache_schema: {Schema} schema the result was cached with
+    :param data: {dict|list} the cached result
+    :return: {Model|list}
+    """
+    if isinstance(data, list):
+        return [
+            repository.model(**obj_data)
+            for obj_data in cache_schema.load(data, many=True)
+        ]
+    return repository.model(**cache_schema.load(data))
@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+
+ATOMIC = "unit_of_work_atomic"
+
+
+def in_atomic(session) -> bool:
+    """
+    :param session: {Session} the session the repositories write through
+    :return: {bool} True inside `atomic`, where reads may see writes that are
+    not committed yet and must not be cached
+    """
+    return bool(session.info.get(ATOMIC))
+
+
+@contextmanager
+def atomic(session):
+    """
+    run every repository write of the block in a single transaction.
+    Repositories flush instead of committing while the block runs; the
+    transaction is committed when the block exits and rolled back when it
+    raises. Blocks nested in another one join its transaction
+    :param session: {Session} the session the repositories write through
+    """
+    if session.info.get(ATOMIC):
+        yield session
+        return
+    session.info[ATOMIC] = True
+    try:
+        yield session
+        session.info.pop(ATOMIC, None)
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.info.pop(ATOMIC, None)
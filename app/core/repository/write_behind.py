@@ -0,0 +1,126 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.exceptions import HTTPException
+from app.core.metrics import metrics
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindExecutor:
+    """
+    Bounded background executor for cache work that can run after the database
+    commit. Tasks are keyed by the cache key they refresh: submitting a task for a
+    key that is still queued replaces the queued task, so a burst of writes to the
+    same key results in a single refresh. Tasks for one key never run
+    concurrently, so refreshes of a key are applied in the order they were queued.
+
+    Worker threads are started lazily and restarted after a fork, so the executor
+    can be created at import time in a preloaded gunicorn master.
+
+    :param max_workers: {int} number of background threads
+    :param max_queue_size: {int} number of distinct keys that may be queued
+    :param name: {str} prefix of the metrics exposed by this executor
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int, name: str):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self._condition = threading.Condition()
+        self._pending = OrderedDict()
+        self._running = set()
+        self._workers = []
+        self._pid = None
+        metrics.register_gauge(f"{name}_queue_depth", lambda: self.depth)
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def submit(self, key: str, task) -> bool:
+        """
+        queue a task for background execution
+        :param key: {str} the cache key refreshed by the task
+        :param task: {callable} the task to run
+        :return: {bool} False if the queue is full and the task was not queued
+        """
+        with self._condition:
+            self._ensure_workers()
+            if key in self._pending:
+                _, enqueued_at = self._pending[key]
+                self._pending[key] = (task, enqueued_at)
+                metrics.increment(f"{self.name}_coalesced")
+                return True
+            if len(self._pending) >= self.max_queue_size:
+                metrics.increment(f"{self.name}_rejected")
+                return False
+            self._pending[key] = (task, time.monotonic())
+            self._condition.notify()
+        return True
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        wait until every queued task has run
+        :param timeout: {float} maximum number of seconds to wait
+        :return: {bool} True if the queue was drained
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._pending and not self._running, timeout=timeout
+            )
+
+    def _ensure_workers(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._running = set()
+            self._workers = []
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._run,
+                name=f"{self.name}_{len(self._workers)}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _next_key(self):
+        for key in self._pending:
+            if key not in self._running:
+                return key
+        return None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._next_key() is not None)
+                key = self._next_key()
+                task, enqueued_at = self._pending.pop(key)
+                self._running.add(key)
+            metrics.set_gauge(
+                f"{self.name}_lag_seconds", time.monotonic() - enqueued_at
+            )
+            try:
+                task()
+                metrics.increment(f"{self.name}_completed")
+            except HTTPException:
+                # cache unavailable, the next read repopulates the key
+                metrics.increment(f"{self.name}_failed")
+            except Exception:  # noqa
+                metrics.increment(f"{self.name}_failed")
+                logger.exception(f"{self.name} task failed")
+            finally:
+                with self._condition:
+                    self._running.discard(key)
+                    self._condition.notify_all()
+
+
+cache_write_behind = WriteBehindExecutor(
+    max_workers=Config.CACHE_WRITE_BEHIND_WORKERS,
+    max_queue_size=Config.CACHE_WRITE_BEHIND_QUEUE_SIZE,
+    name="cache_write_behind",
+)
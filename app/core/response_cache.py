@@ -0,0 +1,160 @@
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from app.core.compression import ENCODINGS, accepted_encoding, compress
+from app.core.exceptions import HTTPException
+from app.core.extensions import db
+from app.core.metrics import metrics
+from app.core.repository import cache_version_key, in_atomic
+from config import Config
+
+IDENTITY = "identity"
+
+
+def cached_response(
+    cache_service, model, ttl: int = Config.CACHE_DEFAULT_TTL, unless=None
+):
+    """
+    Cache the JSON responses of a GET view together with their compressed
+    variants, so compression runs once per cache write instead of once per
+    read. Keys contain the version tag of the model, so any write to the model
+    invalidates every cached response.
+
+    :param cache_service: {CacheServiceInterface} cache holding the responses
+    :param model: {Model} model the responses are built from
+    :param ttl: {int} seconds before a cached response expires
+    :param unless: {callable} called with the arguments of the view, bypasses
+    the cache for the request when it returns True
+
+    Requests running inside `atomic`, such as the operations of an atomic
+    batch, bypass the cache as their response may hold uncommitted writes.
+
+    Only JSON bodies are cached, so every response varies on Accept as well
+    as Accept-Encoding: a proxy must not serve a cached JSON page to a client
+    asking for another representation, such as NDJSON, or the other way round.
+    """
+
+    def cache_view(func):
+        @wraps(func)
+        def view_wrapper(*args, **kwargs):
+            if (unless is not None and unless(*args, **kwargs)) or in_atomic(
+                db.session
+            ):
+                response = make_response(func(*args, **kwargs))
+                response.vary.add("Accept")
+                return response
+            encoding = accepted_encoding() or IDENTITY
+            try:
+                version = cache_service.get(cache_version_key(model)) or 0
+                cache_key = response_cache_key(model, version, request.full_path)
+                cached = cache_service.get_raw(f"{cache_key}:{encoding}")
+            except HTTPException:
+                return func(*args, **kwargs)
+
+            if cached is not None:
+                metrics.increment("response_cache_hits")
+                stored_encoding, _, body = cached.partition(b"\n")
+                return build_response(body, stored_encoding.decode(), vary_accept=True)
+
+            metrics.increment("response_cache_misses")
+            response = make_response(func(*args, **kwargs))
+            response.vary.add("Accept")
+            if (
+                response.status_code != 200
+                or response.mimetype != "application/json"
+                or response.is_streamed
+            ):
+                return response
+            variants = encode_variants(response.get_data())
+            try:
+                cache_service.set_many(
+                    {
+                        f"{cache_key}:{variant}": stored_encoding.encode()
+                        + b"\n"
+                        + body
+                        for variant, (stored_encoding, body) in variants.items()
+                    },
+                    ex=ttl,
+                )
+            except HTTPException:
+                pass
+            stored_encoding, body = variants.get(encoding, variants[IDENTITY])
+            return build_response(body, stored_encoding, vary_accept=True)
+
+        return view_wrapper
+
+    return cache_view
+
+
+def response_cache_key(model, version, full_path: str) -> str:
+    """
+    :param model: {Model} model the response is built from
+    :param version: {int} the version tag of the model
+    :param full_path: {str} path and query string of the request
+    :return: {str} cache key of the response, without the encoding suffix
+    """
+    return f"response:{model.__tablename__}:v{version}:{full_path}"
+
+
+def encode_variants(data: bytes) -> dict:
+    """
+    :param data: {bytes} the uncompressed body
+    :return: {dict} the encoding and body sent for each accepted encoding;
+    bodies under the minimum compression size are sent uncompressed
+    """
+    variants = {IDENTITY: (IDENTITY, data)}
+    if not current_app.config.get("COMPRESSION_ENABLED"):
+        return variants
+    compressible = len(data) >= current_app.config.get("COMPRESSION_MIN_SIZE")
+    for encoding in ENCODINGS:
+        variants[encoding] = (
+            (encoding, compress(data, encoding)) if compressible else (IDENTITY, data)
+        )
+    return variants
+
+
+def build_response(body: bytes, encoding: str, vary_accept: bool = False):
+    """
+    :param body: {bytes} the JSON body, compressed with `encoding`
+    :param encoding: {str} the content encoding of the body
+    :param vary_accept: {bool} the body depends on the Accept header too
+    """
+    response = current_app.response_class(body, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if vary_accept:
+        response.vary.add("Accept")
+    if encoding != IDENTITY:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+class PrecomputedResponse:
+    """
+    A JSON document computed once and served with an ETag and caching headers.
+    Each compressed variant is built the first time a client accepts it.
+
+    :param body: {bytes} the uncompressed document
+    :param max_age: {int} seconds clients and proxies may cache the document
+    """
+
+    def __init__(self, body: bytes, max_age: int):
+        self.body = body
+        self.max_age = max_age
+        self.etag = hashlib.sha256(body).hexdigest()
+        self._variants = {}
+
+    def response(self):
+        encoding = accepted_encoding() or IDENTITY
+        if encoding not in self._variants:
+            self._variants[encoding] = encode_variants(self.body).get(
+                encoding, (IDENTITY, self.body)
+            )
+        stored_encoding, body = self._variants[encoding]
+        response = build_response(body, stored_encoding)
+        # one ETag per representation, as a compressed body is another entity
+        response.set_etag(f"{self.etag}-{stored_encoding}")
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        return response.make_conditional(request)
@@ -9,6 +9,8 @@ class AuthServiceInterface(metaclass=abc.ABCMeta):
             and callable(subclass.get_token)
             and hasattr(subclass, "refresh_token")
             and callable(subclass.refresh_token)
+            and hasattr(subclass, "revoke_token")
+            and callable(subclass.revoke_token)
             and hasattr(subclass, "create_user")
             and callable(subclass.create_user)
             and hasattr(subclass, "update_user")
@@ -37,6 +39,15 @@ class AuthServiceInterface(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def revoke_token(self, payload):
+        """
+
+        :param payload: verified payload of the token to revoke before it expires
+        :return:
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def create_user(self, data):
         """
@@ -12,11 +12,12 @@ class CacheServiceInterface(metaclass=abc.ABCMeta):
         )
 
     @abc.abstractmethod
-    def set(self, name, data):
+    def set(self, name, data, ex=None):
         """
 
         :param name: key of redis object that should be saved
         :param data: the data of that should be saved
+        :param ex: seconds before the object expires
         :return:
         """
         raise NotImplementedError
@@ -31,10 +32,10 @@ class CacheServiceInterface(metaclass=abc.ABCMeta):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def delete(self, name):
+    def delete(self, *names):
         """
 
-        :param name: key of object that should be deleted
+        :param names: keys of objects that should be deleted
         :return:
         """
         raise NotImplementedError
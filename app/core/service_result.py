@@ -1,16 +1,55 @@
-from flask import Response, json
+import orjson
+from flask import Response, current_app, stream_with_context
+
+from app.core.serializer import get_serializer
 
 
 def handle_result(result, schema=None, many=False):
     if schema:
         return Response(
-            schema(many=many).dumps(result.value),
+            get_serializer(schema).dumps(result.value, many=many),
             status=result.status_code,
             mimetype="application/json",
         )
     else:
         return Response(
-            json.dumps(result.value),
+            current_app.json.dumps_bytes(result.value),
             status=result.status_code,
             mimetype="application/json",
         )
+
+
+def handle_stream(result, schema, ndjson=False, chunk_size=100):
+    """
+    stream the rows of result.value as they are serialized, so the response
+    body is never held in memory as a whole
+    :param result: {Result} result whose value is an iterable of objects
+    :param schema: {Schema} schema used to serialize each object
+    :param ndjson: {bool} send newline delimited JSON instead of a JSON array
+    :param chunk_size: {int} number of objects sent per chunk
+    """
+    return Response(
+        stream_with_context(
+            encode_stream(result.value, get_serializer(schema), ndjson, chunk_size)
+        ),
+        status=result.status_code,
+        mimetype="application/x-ndjson" if ndjson else "application/json",
+    )
+
+
+def encode_stream(rows, serializer, ndjson, chunk_size):
+    if not ndjson:
+        yield b"["
+    separator = b"" if ndjson else b","
+    chunk = []
+    started = False
+    for row in rows:
+        chunk.append(orjson.dumps(serializer.dump(row)) + (b"\n" if ndjson else b""))
+        if len(chunk) >= chunk_size:
+            yield (separator if started else b"") + separator.join(chunk)
+            started = True
+            chunk = []
+    if chunk:
+        yield (separator if started else b"") + separator.join(chunk)
+    if not ndjson:
+        yield b"]"
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+ImportTiming = namedtuple("ImportTiming", ["module", "self_us", "cumulative_us"])
+
+STARTUP_SCRIPT = """
+import time
+started = time.perf_counter()
+from app import create_app
+create_app({config!r})
+print(time.perf_counter() - started)
+"""
+
+
+def profile_startup(config: str) -> tuple:
+    """
+    import and create the application in a fresh interpreter started with
+    `-X importtime`, so modules already imported by the caller are measured too
+    :param config: {str} import path of the config class of the application
+    :return: {tuple} seconds spent creating the application and the list of
+    ImportTiming of every module imported
+    """
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            STARTUP_SCRIPT.format(config=config),
+        ],
+        capture_output=True,
+        text=True,
+        cwd=os.path.join(os.path.dirname(__file__), "..", ".."),
+        check=True,
+    )
+    startup_seconds = float(completed.stdout.strip().splitlines()[-1])
+    return startup_seconds, parse_importtime(completed.stderr)
+
+
+def parse_importtime(output: str) -> list:
+    """
+    :param output: {str} stderr of an interpreter run with `-X importtime`
+    :return: {list} ImportTiming of every module in the output
+    """
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        timings.append(ImportTiming(module.strip(), int(self_us), int(cumulative_us)))
+    return timings
@@ -0,0 +1,129 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import configure_mappers
+
+from app.core.extensions import db
+from app.core.metrics import metrics
+from app.enums import TokenTypeEnum
+
+logger = logging.getLogger(__name__)
+
+
+def reset_connections(app):
+    """
+    drop the database and redis connections a forked worker inherited from the
+    master, which happens when the app is preloaded. The connections are not
+    closed because the master and the other workers share their sockets
+    :param app: {Flask} the application loaded before the fork
+    :return: {None}
+    """
+    from app.services import redis_service
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+    redis_service.redis_conn.connection_pool.reset()
+
+
+def warm_up(app) -> float:
+    """
+    do the work of the first request before the worker accepts connections:
+    configure the mappers, open pooled database and redis connections, load
+    the filter of the revoked tokens, build the object graph, schemas and
+    serializers of the views and send the synthetic requests of
+    WARMUP_REQUESTS through the test client. A failing
+    step is logged and skipped, the worker starts cold rather than not at all
+    :param app: {Flask} the application served by the worker
+    :return: {float} seconds spent warming up
+    """
+    started = time.perf_counter()
+    with app.app_context():
+        configure_mappers()
+        _open_database_connections(app.config["WARMUP_DB_CONNECTIONS"])
+        if app.config["CACHE_BACKEND"] != "shared_memory":
+            _open_redis_connections(app.config["WARMUP_REDIS_CONNECTIONS"])
+        if app.config["REVOCATION_ENABLED"]:
+            _load_revocations()
+        _prime_views()
+    _send_requests(app, app.config["WARMUP_REQUESTS"])
+    elapsed = time.perf_counter() - started
+    metrics.set_gauge("warmup_seconds", round(elapsed, 6))
+    return elapsed
+
+
+def _open_database_connections(count: int):
+    # hold every connection at once, otherwise the pool hands back the same one
+    connections = []
+    try:
+        for _ in range(count):
+            connection = db.engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        logger.warning(f"warm up could not open database connections: {e}")
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def _open_redis_connections(count: int):
+    from app.services import redis_service
+
+    pool = redis_service.redis_conn.connection_pool
+    connections = []
+    try:
+        for _ in range(count):
+            connection = pool.get_connection("PING")
+            connections.append(connection)
+            connection.send_command("PING")
+            connection.read_response()
+    except (RedisError, OSError) as e:
+        logger.warning(f"warm up could not open redis connections: {e}")
+    finally:
+        for connection in connections:
+            pool.release(connection)
+
+
+def _load_revocations():
+    from app.services.revocation_service import revocation_service
+
+    # redis failures are retried by the refresh thread the call starts
+    revocation_service.start()
+
+
+def _prime_views():
+    from app.api.api_v1.endpoints.resource_view import get_resource_controller
+    from app.core.serializer import get_serializer
+    from app.schema import ResourceSchema
+
+    get_resource_controller()
+    get_serializer(ResourceSchema)
+
+
+def _send_requests(app, paths: list):
+    if not paths:
+        return
+    from app.services import AuthService
+
+    # a short-lived token so the requests go through the authenticated views
+    token = AuthService().generate_token(
+        user_id=str(uuid.uuid4()),
+        token_type=TokenTypeEnum.access_token.value,
+        expiration=datetime.utcnow() + timedelta(minutes=1),
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    client = app.test_client()
+    for path in paths:
+        try:
+            response = client.get(path, headers=headers)
+        except Exception as e:  # noqa
+            logger.warning(f"warm up request to {path} failed: {e}")
+            continue
+        metrics.increment("warmup_requests")
+        if response.status_code >= 400:
+            logger.warning(f"warm up request to {path} returned {response.status}")
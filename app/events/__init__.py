@@ -1,6 +1,8 @@
 from .event_data_structure import (
+    EVENT_KEY_FIELD,
     ServiceEventPublishing,
     ServiceEventSubscription,
+    event_key,
     extract_valid_data,
 )
 from .event_notification_handler import EventNotificationHandler
@@ -31,3 +31,20 @@ def extract_valid_data(obj_data: dict, validator: dict):
     for field in validator:
         valid_data[field] = obj_data.get(field)
     return valid_data
+
+
+# field of the event details naming what the event is about, events with the
+# same value are published to the same partition and consumed in order
+EVENT_KEY_FIELD = "customer_id"
+
+
+def event_key(event_data: dict):
+    """
+    :param event_data: {dict} the event, with its data under `details`
+    :return: {str} the key of the event, None when its details have no
+    EVENT_KEY_FIELD
+    """
+    details = event_data.get("details")
+    if not isinstance(details, dict) or details.get(EVENT_KEY_FIELD) is None:
+        return None
+    return str(details[EVENT_KEY_FIELD])
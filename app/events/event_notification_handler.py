@@ -1,8 +1,13 @@
+import uuid
+
+from flask import current_app
+
 from app.core import NotificationHandler
 from app.producer import publish_to_kafka
+from app.repositories import EventOutboxRepository
 from config import Config
 
-from .event_data_structure import ServiceEventPublishing
+from .event_data_structure import ServiceEventPublishing, event_key
 
 
 class EventNotificationHandler(NotificationHandler):
@@ -10,7 +15,10 @@ class EventNotificationHandler(NotificationHandler):
     Event Notification handler
 
     this class handles event notification. It publishes an Event message to
-    the kafka broker which is consumed by the rightful service.
+    the kafka broker which is consumed by the rightful service. With
+    OUTBOX_ENABLED the message is written to the event outbox instead, and
+    published by `flask outbox_relay`; notify inside `atomic` to write it in
+    the transaction of the change it announces.
 
     :param publish: {enum} the event action to publish
     :param data: {object} the details of the event to be sent. based on
@@ -28,9 +36,15 @@ class EventNotificationHandler(NotificationHandler):
     def send(self):
         # validate the event data against a data structure
         if self.validate_event(self.data):
-            publish_to_kafka(
-                topic=self.publish.upper(), value=self.generate_event_data()
-            )
+            event_data = self.generate_event_data()
+            # events about one customer keep their order
+            key = event_key(event_data)
+            if current_app.config.get("OUTBOX_ENABLED"):
+                EventOutboxRepository().add_event(
+                    topic=self.publish.upper(), payload=event_data, key=key
+                )
+                return
+            publish_to_kafka(topic=self.publish.upper(), value=event_data, key=key)
 
     def validate_event(self, data):
         validator = ServiceEventPublishing[self.publish].value
@@ -48,5 +62,7 @@ class EventNotificationHandler(NotificationHandler):
             "details": self.data,
             "meta": {
                 "event_action": self.publish,
+                # lets consumers drop events delivered more than once
+                "event_id": uuid.uuid4().hex,
             },
         }
@@ -1,5 +1,6 @@
 from app.core.extensions import db
 from app.services.redis_service import redis_conn
+from config import Config
 
 
 def redis_available():
@@ -16,4 +17,6 @@ def postgres_available():
         return False, str(e)
 
 
-HEALTH_CHECKS = [redis_available, postgres_available]
+HEALTH_CHECKS = [postgres_available]
+if Config.CACHE_BACKEND != "shared_memory":
+    HEALTH_CHECKS.insert(0, redis_available)
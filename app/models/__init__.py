@@ -1 +1,2 @@
+from .event_outbox_model import EventOutboxModel
 from .resource_model import ResourceModel
@@ -0,0 +1,34 @@
+import datetime
+from dataclasses import dataclass
+
+from sqlalchemy.sql import func
+
+from app import db
+
+
+@dataclass
+class EventOutboxModel(db.Model):
+    """
+    Events waiting to be published, written in the transaction of the change
+    they announce and deleted by the relay once the broker acknowledged them
+    """
+
+    id: int
+    topic: str
+    key: str
+    payload: dict
+    created: datetime.datetime
+
+    __tablename__ = "event_outbox"
+    # sqlite only increments INTEGER primary keys
+    id = db.Column(
+        db.BigInteger().with_variant(db.Integer(), "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    topic = db.Column(db.String(), nullable=False)
+    key = db.Column(db.String(), nullable=True)
+    payload = db.Column(db.JSON(), nullable=False)
+    created = db.Column(
+        db.DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
@@ -0,0 +1,135 @@
+import datetime
+import logging
+import threading
+import time
+
+from app import db
+from app.core.metrics import metrics
+from app.core.repository import atomic
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Publishes the events of the outbox table through the producer. Events
+    are claimed in batches with FOR UPDATE SKIP LOCKED, handed to the
+    producer, and deleted in the same transaction once the broker
+    acknowledged them; events not acknowledged by then stay in the outbox
+    and are published again by the next batch, so delivery is at least once
+    and consumers drop duplicates by meta.event_id. The events of a key
+    following one not acknowledged are kept as well, so they are published
+    again after it and the order of the key holds.
+
+    Several relays can run at once, each claiming the batches the others do
+    not hold. Events with the same key are only published in order by a
+    single relay.
+
+    :param repository: {EventOutboxRepository} repository of the outbox
+    :param producer: {BufferedProducer} producer the events are published with
+    :param batch_size: {int} events claimed per transaction
+    :param poll_interval: {float} seconds to wait when no event was published
+    :param delivery_timeout: {float} seconds to wait for the broker to
+    acknowledge a batch, the rows stay locked meanwhile
+    """
+
+    def __init__(
+        self,
+        repository,
+        producer,
+        batch_size: int = Config.OUTBOX_RELAY_BATCH_SIZE,
+        poll_interval: float = Config.OUTBOX_RELAY_POLL_INTERVAL,
+        delivery_timeout: float = Config.PRODUCER_DELIVERY_TIMEOUT,
+    ):
+        self.repository = repository
+        self.producer = producer
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.delivery_timeout = delivery_timeout
+        self._stopped = threading.Event()
+
+    def run(self, max_batches: int = None):
+        """
+        relay batches until `stop` is called
+        :param max_batches: {int} return after this many batches
+        """
+        batches = 0
+        while not self._stopped.is_set():
+            if not self.relay_batch():
+                self._stopped.wait(self.poll_interval)
+            batches += 1
+            if max_batches is not None and batches >= max_batches:
+                break
+
+    def stop(self):
+        self._stopped.set()
+
+    def relay_batch(self) -> int:
+        """
+        :return: {int} number of events published and removed from the outbox
+        """
+        started = time.monotonic()
+        delivered = []
+        with atomic(db.session):
+            events = self.repository.claim_batch(self.batch_size)
+            if not events:
+                metrics.set_gauge("outbox_lag_seconds", 0)
+                return 0
+            metrics.set_gauge("outbox_lag_seconds", event_age(events[0]))
+            for event in events:
+                self.producer.send(
+                    event.topic,
+                    event.payload,
+                    key=event.key,
+                    on_delivery=lambda error, record, event_id=event.id: (
+                        error is None and delivered.append(event_id)
+                    ),
+                )
+            self.producer.flush(self.delivery_timeout)
+            # acknowledgements arriving from now on are published again
+            published = acknowledged_prefix(events, set(delivered))
+            self.repository.delete_events(published)
+
+        elapsed = time.monotonic() - started
+        metrics.increment("outbox_relayed", len(published))
+        metrics.increment("outbox_relay_failed", len(events) - len(published))
+        metrics.set_gauge("outbox_relay_batch_seconds", elapsed)
+        metrics.set_gauge("outbox_relay_rate", len(published) / max(elapsed, 1e-6))
+        if len(published) < len(events):
+            logger.warning(
+                f"{len(events) - len(published)} outbox events not acknowledged, "
+                f"they will be published again"
+            )
+        return len(published)
+
+
+def acknowledged_prefix(events: list, acknowledged: set) -> list:
+    """
+    :param events: {list} events of a batch in the order they were written
+    :param acknowledged: {set} ids of the events acknowledged by the broker
+    :return: {list} ids of the acknowledged events of each key up to its first
+    event not acknowledged, events without a key are not ordered
+    """
+    blocked, published = set(), []
+    for event in events:
+        if event.key is not None and event.key in blocked:
+            continue
+        if event.id in acknowledged:
+            published.append(event.id)
+        elif event.key is not None:
+            blocked.add(event.key)
+    return published
+
+
+def event_age(event) -> float:
+    """
+    :param event: {EventOutboxModel} an event of the outbox
+    :return: {float} seconds since the event was written
+    """
+    created = event.created
+    if created.tzinfo is None:
+        # sqlite drops the timezone of the UTC timestamps it writes
+        created = created.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max((now - created).total_seconds(), 0)
@@ -0,0 +1,348 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+import orjson
+
+from app.core.metrics import metrics
+from config import Config
+
+try:
+    import confluent_kafka
+except ImportError:  # pragma: no cover
+    confluent_kafka = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_TYPES = ("none", "gzip", "snappy", "lz4", "zstd")
+
+
+@dataclass
+class Record:
+    topic: str
+    value: bytes
+    key: bytes = None
+    on_delivery: callable = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class InMemoryBroker:
+    """
+    In-process stand-in for Kafka used by tests and local development.
+    Messages are kept per topic in the order they were delivered and can be
+    read back with `messages`. Nothing is ever dropped and every record is
+    acknowledged, so it is refused in production, see `build_producer`.
+
+    :param compression: {str} recorded only, messages are kept uncompressed
+    """
+
+    def __init__(self, compression: str = "none"):
+        self.compression = compression
+        self.batches = []
+        self._topics = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def send_batch(self, records: list):
+        """
+        :param records: {list} records to deliver, calls the delivery callback
+        of each one
+        """
+        with self._lock:
+            self.batches.append(len(records))
+            for record in records:
+                self._topics[record.topic].append((record.key, record.value))
+        for record in records:
+            deliver(record, None)
+
+    def records(self, topic: str, start: int = 0) -> list:
+        """
+        :param topic: {str} the topic to read
+        :param start: {int} index of the first record to return
+        :return: {list} the key and encoded value of the records delivered to
+        the topic from `start` on
+        """
+        with self._lock:
+            return self._topics[topic][start:]
+
+    def messages(self, topic: str) -> list:
+        """
+        :param topic: {str} the topic to read
+        :return: {list} the decoded values delivered to the topic
+        """
+        with self._lock:
+            return [orjson.loads(value) for _, value in self._topics[topic]]
+
+    def close(self, timeout: float):
+        return None
+
+
+class KafkaBroker:
+    """
+    Kafka through confluent_kafka. Records are already batched by the
+    producer, so librdkafka sends each batch as soon as it is handed over and
+    compresses it with `compression`.
+
+    :param bootstrap_servers: {str} comma separated host:port of the brokers
+    :param compression: {str} one of COMPRESSION_TYPES
+    :param batch_size: {int} records handed over at once
+    :param timeout: {float} seconds to wait for a batch to be acknowledged
+    """
+
+    def __init__(
+        self, bootstrap_servers: str, compression: str, batch_size: int, timeout: float
+    ):
+        if confluent_kafka is None:
+            raise RuntimeError(
+                "KAFKA_BOOTSTRAP_SERVERS is set but confluent-kafka is not "
+                "installed, install the kafka extra"
+            )
+        self.timeout = timeout
+        self._producer = confluent_kafka.Producer(
+            {
+                "bootstrap.servers": bootstrap_servers,
+                "client.id": Config.APP_NAME,
+                "compression.type": compression,
+                "linger.ms": 0,
+                "batch.num.messages": batch_size,
+                "enable.idempotence": True,
+            }
+        )
+
+    def send_batch(self, records: list):
+        for record in records:
+            try:
+                self._producer.produce(
+                    record.topic,
+                    value=record.value,
+                    key=record.key,
+                    on_delivery=lambda error, message, record=record: deliver(
+                        record, error
+                    ),
+                )
+            except (BufferError, confluent_kafka.KafkaException) as e:
+                deliver(record, e)
+        # the callbacks of records still unacknowledged run on the next flush
+        remaining = self._producer.flush(self.timeout)
+        if remaining:
+            logger.warning(f"{remaining} events not acknowledged yet")
+
+    def close(self, timeout: float):
+        self._producer.flush(timeout)
+
+
+def deliver(record: Record, error):
+    """
+    report the delivery of a record to its callback. Callbacks run on the
+    producer thread and must not block
+    """
+    if error is not None:
+        metrics.increment("producer_delivery_errors")
+        logger.error(f"event to {record.topic} not delivered: {error}")
+    else:
+        metrics.increment("producer_delivered")
+    if record.on_delivery is None:
+        return
+    try:
+        record.on_delivery(error, record)
+    except Exception:  # noqa
+        logger.exception("delivery callback failed")
+
+
+class BufferedProducer:
+    """
+    Publishes events from a background thread so requests never wait on the
+    broker. `send` appends the record to a bounded buffer and returns; the
+    thread waits up to `linger` seconds for `batch_size` records and hands
+    them to the broker as one batch. When the buffer is full new records are
+    dropped and reported to their delivery callback, so a slow broker cannot
+    exhaust the memory of the workers.
+
+    The thread is started lazily and restarted after a fork, so the producer
+    can be created at import time in a preloaded gunicorn master.
+
+    :param broker: {InMemoryBroker|KafkaBroker} the broker records are sent to
+    :param buffer_size: {int} records buffered at most
+    :param batch_size: {int} records sent at once at most
+    :param linger: {float} seconds a record waits for others to fill its batch
+    """
+
+    def __init__(self, broker, buffer_size: int, batch_size: int, linger: float):
+        self.broker = broker
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.linger = linger
+        self._condition = threading.Condition()
+        self._buffer = deque()
+        self._in_flight = 0
+        self._flushing = False
+        self._thread = None
+        self._pid = None
+        metrics.register_gauge("producer_buffered", lambda: self.depth)
+
+    @property
+    def depth(self) -> int:
+        return len(self._buffer)
+
+    def send(self, topic: str, value, key: str = None, on_delivery=None) -> bool:
+        """
+        :param topic: {str} the topic to publish to
+        :param value: {Any} the event, serialized to JSON
+        :param key: {str} records with the same key go to the same partition
+        :param on_delivery: {callable} called with the error, None once
+        delivered, and the record
+        :return: {bool} False when the buffer is full and the record dropped
+        """
+        record = Record(
+            topic=topic,
+            value=orjson.dumps(value),
+            key=key.encode() if key is not None else None,
+            on_delivery=on_delivery,
+        )
+        with self._condition:
+            self._ensure_thread()
+            if len(self._buffer) >= self.buffer_size:
+                metrics.increment("producer_dropped")
+                dropped = True
+            else:
+                self._buffer.append(record)
+                dropped = False
+                # wake the thread to start the linger of a new batch or send
+                # a full one
+                if len(self._buffer) in (1, self.batch_size):
+                    self._condition.notify_all()
+        if dropped:
+            deliver(record, BufferError("producer buffer is full"))
+            return False
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        send the buffered records without waiting for the linger
+        :param timeout: {float} maximum number of seconds to wait
+        :return: {bool} True if every record was handed to the broker
+        """
+        with self._condition:
+            if self._buffer:
+                self._ensure_thread()
+            self._flushing = True
+            self._condition.notify_all()
+            flushed = self._condition.wait_for(
+                lambda: not self._buffer and not self._in_flight, timeout=timeout
+            )
+            self._flushing = False
+        return flushed
+
+    def close(self, timeout: float = 5):
+        self.flush(timeout)
+        self.broker.close(timeout)
+
+    def _ensure_thread(self):
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        self._pid = os.getpid()
+        self._in_flight = 0
+        self._flushing = False
+        self._thread = threading.Thread(target=self._run, name="producer", daemon=True)
+        self._thread.start()
+
+    def _batch_ready(self) -> bool:
+        if not self._buffer:
+            return False
+        if self._flushing or len(self._buffer) >= self.batch_size:
+            return True
+        return time.monotonic() - self._buffer[0].enqueued_at >= self.linger
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._batch_ready():
+                    timeout = None
+                    if self._buffer:
+                        timeout = self._buffer[0].enqueued_at + self.linger
+                        timeout -= time.monotonic()
+                    self._condition.wait(timeout)
+                batch = [
+                    self._buffer.popleft()
+                    for _ in range(min(self.batch_size, len(self._buffer)))
+                ]
+                self._in_flight = len(batch)
+            try:
+                self.broker.send_batch(batch)
+                metrics.increment("producer_batches")
+            except Exception as e:  # noqa
+                for record in batch:
+                    deliver(record, e)
+            finally:
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+
+
+def broker_configured() -> bool:
+    """
+    :return: {bool} False in production without KAFKA_BOOTSTRAP_SERVERS, where
+    events would only reach an in-memory broker
+    """
+    return bool(Config.KAFKA_BOOTSTRAP_SERVERS) or os.getenv("APP_ENV") != "production"
+
+
+def build_producer() -> BufferedProducer:
+    """
+    :return: {BufferedProducer} producer sending to KAFKA_BOOTSTRAP_SERVERS,
+    or to an in-memory broker when it is not set outside production
+    :raises RuntimeError: in production without KAFKA_BOOTSTRAP_SERVERS
+    """
+    if not broker_configured():
+        raise RuntimeError(
+            "KAFKA_BOOTSTRAP_SERVERS must be set in production, the in-memory "
+            "broker keeps every event in the process and acknowledges it"
+        )
+    assert (
+        Config.PRODUCER_COMPRESSION in COMPRESSION_TYPES
+    ), f"PRODUCER_COMPRESSION must be one of {COMPRESSION_TYPES}"
+    if Config.KAFKA_BOOTSTRAP_SERVERS:
+        broker = KafkaBroker(
+            Config.KAFKA_BOOTSTRAP_SERVERS,
+            compression=Config.PRODUCER_COMPRESSION,
+            batch_size=Config.PRODUCER_BATCH_SIZE,
+            timeout=Config.PRODUCER_DELIVERY_TIMEOUT,
+        )
+    else:
+        broker = InMemoryBroker(compression=Config.PRODUCER_COMPRESSION)
+    return BufferedProducer(
+        broker,
+        buffer_size=Config.PRODUCER_BUFFER_SIZE,
+        batch_size=Config.PRODUCER_BATCH_SIZE,
+        linger=Config.PRODUCER_LINGER_MS / 1000,
+    )
+
+
+_producer = None
+_producer_lock = threading.Lock()
+
+
+def get_producer() -> BufferedProducer:
+    global _producer
+    if _producer is None:
+        with _producer_lock:
+            if _producer is None:
+                _producer = build_producer()
+                atexit.register(_producer.close)
+    return _producer
+
+
+def publish_to_kafka(topic: str, value, key: str = None, on_delivery=None) -> bool:
+    """
+    queue an event for the broker and return without waiting for it
+    :param topic: {str} the topic to publish to
+    :param value: {Any} the event, serialized to JSON
+    :param key: {str} events with the same key are consumed in order
+    :param on_delivery: {callable} called with the error, None once delivered,
+    and the record
+    :return: {bool} False when the buffer is full and the event dropped
+    """
+    return get_producer().send(topic, value, key=key, on_delivery=on_delivery)
@@ -1 +1,2 @@
+from .event_outbox_repository import EventOutboxRepository
 from .resource_repository import ResourceRepository
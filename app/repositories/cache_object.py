@@ -1,8 +1,7 @@
-import json
-
 from marshmallow import Schema
 
 from app import db
+from app.core.serializer import get_serializer
 from app.services import RedisService
 
 
@@ -18,7 +17,7 @@ def cache_object(
     :return: {Model} object to cache
     """
 
-    serialize_object = obj_schema.dumps(obj_data)
+    serialize_object = get_serializer(obj_schema).dumps(obj_data)
     redis_instance.set(cache_key, serialize_object)
 
     return obj_data
@@ -37,7 +36,7 @@ def cache_list_of_object(
     :return: {Model} object to cache
     """
 
-    serialize_all_object = obj_schema.dumps(obj_data, many=True)
+    serialize_all_object = get_serializer(obj_schema).dumps(obj_data, many=True)
     redis_instance.set(cache_key, serialize_all_object)
 
     return obj_data
@@ -46,13 +45,13 @@ def cache_list_of_object(
 def deserialize_cached_object(obj_data: str, obj_model: db.Model, obj_schema: Schema):
     """
     This function takes a cache object, typecast it to a model object
-    :param obj_data: {str} object to deserialize
+    :param obj_data: {dict} cached object to deserialize
     :param obj_model: {Model} object model to typecast to
     :param obj_schema: {Schema} object serializer
     :return: {Model} deserialized object
     """
 
-    deserialized_object = obj_schema.loads(json.dumps(obj_data))
+    deserialized_object = obj_schema.load(obj_data)
 
     return obj_model(**deserialized_object)
 
@@ -68,7 +67,7 @@ def deserialize_list_of_cached_object(
     :return: {list} deserialized object
     """
 
-    deserialize_objects = obj_schema.loads(json.dumps(obj_data), many=True)
+    deserialize_objects = obj_schema.load(obj_data, many=True)
     for count, value in enumerate(deserialize_objects):
         deserialize_objects[count] = obj_model(**value)
 
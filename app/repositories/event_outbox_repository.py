@@ -0,0 +1,59 @@
+import logging
+
+from sqlalchemy.exc import DBAPIError
+
+from app.core.exceptions import AppException
+from app.core.repository import SQLBaseRepository, in_atomic
+from app.models import EventOutboxModel
+
+logger = logging.getLogger(__name__)
+
+
+class EventOutboxRepository(SQLBaseRepository):
+    model = EventOutboxModel
+
+    def add_event(self, topic: str, payload: dict, key: str = None):
+        """
+        add an event to the outbox. Inside `atomic` it is committed with the
+        other writes of the block, so it is published if and only if they are.
+        Outside of it the event is committed on its own, which is logged
+        :param topic: {str} the topic to publish to
+        :param payload: {dict} the event
+        :param key: {str} events with the same key are published in order
+        """
+        if not in_atomic(self.db.session):
+            logger.warning(
+                f"event to {topic} added outside atomic, it is committed "
+                f"without the change it announces"
+            )
+        return self.create({"topic": topic, "payload": payload, "key": key})
+
+    def claim_batch(self, limit: int) -> list:
+        """
+        lock the oldest events of the outbox until the transaction ends.
+        Events locked by another relay are skipped instead of waited for
+        :param limit: {int} events returned at most
+        :return: {list} events in the order they were written
+        """
+        try:
+            return (
+                self.model.query.order_by(self.model.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+        except DBAPIError as e:
+            raise AppException.OperationError(error_message=e.orig.args[0])
+
+    def delete_events(self, event_ids: list):
+        """
+        :param event_ids: {list} ids of the events published
+        """
+        if not event_ids:
+            return
+        try:
+            self.model.query.filter(self.model.id.in_(event_ids)).delete(
+                synchronize_session=False
+            )
+        except DBAPIError as e:
+            raise AppException.OperationError(error_message=e.orig.args[0])
@@ -1,127 +1,123 @@
-from app.core.exceptions import HTTPException
-from app.core.repository import SQLBaseRepository
+from functools import partial
+
+from flask import current_app
+from sqlalchemy import desc
+
+from app.core.exceptions import AppException, HTTPException
+from app.core.repository import CacheWarmer, SQLBaseRepository, cached
+from app.core.serializer import get_serializer
+from app.core.service_interfaces import CacheServiceInterface
 from app.models import ResourceModel
 from app.schema import ResourceSchema
-from app.services import RedisService
+from config import Config
 
-from .cache_object import (
-    cache_list_of_object,
-    cache_object,
-    deserialize_cached_object,
-    deserialize_list_of_cached_object,
-)
+from .cache_object import cache_list_of_object
 
 SINGLE_RESOURCE_CACHE_KEY = "resource_{}"
 ALL_RESOURCES_CACHE_KEY = "all_resources"
+RESOURCE_ACCESS_LOG_KEY = "resource_access_log"
 
 
 class ResourceRepository(SQLBaseRepository):
     model = ResourceModel
+    cache_key = SINGLE_RESOURCE_CACHE_KEY
+    cache_collection_keys = (ALL_RESOURCES_CACHE_KEY,)
 
-    def __init__(self, redis_service: RedisService, resource_schema: ResourceSchema):
+    def __init__(
+        self, redis_service: CacheServiceInterface, resource_schema: ResourceSchema
+    ):
         self.redis_service = redis_service
         self.resource_schema = resource_schema
-        super().__init__()
+        super().__init__(cache_service=redis_service, cache_schema=resource_schema)
 
+    @cached(key=ALL_RESOURCES_CACHE_KEY, versioned=False)
     def index(self):
-        try:
-            redis_data = self.redis_service.get(ALL_RESOURCES_CACHE_KEY)
-            if redis_data:
-                deserialized_objects = deserialize_list_of_cached_object(
-                    obj_data=redis_data,
-                    obj_schema=self.resource_schema,
-                    obj_model=self.model,
-                )
-                return deserialized_objects
-            postgres_data = cache_list_of_object(
-                obj_data=super().index(),
-                obj_schema=self.resource_schema,
-                redis_instance=self.redis_service,
-                cache_key=ALL_RESOURCES_CACHE_KEY,
-            )
-            return postgres_data
-        except HTTPException:
-            return super().index()
-
-    def create(self, obj_data: dict):
-        postgres_data = super().create(obj_data)
-        try:
-            obj_data = cache_object(
-                obj_data=postgres_data,
-                obj_schema=self.resource_schema,
-                redis_instance=self.redis_service,
-                cache_key=SINGLE_RESOURCE_CACHE_KEY.format(postgres_data.id),
-            )
-            _ = cache_list_of_object(
-                obj_data=super().index(),
-                obj_schema=self.resource_schema,
-                redis_instance=self.redis_service,
-                cache_key=ALL_RESOURCES_CACHE_KEY,
-            )
-            return obj_data
-        except HTTPException:
-            return postgres_data
+        return super().index()
 
     def get_by_id(self, obj_id: str):
-        try:
-            redis_data = self.redis_service.get(
-                SINGLE_RESOURCE_CACHE_KEY.format(obj_id)
-            )
-            if redis_data:
-                deserialized_object = deserialize_cached_object(
-                    obj_data=redis_data,
-                    obj_model=self.model,
-                    obj_schema=self.resource_schema,
+        if current_app.config.get("CACHE_TRACK_HOT_KEYS"):
+            self._run_cache_task(
+                partial(
+                    self.redis_service.increment_score,
+                    RESOURCE_ACCESS_LOG_KEY,
+                    str(obj_id),
                 )
-                return deserialized_object
-            object_data = cache_object(
-                obj_data=super().find_by_id(obj_id),
-                obj_schema=self.resource_schema,
-                redis_instance=self.redis_service,
-                cache_key=SINGLE_RESOURCE_CACHE_KEY.format(obj_id),
             )
-            return object_data
-        except HTTPException:
-            return super().find_by_id(obj_id)
+        return self._get_by_id(obj_id)
 
-    def update_by_id(self, obj_id: str, obj_in: dict):
-        postgres_data = super().update_by_id(obj_id, obj_in)
-        try:
-            redis_data = self.redis_service.get(
-                SINGLE_RESOURCE_CACHE_KEY.format(obj_id)
-            )
-            if redis_data:
-                self.redis_service.delete(SINGLE_RESOURCE_CACHE_KEY.format(obj_id))
-            object_data = cache_object(
-                obj_data=postgres_data,
-                obj_schema=self.resource_schema,
-                redis_instance=self.redis_service,
-                cache_key=SINGLE_RESOURCE_CACHE_KEY.format(postgres_data.id),
-            )
-            _ = cache_list_of_object(
-                obj_data=super().index(),
-                obj_schema=self.resource_schema,
-                redis_instance=self.redis_service,
-                cache_key=ALL_RESOURCES_CACHE_KEY,
+    @cached(key=SINGLE_RESOURCE_CACHE_KEY, versioned=False)
+    def _get_by_id(self, obj_id: str):
+        return super().find_by_id(obj_id)
+
+    @cached(ttl=Config.CACHE_DEFAULT_TTL)
+    def find_all(self, filter_param: dict):
+        return super().find_all(filter_param)
+
+    @cached(ttl=Config.CACHE_DEFAULT_TTL)
+    def paginate(self, page: int, per_page: int):
+        return super().paginate(page, per_page)
+
+    @cached(ttl=Config.CACHE_DEFAULT_TTL)
+    def filter_paginate(self, filter_param: dict, page: int, per_page: int):
+        return super().filter_paginate(filter_param, page, per_page)
+
+    def warm_cache(
+        self,
+        limit: int,
+        source: str = "recency",
+        batch_size: int = 100,
+        rate_limit: float = 0,
+    ) -> int:
+        """
+        Preload the hottest resources and the list of all resources into the
+        cache, then trim the access log to the CACHE_ACCESS_LOG_SIZE most read
+        resources so it does not grow with every id ever read
+        :param limit: {int} maximum number of resources to preload
+        :param source: {str} "recency" preloads the most recently modified
+        resources, "access_log" the most read ones recorded by get_by_id
+        :param batch_size: {int} number of resources written per redis pipeline
+        :param rate_limit: {float} maximum resources per second, 0 for no limit
+        :return: {int} number of resources preloaded
+        """
+        if source == "recency":
+            query = self.model.query.order_by(desc(self.model.modified))
+        elif source == "access_log":
+            hot_ids = self.redis_service.top_members(RESOURCE_ACCESS_LOG_KEY, limit)
+            query = self.model.query.filter(self.model.id.in_(hot_ids))
+        else:
+            raise AppException.OperationError(error_message="invalid warm up source")
+
+        warmer = CacheWarmer(
+            cache_service=self.redis_service,
+            batch_size=batch_size,
+            rate_limit=rate_limit,
+        )
+        count = warmer.warm(
+            rows=query.limit(limit).yield_per(batch_size),
+            cache_key=lambda row: SINGLE_RESOURCE_CACHE_KEY.format(row.id),
+            serialize=get_serializer(self.resource_schema).dumps,
+        )
+        self._cache_all_objects()
+        self._run_cache_task(
+            partial(
+                self.redis_service.trim_members,
+                RESOURCE_ACCESS_LOG_KEY,
+                max(limit, Config.CACHE_ACCESS_LOG_SIZE),
             )
-            return object_data
-        except HTTPException:
-            return super().update_by_id(obj_id, obj_in)
+        )
+        return count
 
-    def delete_by_id(self, obj_id):
-        postgres_data = super().delete_by_id(obj_id)
+    def _cache_all_objects(self):
+        return cache_list_of_object(
+            obj_data=super().index(),
+            obj_schema=self.resource_schema,
+            redis_instance=self.redis_service,
+            cache_key=ALL_RESOURCES_CACHE_KEY,
+        )
+
+    # noinspection PyMethodMayBeStatic
+    def _run_cache_task(self, task):
         try:
-            redis_data = self.redis_service.get(
-                SINGLE_RESOURCE_CACHE_KEY.format(obj_id)
-            )
-            if redis_data:
-                self.redis_service.delete(SINGLE_RESOURCE_CACHE_KEY.format(obj_id))
-            _ = cache_list_of_object(
-                obj_data=super().index(),
-                obj_schema=self.resource_schema,
-                redis_instance=self.redis_service,
-                cache_key=ALL_RESOURCES_CACHE_KEY,
-            )
-            return postgres_data
+            task()
         except HTTPException:
-            return super().delete_by_id(obj_id)
+            pass
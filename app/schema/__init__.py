@@ -1,3 +1,4 @@
+from .batch_schema import BatchOperationSchema, BatchResultSchema, BatchSchema
 from .resource_schema import (
     CreateResourceSchema,
     ResourceRequestArgumentSchema,
@@ -0,0 +1,25 @@
+from marshmallow import Schema, fields, validate
+
+from config import Config
+
+BATCH_METHODS = ["GET", "POST", "PATCH", "DELETE"]
+
+
+class BatchOperationSchema(Schema):
+    method = fields.String(required=True, validate=validate.OneOf(BATCH_METHODS))
+    path = fields.String(required=True)
+    body = fields.Raw(load_default=None)
+
+
+class BatchSchema(Schema):
+    atomic = fields.Boolean(load_default=False)
+    operations = fields.List(
+        fields.Nested(BatchOperationSchema),
+        required=True,
+        validate=validate.Length(min=1, max=Config.BATCH_MAX_OPERATIONS),
+    )
+
+
+class BatchResultSchema(Schema):
+    status = fields.Integer()
+    body = fields.Raw(allow_none=True)
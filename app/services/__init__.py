@@ -1,2 +1,6 @@
 from .auth_service import AuthService
+from .cache_backend import get_cache_service
+from .rate_limit_service import RateLimitService
 from .redis_service import RedisService
+from .shared_memory_cache_service import SharedMemoryCacheService
+from .tiered_cache_service import TieredCacheService
@@ -1,3 +1,4 @@
+import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
@@ -38,12 +39,29 @@ class AuthService(AuthServiceInterface):
 
     # noinspection PyMethodMayBeStatic
     def generate_token(self, user_id: str, token_type: str, expiration: datetime):
-        payload = {"id": user_id, "token_type": token_type, "exp": expiration}
+        payload = {
+            "id": user_id,
+            "token_type": token_type,
+            "exp": expiration,
+            "jti": uuid.uuid4().hex,
+        }
         token = jwt.encode(
             payload=payload, key=Config.SECRET_KEY, algorithm=Config.JWT_ALGORITHMS
         )
         return token
 
+    # noinspection PyMethodMayBeStatic
+    def revoke_token(self, payload: dict):
+        """
+        :param payload: {dict} the verified payload of the token to revoke
+        :return: {None}
+        """
+        if not payload.get("jti") or not payload.get("exp"):
+            raise AppException.OperationError(error_message="token cannot be revoked")
+        from app.services.revocation_service import revocation_service
+
+        revocation_service.revoke(payload["jti"], payload["exp"])
+
     def create_user(self, obj_data: dict):
         assert obj_data, "Missing request data to be saved"
         assert isinstance(obj_data, dict)
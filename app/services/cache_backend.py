@@ -0,0 +1,25 @@
+from config import Config
+
+from .redis_service import RedisService
+from .shared_memory_cache_service import SharedMemoryCacheService
+from .tiered_cache_service import TieredCacheService
+
+CACHE_BACKENDS = ("redis", "shared_memory", "tiered")
+
+
+def get_cache_service(backend: str = Config.CACHE_BACKEND):
+    """
+    :param backend: {str} "redis" caches in redis only, "shared_memory" in
+    memory shared by the processes of the host only, for single node deployments
+    without redis, and "tiered" in shared memory in front of redis
+    :return: {CacheServiceInterface}
+    """
+    if backend == "redis":
+        return RedisService()
+    if backend == "shared_memory":
+        return SharedMemoryCacheService()
+    if backend == "tiered":
+        return TieredCacheService(
+            local_cache=SharedMemoryCacheService(), remote_cache=RedisService()
+        )
+    raise ValueError(f"unknown cache backend {backend}, expected {CACHE_BACKENDS}")
@@ -0,0 +1,75 @@
+import math
+
+from redis.exceptions import RedisError
+
+from app.services import redis_service
+from app.services.redis_service import redis_circuit_breaker
+
+# takes a token from the bucket in KEYS[1], refilled at ARGV[1] tokens per
+# second up to ARGV[2], and returns whether it was allowed and the tokens left
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "stamp")
+local tokens = burst
+if bucket[1] and bucket[2] then
+    local elapsed = math.max(0, now - tonumber(bucket[2]))
+    tokens = math.min(burst, tonumber(bucket[1]) + elapsed * rate)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "stamp", tostring(now))
+redis.call("EXPIRE", KEYS[1], ARGV[3])
+return {allowed, tostring(tokens)}
+"""
+
+
+class RateLimitService:
+    """
+    Token buckets kept in redis, so a client is limited across every worker
+    and host. Each bucket is a hash with the tokens left and the redis time
+    they were counted at; it refills at `rate` tokens per second up to `burst`
+    and is updated atomically by a Lua script, in one round trip sent with
+    EVALSHA, so requests of a busy client never retry each other out.
+
+    Requests are let through while redis is unavailable: the rate limit
+    protects the service, an outage of redis must not take it down.
+
+    :param rate: {float} tokens added to a bucket per second
+    :param burst: {int} tokens a bucket holds at most
+    """
+
+    def __init__(self, rate: float, burst: int):
+        assert rate > 0, "rate must be positive"
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.ttl = math.ceil(self.burst / rate) + 1
+        self.script = redis_service.redis_conn.register_script(TAKE_SCRIPT)
+
+    def take(self, client: str) -> tuple:
+        """
+        :param client: {str} the client whose bucket a token is taken from
+        :return: {tuple} whether the request is allowed and the seconds
+        before the bucket holds a token again
+        """
+        if not redis_circuit_breaker.allow_request():
+            return True, 0
+        try:
+            # the script is loaded again when redis does not know its hash
+            allowed, tokens = self.script(
+                keys=[f"rate_limit:{client}"],
+                args=[self.rate, self.burst, self.ttl],
+                client=redis_service.redis_conn,
+            )
+        except RedisError:
+            redis_circuit_breaker.record_failure()
+            return True, 0
+        redis_circuit_breaker.record_success()
+        if allowed:
+            return True, 0
+        return False, math.ceil((1 - float(tokens)) / self.rate)
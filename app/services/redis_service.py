@@ -1,34 +1,134 @@
-import json
+import time
+from contextvars import ContextVar
 
 import redis
-from redis.exceptions import RedisError
+from flask import json
+from redis.exceptions import RedisError, WatchError
 
+from app.core import deadline
 from app.core.exceptions import HTTPException
 from app.core.service_interfaces import CacheServiceInterface
+from app.utils import CircuitBreaker
 from config import Config
 
 REDIS_SERVER = Config.REDIS_SERVER
 REDIS_PASSWORD = Config.REDIS_PASSWORD
 REDIS_PORT = Config.REDIS_PORT
+# time.monotonic() value the command run by RedisService must be done by
+_command_ends_at = ContextVar("redis_command_ends_at", default=None)
+# shortest socket timeout, a timeout of 0 would make the socket non-blocking
+MIN_SOCKET_TIMEOUT = 0.001
+
+
+class DeadlineConnection(redis.Connection):
+    """
+    A connection whose socket timeout is set before each write and read of a
+    command run by RedisService during a request: REDIS_SOCKET_TIMEOUT, or the
+    time the request has left when it is shorter. A command the deadline cuts
+    short raises TimeoutError and its connection is dropped, so no reply is
+    left to be read by the next command
+    """
+
+    def send_packed_command(self, command, check_health=True):
+        if not self._sock:
+            self.connect()
+        self._set_socket_timeout()
+        super().send_packed_command(command, check_health)
+
+    def read_response(self, *args, **kwargs):
+        self._set_socket_timeout()
+        return super().read_response(*args, **kwargs)
+
+    def _set_socket_timeout(self):
+        timeout = self.socket_timeout
+        ends_at = _command_ends_at.get()
+        if ends_at is not None:
+            left = max(ends_at - time.monotonic(), MIN_SOCKET_TIMEOUT)
+            timeout = left if timeout is None else min(timeout, left)
+        if self._sock is not None:
+            self._sock.settimeout(timeout)
+
 
 redis_conn = redis.Redis(
-    host=REDIS_SERVER, port=REDIS_PORT, db=0, password=REDIS_PASSWORD
+    connection_pool=redis.ConnectionPool(
+        connection_class=DeadlineConnection,
+        host=REDIS_SERVER,
+        port=REDIS_PORT,
+        db=0,
+        password=REDIS_PASSWORD,
+        socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=Config.REDIS_SOCKET_CONNECT_TIMEOUT,
+    )
+)
+
+# shared by every RedisService instance in the worker so that an outage is
+# detected once instead of once per repository
+redis_circuit_breaker = CircuitBreaker(
+    failure_threshold=Config.REDIS_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=Config.REDIS_CIRCUIT_RESET_TIMEOUT,
+    probe=lambda: redis_conn.ping(),
+    name="redis",
 )
 
 
 class RedisService(CacheServiceInterface):
-    def set(self, name, data):
+    def set(self, name, data, ex=None):
         """
 
         :param name: {string} name of the object you want to set
         :param data: {Any} the object you want to set
+        :param ex: {int} seconds before the object expires, None to keep it
         :return: {None}
         """
-        try:
-            redis_conn.set(name, data)
-            return True
-        except RedisError:
-            raise HTTPException(status_code=500, description="Error adding to cache")
+        self._execute(redis_conn.set, name, data, ex, error="Error adding to cache")
+        return True
+
+    def add(self, name, data, ex=None):
+        """
+        set an object only when the name is not set yet
+        :param name: {string} name of the object you want to set
+        :param data: {Any} the object you want to set
+        :param ex: {int} seconds before the object expires, None to keep it
+        :return: {bool} False when the name was already set
+        """
+        return bool(
+            self._execute(
+                redis_conn.set,
+                name,
+                data,
+                ex,
+                None,
+                True,
+                error="Error adding to cache",
+            )
+        )
+
+    def delete_if_equal(self, name, data):
+        """
+        delete an object only while it still holds `data`, such as a lock
+        that may have expired and been taken by another owner
+        :param name: {string} name of the object you want to delete
+        :param data: {bytes} the value the object must hold
+        :return: {bool} True when the object was deleted
+        """
+        return self._execute(
+            self._delete_if_equal, name, data, error="Error deleting from cache"
+        )
+
+    # noinspection PyMethodMayBeStatic
+    def _delete_if_equal(self, name, data):
+        with redis_conn.pipeline() as pipeline:
+            pipeline.watch(name)
+            if pipeline.get(name) != data:
+                return False
+            pipeline.multi()
+            pipeline.delete(name)
+            try:
+                pipeline.execute()
+            except WatchError:
+                # changed after the read, it is not ours anymore
+                return False
+        return True
 
     def get(self, name):
         """
@@ -36,22 +136,116 @@ class RedisService(CacheServiceInterface):
         :param name: {string} name of the object you want to get
         :return: {Any}
         """
-        try:
-            data = redis_conn.get(name)
-            if data:
-                return json.loads(data)
-            return data
-        except RedisError:
-            raise HTTPException(status_code=500, description="Error getting from cache")
+        data = self.get_raw(name)
+        if data:
+            return json.loads(data)
+        return data
 
-    def delete(self, name):
+    def get_raw(self, name):
         """
-        :param name: {string} name of the object you want to delete
+
+        :param name: {string} name of the object you want to get
+        :return: {bytes} the object as it was stored, None when missing
+        """
+        return self._execute(redis_conn.get, name, error="Error getting from cache")
+
+    def get_many(self, names: list):
+        """
+        get several objects in a single round trip
+        :param names: {list} names of the objects you want to get
+        :return: {list} the objects as they were stored, None for missing ones
+        """
+        if not names:
+            return []
+        return self._execute(redis_conn.mget, names, error="Error getting from cache")
+
+    def set_many(self, mapping: dict, ex=None):
+        """
+        set several objects in a single round trip
+        :param mapping: {dict} names mapped to the objects you want to set
+        :param ex: {int} seconds before the objects expire, None to keep them
+        :return: {None}
+        """
+        pipeline = redis_conn.pipeline(transaction=False)
+        for name, data in mapping.items():
+            pipeline.set(name, data, ex)
+        self._execute(pipeline.execute, error="Error adding to cache")
+        return True
+
+    def increment(self, name):
+        """
+        :param name: {string} name of the counter you want to increment
+        :return: {int} the new value of the counter
+        """
+        return self._execute(redis_conn.incr, name, error="Error adding to cache")
+
+    def increment_score(self, name, member, amount=1):
+        """
+        :param name: {string} name of the sorted set
+        :param member: {string} the member whose score is incremented
+        :param amount: {int} the amount to increment by
+        :return: {float} the new score of the member
+        """
+        return self._execute(
+            redis_conn.zincrby, name, amount, member, error="Error adding to cache"
+        )
+
+    def top_members(self, name, count):
+        """
+        :param name: {string} name of the sorted set
+        :param count: {int} number of members to return
+        :return: {list} members with the highest scores, highest first
+        """
+        members = self._execute(
+            redis_conn.zrevrange, name, 0, count - 1, error="Error getting from cache"
+        )
+        return [member.decode() for member in members]
+
+    def trim_members(self, name, count):
+        """
+        :param name: {string} name of the sorted set
+        :param count: {int} number of members to keep, those with the highest
+        scores
+        :return: {int} number of members removed
+        """
+        return self._execute(
+            redis_conn.zremrangebyrank,
+            name,
+            0,
+            -count - 1,
+            error="Error deleting from cache",
+        )
+
+    def delete(self, *names):
+        """
+        :param names: {string} names of the objects you want to delete
         :return: {Bool}
         """
+        self._execute(redis_conn.delete, *names, error="Error deleting from cache")
+
+    # noinspection PyMethodMayBeStatic
+    def _execute(self, command, *args, error: str):
+        """
+        run a redis command behind the circuit breaker. While the circuit is open
+        the command is skipped and the caller falls back immediately. Commands
+        are not sent once the request ran out of time, and the socket timeout
+        of the command is capped to the time the request has left
+        :param command: {callable} bound redis client method
+        :param error: {str} description of the exception raised on failure
+        :return: {Any} result of the command
+        """
+        if not redis_circuit_breaker.allow_request():
+            raise HTTPException(status_code=503, description="Cache unavailable")
+        left = deadline.remaining()
+        token = _command_ends_at.set(None if left is None else time.monotonic() + left)
         try:
-            redis_conn.delete(name)
+            result = command(*args)
         except RedisError:
-            raise HTTPException(
-                status_code=500, description="Error deleting from cache"
-            )
+            # a command cut short by the deadline does not mean redis is down
+            deadline.remaining()
+            redis_circuit_breaker.record_failure()
+            raise HTTPException(status_code=500, description=error)
+        finally:
+            _command_ends_at.reset(token)
+        redis_circuit_breaker.record_success()
+        return result
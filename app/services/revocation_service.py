@@ -0,0 +1,245 @@
+import logging
+import os
+import threading
+import time
+
+from redis.exceptions import RedisError
+
+from app.core.exceptions import AppException
+from app.core.metrics import metrics
+from app.services import redis_service
+from app.services.redis_service import redis_circuit_breaker
+from app.utils import BloomFilter
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# sorted set of the revoked token ids, scored by the expiry of their token
+REVOKED_TOKENS = "revoked_tokens"
+# channel the ids are published on as they are revoked
+REVOCATION_CHANNEL = "revoked_tokens"
+
+
+class RevocationService:
+    """
+    Revoked token ids are kept in redis until their token expires and
+    mirrored in every process as a Bloom filter, so checking a token that was
+    not revoked costs a few hashes and no round trip. Redis is only asked on a
+    filter hit, to rule out false positives.
+
+    The filter follows the revocations published by other processes through
+    pub/sub. Messages are read without blocking by the requests that check a
+    token, at most every `sync_interval` seconds, so no thread is needed and
+    most checks do not even poll the socket. The filter is loaded by `start`
+    when the worker warms up, before it accepts requests, and then rebuilt from
+    redis every `refresh_interval` seconds by a background thread to drop
+    expired ids without a request paying for it. The thread also subscribes
+    again every `reconnect_interval` seconds after redis failed. Only a process
+    that was not warmed up loads the filter during its first check. A process
+    that could not reach redis since it started has an empty filter and lets
+    every token through until it can.
+
+    :param capacity: {int} revoked tokens the filter is sized for
+    :param error_rate: {float} rate of filter hits that need a redis lookup
+    :param refresh_interval: {float} seconds between two rebuilds of the filter
+    :param sync_interval: {float} seconds a revocation by another process may
+    take to reach the filter
+    :param reconnect_interval: {float} seconds between two subscriptions after
+    redis failed
+    """
+
+    def __init__(
+        self,
+        capacity: int = Config.REVOCATION_BLOOM_CAPACITY,
+        error_rate: float = Config.REVOCATION_BLOOM_ERROR_RATE,
+        refresh_interval: float = Config.REVOCATION_REFRESH_INTERVAL,
+        sync_interval: float = 0.05,
+        reconnect_interval: float = 1,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.sync_interval = sync_interval
+        self.reconnect_interval = reconnect_interval
+        self._synced_at = 0
+        self._filter = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._pubsub = None
+        self._pid = None
+        self._stopped = threading.Event()
+
+    def revoke(self, jti: str, expires_at: float):
+        """
+        :param jti: {str} id of the token to revoke
+        :param expires_at: {float} expiry of the token as a unix timestamp,
+        the revocation is dropped once the token expired anyway
+        """
+        if expires_at <= time.time():
+            return
+        if not redis_circuit_breaker.allow_request():
+            raise AppException.ServiceUnavailable(
+                error_message="token revocation unavailable", retry_after=1
+            )
+        pipeline = redis_service.redis_conn.pipeline(transaction=False)
+        pipeline.zadd(REVOKED_TOKENS, {jti: expires_at})
+        pipeline.publish(REVOCATION_CHANNEL, jti)
+        try:
+            pipeline.execute()
+        except RedisError:
+            redis_circuit_breaker.record_failure()
+            raise AppException.ServiceUnavailable(
+                error_message="token revocation unavailable", retry_after=1
+            )
+        redis_circuit_breaker.record_success()
+        self._filter.add(jti)
+        metrics.increment("tokens_revoked")
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        :param jti: {str} id of the token to check
+        :return: {bool} True when the token was revoked
+        :raises AppException.ServiceUnavailable: when the filter matches and
+        redis cannot confirm it, revoked tokens are never let through
+        """
+        self.sync()
+        if jti not in self._filter:
+            return False
+        metrics.increment("revocation_filter_hits")
+        if not redis_circuit_breaker.allow_request():
+            raise AppException.ServiceUnavailable(
+                error_message="token revocation unavailable", retry_after=1
+            )
+        try:
+            expires_at = redis_service.redis_conn.zscore(REVOKED_TOKENS, jti)
+        except RedisError:
+            redis_circuit_breaker.record_failure()
+            raise AppException.ServiceUnavailable(
+                error_message="token revocation unavailable", retry_after=1
+            )
+        redis_circuit_breaker.record_success()
+        return expires_at is not None and expires_at > time.time()
+
+    def start(self):
+        """
+        subscribe to the revocations and load the filter in the current
+        process, then rebuild it in the background. Called once the worker is
+        forked, by its warm up
+        """
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        # the subscription and the thread of the parent process are not shared
+        self._pubsub = None
+        self._pid = os.getpid()
+        if redis_circuit_breaker.allow_request():
+            try:
+                self._subscribe()
+            except RedisError:
+                redis_circuit_breaker.record_failure()
+                self._close()
+        threading.Thread(
+            target=self._run_refresh, name="revocation_refresh", daemon=True
+        ).start()
+
+    def sync(self):
+        """
+        add the ids revoked by other processes to the filter. Requests running
+        while another thread syncs go on with the filter as it is
+        """
+        if time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._synced_at = time.monotonic()
+            # processes started without a warm up load the filter now
+            self._start()
+            if self._pubsub is None or not redis_circuit_breaker.allow_request():
+                # the background thread subscribes again
+                return
+            try:
+                self._receive()
+            except RedisError:
+                redis_circuit_breaker.record_failure()
+                self._close()
+        finally:
+            self._lock.release()
+
+    def _subscribe(self):
+        # subscribe before loading the ids, so none revoked in between is missed
+        pubsub = redis_service.redis_conn.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(REVOCATION_CHANNEL)
+        self._pubsub = pubsub
+        self.refresh()
+
+    def _receive(self):
+        while True:
+            message = self._pubsub.get_message(timeout=0)
+            if message is None:
+                return
+            self._filter.add(message["data"].decode())
+
+    def refresh(self):
+        """
+        rebuild the filter from the ids in redis, dropping the expired ones
+        """
+        now = time.time()
+        pipeline = redis_service.redis_conn.pipeline(transaction=False)
+        pipeline.zremrangebyscore(REVOKED_TOKENS, "-inf", now)
+        pipeline.zrangebyscore(REVOKED_TOKENS, now, "+inf")
+        _, revoked = pipeline.execute()
+        # keep the error rate when more tokens were revoked than planned
+        bloom_filter = BloomFilter(
+            max(self.capacity, 2 * len(revoked)), self.error_rate
+        )
+        for jti in revoked:
+            bloom_filter.add(jti.decode())
+        self._filter = bloom_filter
+        metrics.set_gauge("revoked_tokens", len(revoked))
+
+    def _run_refresh(self):
+        refreshed_at = time.monotonic()
+        while not self._stopped.wait(
+            min(self.reconnect_interval, self.refresh_interval)
+        ):
+            if (
+                self._pubsub is not None
+                and time.monotonic() - refreshed_at < self.refresh_interval
+            ):
+                continue
+            # ids received while rebuilding are added to the new filter once
+            # the lock is released
+            with self._lock:
+                if not redis_circuit_breaker.allow_request():
+                    continue
+                refreshed_at = time.monotonic()
+                try:
+                    if self._pubsub is None:
+                        self._subscribe()
+                    else:
+                        self.refresh()
+                except RedisError:
+                    redis_circuit_breaker.record_failure()
+                    self._close()
+                except Exception:  # noqa
+                    logger.exception("revocation filter refresh failed")
+
+    def stop(self):
+        """
+        stop rebuilding the filter in the background
+        """
+        self._stopped.set()
+
+    def _close(self):
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except RedisError:
+                pass
+        self._pubsub = None
+
+
+revocation_service = RevocationService()
@@ -0,0 +1,387 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from flask import json
+
+from app.core.metrics import metrics
+from app.core.service_interfaces import CacheServiceInterface
+from config import Config
+
+# file header: magic, layout version, slot count, slot size, ways per bucket
+FILE_HEADER = struct.Struct("<8sIIII")
+FILE_MAGIC = b"SHMCACHE"
+LAYOUT_VERSION = 1
+# slot header: sequence, state, reference bit, key length, value length,
+# expiry timestamp (0 for none), key hash
+SLOT_HEADER = struct.Struct("<IBBHIdQ")
+SEQUENCE = struct.Struct("<I")
+EMPTY, USED = 0, 1
+WAYS = 8
+READ_RETRIES = 16
+
+
+class SharedMemoryCacheService(CacheServiceInterface):
+    """
+    Cache shared by every process of the host through an mmap-backed file.
+
+    The file holds a fixed-size, set-associative hash table: a key hashes to a
+    bucket of `WAYS` slots and, when the bucket is full, the CLOCK algorithm
+    evicts the first slot whose reference bit is not set. Readers never lock;
+    each slot is guarded by a sequence counter that writers make odd while they
+    change the slot, so a reader retries when the counter is odd or changed
+    during its copy. Writers are serialised across processes with `flock`.
+
+    Values larger than a slot are not cached.
+
+    :param path: {str} file backing the cache, preferably on a tmpfs
+    :param slots: {int} number of slots, rounded up to a multiple of `WAYS`
+    :param slot_size: {int} bytes per slot, including the key and slot header
+    """
+
+    def __init__(
+        self,
+        path: str = Config.CACHE_SHARED_MEMORY_PATH,
+        slots: int = Config.CACHE_SHARED_MEMORY_SLOTS,
+        slot_size: int = Config.CACHE_SHARED_MEMORY_SLOT_SIZE,
+    ):
+        assert slot_size > SLOT_HEADER.size, "slot size is smaller than its header"
+        self.path = path
+        self.buckets = max(1, -(-slots // WAYS))
+        self.slots = self.buckets * WAYS
+        self.slot_size = slot_size
+        self.slots_offset = FILE_HEADER.size + self.buckets
+        self.size = self.slots_offset + self.slots * slot_size
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._lock = None
+
+    def set(self, name, data, ex=None):
+        """
+        :param name: {string} name of the object you want to set
+        :param data: {Any} the object you want to set
+        :param ex: {int} seconds before the object expires, None to keep it
+        :return: {bool} False when the object is too large to be cached
+        """
+        with self._write_lock() as mapping:
+            return self._write(mapping, name, data, ex)
+
+    def get(self, name):
+        """
+        :param name: {string} name of the object you want to get
+        :return: {Any}
+        """
+        data = self.get_raw(name)
+        if data:
+            return json.loads(data)
+        return data
+
+    def get_raw(self, name):
+        """
+        :param name: {string} name of the object you want to get
+        :return: {bytes} the object as it was stored, None when missing
+        """
+        key = name.encode()
+        key_hash = self._hash(key)
+        mapping = self._mapping()
+        for offset in self._bucket(key_hash):
+            slot = self._read(mapping, offset, key_hash)
+            if slot is None:
+                continue
+            slot_key, value, expires = slot
+            if slot_key != key:
+                continue
+            if expires and expires <= time.time():
+                return None
+            # the reference bit is only a hint for eviction, so it is set
+            # without taking the write lock
+            mapping[offset + 5] = 1
+            return value
+        return None
+
+    def set_many(self, mapping: dict, ex=None):
+        """
+        set several objects while holding the write lock once
+        :param mapping: {dict} names mapped to the objects you want to set
+        :param ex: {int} seconds before the objects expire, None to keep them
+        :return: {None}
+        """
+        with self._write_lock() as shared_map:
+            for name, data in mapping.items():
+                self._write(shared_map, name, data, ex)
+        return True
+
+    def increment(self, name):
+        """
+        :param name: {string} name of the counter you want to increment
+        :return: {int} the new value of the counter
+        """
+        with self._write_lock() as mapping:
+            value = int(self.get_raw(name) or 0) + 1
+            self._write(mapping, name, value, None)
+        return value
+
+    def increment_score(self, name, member, amount=1):
+        """
+        The sorted set is kept in a single slot; the members with the lowest
+        scores are dropped when it outgrows the slot
+        :param name: {string} name of the sorted set
+        :param member: {string} the member whose score is incremented
+        :param amount: {int} the amount to increment by
+        :return: {float} the new score of the member
+        """
+        with self._write_lock() as mapping:
+            scores = self.get(name) or {}
+            scores[member] = score = scores.get(member, 0) + amount
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            while ranked and not self._write(mapping, name, json.dumps(dict(ranked))):
+                ranked = ranked[: len(ranked) // 2]
+        return score
+
+    def top_members(self, name, count):
+        """
+        :param name: {string} name of the sorted set
+        :param count: {int} number of members to return
+        :return: {list} members with the highest scores, highest first
+        """
+        scores = self.get(name) or {}
+        return sorted(scores, key=scores.get, reverse=True)[:count]
+
+    def trim_members(self, name, count):
+        """
+        :param name: {string} name of the sorted set
+        :param count: {int} number of members to keep, those with the highest
+        scores
+        :return: {int} number of members removed
+        """
+        with self._write_lock() as mapping:
+            scores = self.get(name) or {}
+            if len(scores) <= count:
+                return 0
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            self._write(mapping, name, json.dumps(dict(ranked[:count])))
+        return len(scores) - count
+
+    def delete(self, *names):
+        """
+        :param names: {string} names of the objects you want to delete
+        :return: {None}
+        """
+        with self._write_lock() as mapping:
+            for name in names:
+                key = name.encode()
+                offset = self._find(mapping, key, self._hash(key))
+                if offset is not None:
+                    self._write_slot(mapping, offset, EMPTY, b"", b"", 0, 0)
+
+    def clear(self):
+        """
+        remove every object from the cache
+        :return: {None}
+        """
+        with self._write_lock() as mapping:
+            for index in range(self.slots):
+                offset = self.slots_offset + index * self.slot_size
+                if mapping[offset + 4] != EMPTY:
+                    self._write_slot(mapping, offset, EMPTY, b"", b"", 0, 0)
+
+    def _write(self, mapping, name, data, ex=None):
+        key = name.encode()
+        value = data if isinstance(data, bytes) else str(data).encode()
+        key_hash = self._hash(key)
+        offset = self._find(mapping, key, key_hash)
+        if SLOT_HEADER.size + len(key) + len(value) > self.slot_size:
+            metrics.increment("shared_memory_cache_oversized")
+            if offset is not None:
+                self._write_slot(mapping, offset, EMPTY, b"", b"", 0, 0)
+            return False
+        if offset is None:
+            offset = self._evict(mapping, key_hash)
+        expires = time.time() + ex if ex else 0
+        self._write_slot(mapping, offset, USED, key, value, expires, key_hash)
+        return True
+
+    def _write_slot(self, mapping, offset, state, key, value, expires, key_hash):
+        (sequence,) = SEQUENCE.unpack_from(mapping, offset)
+        SEQUENCE.pack_into(mapping, offset, (sequence + 1) & 0xFFFFFFFF)
+        data_offset = offset + SLOT_HEADER.size
+        mapping[data_offset : data_offset + len(key)] = key
+        mapping[data_offset + len(key) : data_offset + len(key) + len(value)] = value
+        SLOT_HEADER.pack_into(
+            mapping,
+            offset,
+            (sequence + 1) & 0xFFFFFFFF,
+            state,
+            0,
+            len(key),
+            len(value),
+            expires,
+            key_hash,
+        )
+        SEQUENCE.pack_into(mapping, offset, (sequence + 2) & 0xFFFFFFFF)
+
+    def _read(self, mapping, offset, key_hash):
+        """
+        copy a slot without locking
+        :return: {tuple} key, value and expiry of the slot, None when the slot
+        is empty or belongs to another hash
+        """
+        for _ in range(READ_RETRIES):
+            (
+                sequence,
+                state,
+                _,
+                key_length,
+                value_length,
+                expires,
+                slot_hash,
+            ) = SLOT_HEADER.unpack_from(mapping, offset)
+            if sequence & 1:
+                continue
+            if state != USED or slot_hash != key_hash:
+                data = None
+            else:
+                data_offset = offset + SLOT_HEADER.size
+                key_end = data_offset + key_length
+                data = (
+                    mapping[data_offset:key_end],
+                    mapping[key_end : key_end + value_length],
+                    expires,
+                )
+            if SEQUENCE.unpack_from(mapping, offset)[0] == sequence:
+                return data
+        # a writer kept the slot busy, read it under the lock instead
+        with self._write_lock() as locked_mapping:
+            (
+                _,
+                state,
+                _,
+                key_length,
+                value_length,
+                expires,
+                slot_hash,
+            ) = SLOT_HEADER.unpack_from(locked_mapping, offset)
+            if state != USED or slot_hash != key_hash:
+                return None
+            data_offset = offset + SLOT_HEADER.size
+            key_end = data_offset + key_length
+            return (
+                locked_mapping[data_offset:key_end],
+                locked_mapping[key_end : key_end + value_length],
+                expires,
+            )
+
+    def _find(self, mapping, key, key_hash):
+        """
+        :return: {int} offset of the slot holding the key, must hold the lock
+        """
+        for offset in self._bucket(key_hash):
+            _, state, _, key_length, _, _, slot_hash = SLOT_HEADER.unpack_from(
+                mapping, offset
+            )
+            if state != USED or slot_hash != key_hash:
+                continue
+            data_offset = offset + SLOT_HEADER.size
+            if mapping[data_offset : data_offset + key_length] == key:
+                return offset
+        return None
+
+    def _evict(self, mapping, key_hash):
+        """
+        pick the slot a new key is written to: an empty or expired slot of the
+        bucket if any, otherwise the CLOCK victim. Must hold the lock
+        """
+        now = time.time()
+        offsets = self._bucket(key_hash)
+        for offset in offsets:
+            _, state, _, _, _, expires, _ = SLOT_HEADER.unpack_from(mapping, offset)
+            if state != USED or (expires and expires <= now):
+                return offset
+
+        hand_offset = FILE_HEADER.size + key_hash % self.buckets
+        hand = mapping[hand_offset]
+        while True:
+            offset = offsets[hand]
+            hand = (hand + 1) % WAYS
+            if mapping[offset + 5]:
+                mapping[offset + 5] = 0
+                continue
+            mapping[hand_offset] = hand
+            metrics.increment("shared_memory_cache_evictions")
+            return offset
+
+    def _bucket(self, key_hash):
+        first = self.slots_offset + (key_hash % self.buckets) * WAYS * self.slot_size
+        return [first + way * self.slot_size for way in range(WAYS)]
+
+    @staticmethod
+    def _hash(key: bytes) -> int:
+        # the builtin hash is salted per process, so it cannot be shared
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+    def _mapping(self):
+        """
+        map the cache file, once per process. Locks taken with flock belong to
+        the open file, so a forked worker must open its own
+        """
+        if self._pid == os.getpid():
+            return self._map
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(fd, FILE_HEADER.size, 0)
+            expected = FILE_HEADER.pack(
+                FILE_MAGIC, LAYOUT_VERSION, self.slots, self.slot_size, WAYS
+            )
+            if header != expected or os.fstat(fd).st_size != self.size:
+                # unknown layout, start with an empty cache
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self.size)
+                os.pwrite(fd, expected, 0)
+            shared_map = mmap.mmap(fd, self.size, mmap.MAP_SHARED)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd, self._map, self._lock = fd, shared_map, threading.Lock()
+        self._pid = os.getpid()
+        return self._map
+
+    def _write_lock(self):
+        return _WriteLock(self)
+
+
+class _WriteLock:
+    """
+    serialise writers of the threads of the process with a mutex and writers of
+    other processes with flock on the cache file
+    """
+
+    def __init__(self, cache: SharedMemoryCacheService):
+        self.cache = cache
+        self.owned = False
+
+    def __enter__(self):
+        mapping = self.cache._mapping()
+        local = _held_locks.__dict__.setdefault("caches", set())
+        # reads that retry under the lock may happen while the thread writes
+        if id(self.cache) in local:
+            return mapping
+        self.cache._lock.acquire()
+        fcntl.flock(self.cache._fd, fcntl.LOCK_EX)
+        local.add(id(self.cache))
+        self.owned = True
+        return mapping
+
+    def __exit__(self, *exc_info):
+        if not self.owned:
+            return
+        _held_locks.caches.discard(id(self.cache))
+        fcntl.flock(self.cache._fd, fcntl.LOCK_UN)
+        self.cache._lock.release()
+
+
+_held_locks = threading.local()
@@ -0,0 +1,117 @@
+from flask import json
+
+from app.core.service_interfaces import CacheServiceInterface
+from config import Config
+
+
+class TieredCacheService(CacheServiceInterface):
+    """
+    Two-level cache: a cache local to the host in front of a cache shared by
+    every host. Reads are served from the local cache and fill it on a miss;
+    writes and deletes go to both levels.
+
+    Invalidations issued on another host only reach its own local cache, so
+    local entries expire after `local_ttl` seconds to bound how stale they get.
+
+    :param local_cache: {SharedMemoryCacheService} the first level cache
+    :param remote_cache: {RedisService} the second level cache
+    :param local_ttl: {int} seconds an object is kept in the local cache
+    """
+
+    def __init__(
+        self,
+        local_cache: CacheServiceInterface,
+        remote_cache: CacheServiceInterface,
+        local_ttl: int = Config.CACHE_SHARED_MEMORY_TTL,
+    ):
+        self.local_cache = local_cache
+        self.remote_cache = remote_cache
+        self.local_ttl = local_ttl
+
+    def set(self, name, data, ex=None):
+        """
+        :param name: {string} name of the object you want to set
+        :param data: {Any} the object you want to set
+        :param ex: {int} seconds before the object expires, None to keep it
+        :return: {bool}
+        """
+        self.local_cache.set(name, data, ex=self._local_expiry(ex))
+        return self.remote_cache.set(name, data, ex=ex)
+
+    def get(self, name):
+        """
+        :param name: {string} name of the object you want to get
+        :return: {Any}
+        """
+        data = self.get_raw(name)
+        if data:
+            return json.loads(data)
+        return data
+
+    def get_raw(self, name):
+        """
+        :param name: {string} name of the object you want to get
+        :return: {bytes} the object as it was stored, None when missing
+        """
+        data = self.local_cache.get_raw(name)
+        if data is None:
+            data = self.remote_cache.get_raw(name)
+            if data is not None:
+                self.local_cache.set(name, data, ex=self.local_ttl)
+        return data
+
+    def set_many(self, mapping: dict, ex=None):
+        """
+        :param mapping: {dict} names mapped to the objects you want to set
+        :param ex: {int} seconds before the objects expire, None to keep them
+        :return: {None}
+        """
+        self.local_cache.set_many(mapping, ex=self._local_expiry(ex))
+        return self.remote_cache.set_many(mapping, ex=ex)
+
+    def increment(self, name):
+        """
+        :param name: {string} name of the counter you want to increment
+        :return: {int} the new value of the counter
+        """
+        self.local_cache.delete(name)
+        value = self.remote_cache.increment(name)
+        self.local_cache.set(name, value, ex=self.local_ttl)
+        return value
+
+    def increment_score(self, name, member, amount=1):
+        """
+        :param name: {string} name of the sorted set, kept in the remote cache
+        :param member: {string} the member whose score is incremented
+        :param amount: {int} the amount to increment by
+        :return: {float} the new score of the member
+        """
+        return self.remote_cache.increment_score(name, member, amount)
+
+    def top_members(self, name, count):
+        """
+        :param name: {string} name of the sorted set, kept in the remote cache
+        :param count: {int} number of members to return
+        :return: {list} members with the highest scores, highest first
+        """
+        return self.remote_cache.top_members(name, count)
+
+    def trim_members(self, name, count):
+        """
+        :param name: {string} name of the sorted set, kept in the remote cache
+        :param count: {int} number of members to keep, those with the highest
+        scores
+        :return: {int} number of members removed
+        """
+        return self.remote_cache.trim_members(name, count)
+
+    def delete(self, *names):
+        """
+        :param names: {string} names of the objects you want to delete
+        :return: {None}
+        """
+        self.local_cache.delete(*names)
+        self.remote_cache.delete(*names)
+
+    def _local_expiry(self, ex):
+        return min(ex, self.local_ttl) if ex else self.local_ttl
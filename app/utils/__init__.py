@@ -1,4 +1,6 @@
 from .auth import auth_required
+from .bloom_filter import BloomFilter
+from .circuit_breaker import CircuitBreaker
 from .encoders import JSONEncoder
 from .guid import GUID
 from .validator import arg_validator, validator
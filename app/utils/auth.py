@@ -1,3 +1,7 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 
 import jwt
@@ -8,6 +12,69 @@ from app.core.exceptions import AppException
 from app.enums import TokenTypeEnum
 from config import Config
 
+# environ key holding the payload of the token checked for the request. Only the
+# server sets environ keys, so requests dispatched internally after the token
+# was checked, such as the operations of a batch, are not checked again
+TOKEN_PAYLOAD = "app.token_payload"
+
+
+class VerifiedTokenCache:
+    """
+    Payloads of the tokens whose signature was verified in this process, so a
+    client reusing its access token skips the verification until the token
+    expires. Tokens are keyed by their digest and only cached with an `exp`
+    claim; the least recently used one is dropped beyond `max_size`.
+
+    :param max_size: {int} tokens kept at most, 0 to disable the cache
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._payloads = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        """
+        :param token: {str} the encoded token
+        :return: {dict} the verified payload, None when the token is not cached
+        or expired
+        """
+        if not self.max_size:
+            return None
+        digest = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            cached = self._payloads.get(digest)
+            if cached is None:
+                return None
+            expires_at, payload = cached
+            if expires_at <= time.time():
+                del self._payloads[digest]
+                return None
+            self._payloads.move_to_end(digest)
+        return dict(payload)
+
+    def set(self, token: str, payload: dict):
+        """
+        :param token: {str} the encoded token
+        :param payload: {dict} its payload, verified by jwt.decode
+        """
+        expires_at = payload.get("exp")
+        if not self.max_size or not isinstance(expires_at, (int, float)):
+            return
+        digest = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._payloads[digest] = (expires_at, dict(payload))
+            self._payloads.move_to_end(digest)
+            while len(self._payloads) > self.max_size:
+                self._payloads.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+
+
+verified_tokens = VerifiedTokenCache(Config.JWT_CACHE_SIZE)
+
 
 def auth_required():
     def authorize_user(func):
@@ -19,15 +86,17 @@ def auth_required():
 
         @wraps(func)
         def view_wrapper(*args, **kwargs):
-            authorization_header = request.headers.get("Authorization")
-            if not authorization_header or len(authorization_header.split()) < 2:
+            if TOKEN_PAYLOAD in request.environ:
+                return func(*args, **kwargs)
+            credentials = request.headers.get("Authorization", "").split()
+            if len(credentials) < 2:
                 raise AppException.Unauthorized("missing authentication token")
-            token = authorization_header.split()[1]
-            payload = decode_token(token=token)
+            payload = decode_token(token=credentials[1])
             if payload.get("token_type") != TokenTypeEnum.access_token.value:
                 raise AppException.ValidationException(
                     error_message="token invalid. access token required"
                 )
+            request.environ[TOKEN_PAYLOAD] = payload
             return func(*args, **kwargs)
 
         return view_wrapper
@@ -36,13 +105,25 @@ def auth_required():
 
 
 def decode_token(token: str):
+    payload = verified_tokens.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        verified_tokens.set(token, payload)
+    if payload.get("jti") and Config.REVOCATION_ENABLED:
+        from app.services.revocation_service import revocation_service
+
+        if revocation_service.is_revoked(payload["jti"]):
+            raise AppException.Unauthorized("token revoked")
+    return payload
+
+
+def verify_token(token: str):
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token,
             key=Config.SECRET_KEY,
             algorithms=Config.JWT_ALGORITHMS,
         )
-        return payload
     except ExpiredSignatureError as e:
         raise AppException.ExpiredTokenException(error_message=e.args)
     except InvalidTokenError as e:
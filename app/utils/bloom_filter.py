@@ -0,0 +1,39 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    A set answering membership with false positives but never false
+    negatives, in a fixed number of bits whatever the size of its items.
+
+    :param capacity: {int} items the filter is sized for
+    :param error_rate: {float} rate of false positives once `capacity` items
+    were added
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        assert capacity > 0, "capacity must be positive"
+        assert 0 < error_rate < 1, "error rate must be between 0 and 1"
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+
+    def _positions(self, item: str):
+        # double hashing, k positions derived from two 64 bit hashes
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + index * second) % self.size for index in range(self.hash_count)
+        )
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
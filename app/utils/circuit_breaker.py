@@ -0,0 +1,89 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker guarding calls to an unreliable backend.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    `allow_request` returns False without touching the backend. Once
+    `reset_timeout` seconds have elapsed a single probe is run in a background
+    thread; the circuit closes when the probe succeeds and stays open for another
+    cool-down period when it fails, so callers never wait on a dead backend.
+
+    :param failure_threshold: {int} consecutive failures before the circuit opens
+    :param reset_timeout: {float} seconds to wait before probing the backend
+    :param probe: {callable} raises an exception when the backend is unhealthy
+    :param name: {str} name of the guarded backend used in log messages
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, probe, name=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.name = name or "backend"
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_thread = None
+
+    @property
+    def state(self):
+        return self.CLOSED if self._opened_at is None else self.OPEN
+
+    def allow_request(self) -> bool:
+        """
+        returns True when the guarded call should be attempted. This is called on
+        every cache operation so the closed path does not take the lock
+        """
+        opened_at = self._opened_at
+        if opened_at is None:
+            return True
+        if time.monotonic() - opened_at >= self.reset_timeout:
+            self._start_probe()
+        return False
+
+    def record_success(self):
+        if self._failures:
+            with self._lock:
+                self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold and self._opened_at is None:
+                self._opened_at = time.monotonic()
+                logger.error(
+                    f"circuit opened for {self.name} after {self._failures} failures"
+                )
+
+    def reset(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def _start_probe(self):
+        with self._lock:
+            if self._probe_thread is not None:
+                return
+            self._probe_thread = threading.Thread(target=self._run_probe, daemon=True)
+        self._probe_thread.start()
+
+    def _run_probe(self):
+        try:
+            self.probe()
+        except Exception:  # noqa
+            with self._lock:
+                self._opened_at = time.monotonic()
+        else:
+            self.reset()
+        finally:
+            with self._lock:
+                self._probe_thread = None
@@ -1,23 +1,26 @@
 from functools import wraps
 
 from flask import request
+from marshmallow import ValidationError
 
 from app.core.exceptions import AppException
 
 
-def validator(schema):
+def validator(schema, arg: str = "data"):
+    # built once when the view is decorated, schemas are stateless
+    schema_instance = schema()
+
     def validate_data(func):
         """
-        A wrapper to validate data using marshmallow schema
+        A wrapper to validate and deserialize the request body using marshmallow
+        schema. The deserialized body is passed to the view as the `arg` keyword
+        argument
         :param func: {function} the function to wrap around
         """
 
         @wraps(func)
         def view_wrapper(*args, **kwargs):
-            errors = schema().validate(request.json)
-            if errors:
-                raise AppException.ValidationException(error_message=errors)
-
+            kwargs[arg] = load(schema_instance, request.json)
             return func(*args, **kwargs)
 
         return view_wrapper
@@ -26,9 +29,14 @@ def validator(schema):
 
 
 def arg_validator(schema, param):
+    params = param.split("|")
+    schema_instance = schema(only=params)
+
     def validate_args(func):
         """
-        A wrapper to validate uuid using marshmallow schema
+        A wrapper to validate and deserialize the path or query arguments using
+        marshmallow schema. Each argument in `param` is passed to the view as a
+        keyword argument of the type of its schema field
         :param func: {function} the function to wrap around
         """
 
@@ -38,14 +46,21 @@ def arg_validator(schema, param):
                 request_parameters: dict = request.view_args
             else:
                 request_parameters: dict = request.args
-            errors = schema().validate(
-                {arg: request_parameters.get(arg) for arg in param.split("|")}
+            kwargs.update(
+                load(
+                    schema_instance,
+                    {arg: request_parameters.get(arg) for arg in params},
+                )
             )
-            if errors:
-                raise AppException.ValidationException(error_message=errors)
-
             return func(*args, **kwargs)
 
         return view_wrapper
 
     return validate_args
+
+
+def load(schema_instance, data):
+    try:
+        return schema_instance.load(data)
+    except ValidationError as e:
+        raise AppException.ValidationException(error_message=e.messages)
@@ -0,0 +1,71 @@
+"""
+Measure the overhead auth_required adds to a request, with and without the
+cache of verified tokens, and with the revocation check on top. The check
+runs against REDIS_SERVER, or an in-process fake when it is not set.
+
+    python benchmarks/bench_auth.py --repeat 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app  # noqa: E402
+from app.enums import TokenTypeEnum  # noqa: E402
+from app.services import AuthService  # noqa: E402
+from app.services import redis_service  # noqa: E402
+from app.utils import auth  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    if not Config.REDIS_SERVER:
+        import fakeredis
+
+        redis_service.redis_conn = fakeredis.FakeStrictRedis()
+    app = create_app("config.TestingConfig")
+    token = AuthService().generate_token(
+        user_id=str(uuid.uuid4()),
+        token_type=TokenTypeEnum.access_token.value,
+        expiration=datetime.utcnow() + timedelta(hours=1),
+    )
+    view = auth.auth_required()(lambda: None)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def request():
+        with app.test_request_context(headers=headers):
+            view()
+
+    def context_only():
+        with app.test_request_context(headers=headers):
+            pass
+
+    overhead = min(timeit.repeat(context_only, number=args.repeat, repeat=3))
+    candidates = {
+        "no cache": (auth.VerifiedTokenCache(max_size=0), False),
+        "cache": (auth.VerifiedTokenCache(max_size=1024), False),
+        "revocation": (auth.VerifiedTokenCache(max_size=1024), True),
+    }
+    baseline = None
+    for name, (cache, revocation) in candidates.items():
+        auth.verified_tokens = cache
+        Config.REVOCATION_ENABLED = revocation
+        seconds = min(timeit.repeat(request, number=args.repeat, repeat=3))
+        per_call = (seconds - overhead) / args.repeat * 1_000_000
+        baseline = baseline or per_call
+        print(
+            f"{name:<10} {per_call:8.2f} us auth overhead per request"
+            f"  ({baseline / per_call:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Measure the throughput of the event consumer, in events per second, with
+handlers waiting on I/O for --io-ms each. Ids of handled events are kept in
+REDIS_SERVER, or an in-process fake when it is not set.
+
+    python benchmarks/bench_consumer.py --events 5000 --keys 100 --io-ms 1
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app  # noqa: E402
+from app.consumer import InMemorySource, ParallelConsumer  # noqa: E402
+from app.producer import BufferedProducer, InMemoryBroker  # noqa: E402
+from app.services import RedisService, redis_service  # noqa: E402
+from config import Config  # noqa: E402
+
+
+class SleepingHandler:
+    def __init__(self, io_seconds):
+        self.io_seconds = io_seconds
+
+    def event_handler(self, event_data):
+        time.sleep(self.io_seconds)
+
+
+def publish(events, keys):
+    broker = InMemoryBroker()
+    producer = BufferedProducer(broker, buffer_size=events, batch_size=500, linger=0)
+    for index in range(events):
+        producer.send(
+            "BENCHMARK",
+            {"details": {}, "meta": {"event_id": uuid.uuid4().hex}},
+            key=f"key-{index % keys}",
+        )
+    producer.flush()
+    return broker
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--keys", type=int, default=100)
+    parser.add_argument("--io-ms", type=float, default=1)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    if not Config.REDIS_SERVER:
+        import fakeredis
+
+        redis_service.redis_conn = fakeredis.FakeStrictRedis()
+    app = create_app("config.TestingConfig")
+    broker = publish(args.events, args.keys)
+    batches = -(-args.events // args.batch_size)
+
+    baseline = None
+    for workers in args.workers:
+        consumer = ParallelConsumer(
+            app,
+            InMemorySource(broker, ["BENCHMARK"]),
+            handler_factory=lambda: SleepingHandler(args.io_ms / 1000),
+            dedup_store=RedisService(),
+            workers=workers,
+            batch_size=args.batch_size,
+            poll_timeout=0,
+        )
+        redis_service.redis_conn.flushdb()
+        started = time.perf_counter()
+        consumer.run(max_batches=batches)
+        rate = args.events / (time.perf_counter() - started)
+        baseline = baseline or rate
+        print(f"{workers:>3} workers {rate:10.0f} events/s  ({rate / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
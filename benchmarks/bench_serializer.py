@@ -0,0 +1,63 @@
+"""
+Compare the compiled serializer with marshmallow when dumping a list page.
+
+    python benchmarks/bench_serializer.py --rows 100 --repeat 200
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.serializer import get_serializer  # noqa: E402
+from app.models import ResourceModel  # noqa: E402
+from app.schema import ResourceSchema  # noqa: E402
+
+
+def build_rows(count):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        ResourceModel(
+            id=uuid.uuid4(),
+            title=f"title {index}",
+            content="content " * 20,
+            created=now,
+            modified=now,
+        )
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    serializer = get_serializer(ResourceSchema)
+    assert json.loads(serializer.dumps(rows, many=True)) == json.loads(
+        ResourceSchema(many=True).dumps(rows)
+    ), "compiled serializer output differs from marshmallow"
+
+    candidates = {
+        "marshmallow": lambda: ResourceSchema(many=True).dumps(rows),
+        "compiled": lambda: serializer.dumps(rows, many=True),
+    }
+    baseline = None
+    for name, candidate in candidates.items():
+        seconds = min(timeit.repeat(candidate, number=args.repeat, repeat=3))
+        per_call = seconds / args.repeat * 1000
+        baseline = baseline or per_call
+        print(
+            f"{name:<12} {per_call:8.3f} ms per {args.rows} rows"
+            f"  ({baseline / per_call:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
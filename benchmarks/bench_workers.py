@@ -0,0 +1,163 @@
+"""
+Compare the gunicorn worker models under concurrent load. Each model is
+started with gunicorn.conf.py and the GUNICORN_* variables, then hammered by
+keep-alive clients for a fixed time. Postgres and Redis must be reachable with
+the settings of the env file.
+
+    python benchmarks/bench_workers.py --models sync gthread gevent uvicorn \
+        --workers 2 --concurrency 32 --duration 20 \
+        --path "/api/v1/resource/?page=1&per_page=20"
+"""
+import argparse
+import datetime
+import http.client
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import jwt
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from app.enums import TokenTypeEnum  # noqa: E402
+from config import Config  # noqa: E402
+
+# worker models needing an optional dependency, by the extra installing it
+EXTRAS = {"gevent": "gevent", "uvicorn": "asgi"}
+
+
+def access_token():
+    payload = {
+        "id": str(uuid.uuid4()),
+        "token_type": TokenTypeEnum.access_token.value,
+        "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=1),
+    }
+    return jwt.encode(payload, key=Config.SECRET_KEY, algorithm=Config.JWT_ALGORITHMS)
+
+
+def start_server(app, model, workers, threads, port, max_requests):
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_WORKER_CLASS=model,
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_MAX_REQUESTS=str(max_requests),
+        GUNICORN_LOG_LEVEL="warning",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+        + ([app] if app else []),
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError(
+                    f"gunicorn exited with {server.returncode}"
+                ) from None
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("gunicorn did not start in 30 seconds")
+
+
+def run_load(port, path, headers, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        own_latencies, own_errors = [], 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    own_errors += 1
+            except (OSError, http.client.HTTPException):
+                own_errors += 1
+                connection.close()
+                continue
+            own_latencies.append(time.perf_counter() - started)
+        connection.close()
+        with lock:
+            latencies.extend(own_latencies)
+            errors[0] += own_errors
+
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return latencies, errors[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--models", nargs="+", default=["sync", "gthread", "gevent", "uvicorn"]
+    )
+    # app.wsgi, or app.asgi for uvicorn, unless an app is given for every model
+    parser.add_argument("--app")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=Config.GUNICORN_THREADS)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--path", default="/api/v1/resource/?page=1&per_page=20")
+    parser.add_argument("--port", type=int, default=5055)
+    # recycled workers drop their keep-alive connections, which shows up as
+    # errors, so recycling is off unless it is measured on purpose
+    parser.add_argument("--max-requests", type=int, default=0)
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {access_token()}"}
+    print(
+        f"{args.workers} workers, {args.concurrency} clients, "
+        f"{args.duration:.0f}s on {args.path}"
+    )
+    print(f"{'model':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for model in args.models:
+        if importlib.util.find_spec(model) is None and model in EXTRAS:
+            print(f"{model:<10} skipped, install the {EXTRAS[model]} extra")
+            continue
+        server = start_server(
+            args.app, model, args.workers, args.threads, args.port, args.max_requests
+        )
+        try:
+            # let every worker warm up before measuring
+            run_load(args.port, args.path, headers, args.concurrency, 2)
+            latencies, errors = run_load(
+                args.port, args.path, headers, args.concurrency, args.duration
+            )
+        finally:
+            server.terminate()
+            server.wait()
+        if len(latencies) < 2:
+            print(f"{model:<10} no successful requests, {errors} errors")
+            continue
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{model:<10} {len(latencies) / args.duration:>9.1f} "
+            f"{percentiles[49] * 1000:>8.2f} {percentiles[98] * 1000:>8.2f} "
+            f"{errors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 from datetime import datetime, timedelta
 
 from dotenv import load_dotenv
@@ -26,6 +27,156 @@ class Config:
     REDIS_SERVER = os.getenv("REDIS_SERVER")
     REDIS_PORT = os.getenv("REDIS_PORT")
     REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", default=0.25))
+    REDIS_SOCKET_CONNECT_TIMEOUT = float(
+        os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", default=0.25)
+    )
+    REDIS_CIRCUIT_FAILURE_THRESHOLD = int(
+        os.getenv("REDIS_CIRCUIT_FAILURE_THRESHOLD", default=5)
+    )
+    REDIS_CIRCUIT_RESET_TIMEOUT = float(
+        os.getenv("REDIS_CIRCUIT_RESET_TIMEOUT", default=30)
+    )
+
+    # CACHE
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", default="redis")
+    CACHE_SHARED_MEMORY_PATH = os.getenv(
+        "CACHE_SHARED_MEMORY_PATH",
+        default=os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+            "flask_postgres_backend.cache",
+        ),
+    )
+    CACHE_SHARED_MEMORY_SLOTS = int(
+        os.getenv("CACHE_SHARED_MEMORY_SLOTS", default=4096)
+    )
+    CACHE_SHARED_MEMORY_SLOT_SIZE = int(
+        os.getenv("CACHE_SHARED_MEMORY_SLOT_SIZE", default=4096)
+    )
+    CACHE_SHARED_MEMORY_TTL = int(os.getenv("CACHE_SHARED_MEMORY_TTL", default=5))
+    CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", default=300))
+    CACHE_WRITE_BEHIND = os.getenv("CACHE_WRITE_BEHIND", default="false") == "true"
+    CACHE_WRITE_BEHIND_WORKERS = int(os.getenv("CACHE_WRITE_BEHIND_WORKERS", default=2))
+    CACHE_WRITE_BEHIND_QUEUE_SIZE = int(
+        os.getenv("CACHE_WRITE_BEHIND_QUEUE_SIZE", default=1000)
+    )
+    CACHE_TRACK_HOT_KEYS = os.getenv("CACHE_TRACK_HOT_KEYS", default="false") == "true"
+    CACHE_ACCESS_LOG_SIZE = int(os.getenv("CACHE_ACCESS_LOG_SIZE", default=10000))
+    CACHE_WARM_ON_START = os.getenv("CACHE_WARM_ON_START", default="false") == "true"
+    CACHE_WARM_SOURCE = os.getenv("CACHE_WARM_SOURCE", default="recency")
+    CACHE_WARM_LIMIT = int(os.getenv("CACHE_WARM_LIMIT", default=1000))
+    CACHE_WARM_BATCH_SIZE = int(os.getenv("CACHE_WARM_BATCH_SIZE", default=100))
+    CACHE_WARM_RATE_LIMIT = float(os.getenv("CACHE_WARM_RATE_LIMIT", default=500))
+
+    # SERVER
+    GUNICORN_BIND = os.getenv("GUNICORN_BIND", default="0.0.0.0:5000")
+    GUNICORN_WORKER_CLASS = os.getenv("GUNICORN_WORKER_CLASS", default="sync")
+    GUNICORN_WORKERS = int(os.getenv("GUNICORN_WORKERS", default=0))
+    GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", default=4))
+    GUNICORN_WORKER_CONNECTIONS = int(
+        os.getenv("GUNICORN_WORKER_CONNECTIONS", default=100)
+    )
+    GUNICORN_PRELOAD = os.getenv("GUNICORN_PRELOAD", default="true") == "true"
+    GUNICORN_MAX_REQUESTS = int(os.getenv("GUNICORN_MAX_REQUESTS", default=1000))
+    GUNICORN_MAX_REQUESTS_JITTER = int(
+        os.getenv("GUNICORN_MAX_REQUESTS_JITTER", default=100)
+    )
+    GUNICORN_TIMEOUT = int(os.getenv("GUNICORN_TIMEOUT", default=30))
+    GUNICORN_GRACEFUL_TIMEOUT = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", default=30))
+    GUNICORN_KEEPALIVE = int(os.getenv("GUNICORN_KEEPALIVE", default=5))
+    GUNICORN_LOG_LEVEL = os.getenv("GUNICORN_LOG_LEVEL", default="error")
+
+    # ASGI
+    ASGI_SERVER = os.getenv("ASGI_SERVER", default="uvicorn")
+    ASGI_BIND = os.getenv("ASGI_BIND", default="0.0.0.0:5000")
+    ASGI_THREADS = int(os.getenv("ASGI_THREADS", default=16))
+    ASGI_KEEPALIVE_TIMEOUT = int(os.getenv("ASGI_KEEPALIVE_TIMEOUT", default=5))
+    ASGI_HTTP2 = os.getenv("ASGI_HTTP2", default="false") == "true"
+    ASGI_CERTFILE = os.getenv("ASGI_CERTFILE")
+    ASGI_KEYFILE = os.getenv("ASGI_KEYFILE")
+
+    # WARM UP
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", default="true") == "true"
+    WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", default=2))
+    WARMUP_REDIS_CONNECTIONS = int(os.getenv("WARMUP_REDIS_CONNECTIONS", default=2))
+    WARMUP_REQUESTS = [
+        path for path in os.getenv("WARMUP_REQUESTS", default="").split("|") if path
+    ]
+
+    # COMPRESSION
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", default="true") == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", default=500))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", default=6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", default=5))
+
+    # STREAMING
+    STREAM_MIN_PAGE_SIZE = int(os.getenv("STREAM_MIN_PAGE_SIZE", default=500))
+    STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", default=100))
+
+    # ADMISSION CONTROL
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", default="true") == "true"
+    ADMISSION_BULKHEADS = os.getenv(
+        "ADMISSION_BULKHEADS", default="default=32|export=2"
+    )
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", default=0.5))
+    ADMISSION_REQUEST_START_HEADER = os.getenv(
+        "ADMISSION_REQUEST_START_HEADER", default="X-Request-Start"
+    )
+    ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", default=1))
+    ADMISSION_RATE_LIMIT = float(os.getenv("ADMISSION_RATE_LIMIT", default=0))
+    ADMISSION_RATE_BURST = int(os.getenv("ADMISSION_RATE_BURST", default=20))
+    # proxies in front of the app setting X-Forwarded-For, 0 when it is reached
+    # directly. Clients could spoof their address otherwise
+    PROXY_FIX_X_FOR = int(os.getenv("PROXY_FIX_X_FOR", default=0))
+
+    # REQUEST DEADLINE
+    REQUEST_DEADLINE_ENABLED = (
+        os.getenv("REQUEST_DEADLINE_ENABLED", default="true") == "true"
+    )
+    REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", default=10))
+    REQUEST_DEADLINE_HEADER = os.getenv(
+        "REQUEST_DEADLINE_HEADER", default="X-Request-Timeout"
+    )
+
+    # IDEMPOTENCY
+    IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", default="true") == "true"
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", default=86400))
+    IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", default=10))
+
+    # EVENTS
+    KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS")
+    PRODUCER_BUFFER_SIZE = int(os.getenv("PRODUCER_BUFFER_SIZE", default=10000))
+    PRODUCER_BATCH_SIZE = int(os.getenv("PRODUCER_BATCH_SIZE", default=500))
+    PRODUCER_LINGER_MS = float(os.getenv("PRODUCER_LINGER_MS", default=5))
+    PRODUCER_COMPRESSION = os.getenv("PRODUCER_COMPRESSION", default="lz4")
+    PRODUCER_DELIVERY_TIMEOUT = float(
+        os.getenv("PRODUCER_DELIVERY_TIMEOUT", default=10)
+    )
+
+    CONSUMER_GROUP = os.getenv("CONSUMER_GROUP", default=APP_NAME)
+    CONSUMER_TOPICS = [
+        topic for topic in os.getenv("CONSUMER_TOPICS", default="").split("|") if topic
+    ]
+    CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", default=8))
+    CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", default=500))
+    CONSUMER_POLL_TIMEOUT = float(os.getenv("CONSUMER_POLL_TIMEOUT", default=1))
+    CONSUMER_DEDUP_TTL = int(os.getenv("CONSUMER_DEDUP_TTL", default=86400))
+
+    # events are only published while `flask outbox_relay` runs
+    OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", default="false") == "true"
+    OUTBOX_RELAY_BATCH_SIZE = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", default=500))
+    OUTBOX_RELAY_POLL_INTERVAL = float(
+        os.getenv("OUTBOX_RELAY_POLL_INTERVAL", default=0.5)
+    )
+
+    # BATCH
+    BATCH_MAX_OPERATIONS = int(os.getenv("BATCH_MAX_OPERATIONS", default=100))
+
+    # API DOCS
+    API_DOCS_ENABLED = os.getenv("API_DOCS_ENABLED", default="true") == "true"
+    # built from the routes at startup unless set, see ProductionConfig
+    API_SPEC_FILE = os.getenv("API_SPEC_FILE")
+    API_SPEC_MAX_AGE = int(os.getenv("API_SPEC_MAX_AGE", default=86400))
 
     # General
     DEBUG = False
@@ -37,6 +188,18 @@ class Config:
 
     ACCESS_TOKEN_EXPIRATION = datetime.now() + timedelta(minutes=5)
     JWT_ALGORITHMS = "HS256"
+    # verified tokens cached by each process, 0 to verify every request
+    JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", default=4096))
+    REVOCATION_ENABLED = os.getenv("REVOCATION_ENABLED", default="true") == "true"
+    REVOCATION_BLOOM_CAPACITY = int(
+        os.getenv("REVOCATION_BLOOM_CAPACITY", default=100000)
+    )
+    REVOCATION_BLOOM_ERROR_RATE = float(
+        os.getenv("REVOCATION_BLOOM_ERROR_RATE", default=0.001)
+    )
+    REVOCATION_REFRESH_INTERVAL = float(
+        os.getenv("REVOCATION_REFRESH_INTERVAL", default=300)
+    )
 
     # MAIL CONFIGURATION
     MAIL_SERVER = os.getenv("MAIL_SERVER")
@@ -57,6 +220,13 @@ class Config:
         )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = True
+    # every thread or greenlet of a worker may hold a connection, size the pool
+    # with GUNICORN_THREADS or GUNICORN_WORKER_CONNECTIONS
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", default=5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", default=10)),
+        "pool_pre_ping": True,
+    }
 
 
 class DevelopmentConfig(Config):
@@ -70,6 +240,12 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
     DEVELOPMENT = False
+    API_DOCS_ENABLED = os.getenv("API_DOCS_ENABLED", default="false") == "true"
+    # written at build time by `flask openapi_spec`
+    API_SPEC_FILE = os.getenv(
+        "API_SPEC_FILE",
+        default=os.path.join(os.path.dirname(__file__), "instance", "openapi.json"),
+    )
     SQL_DB_HOST = os.getenv("DB_HOST")
     LOG_BACKTRACE = False
     LOG_LEVEL = "INFO"
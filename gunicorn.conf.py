@@ -0,0 +1,126 @@
+"""
+Gunicorn configuration, loaded with `gunicorn -c gunicorn.conf.py`. Every
+setting is read from Config so the worker model is chosen with the GUNICORN_*
+environment variables, see benchmarks/bench_workers.py to compare them.
+
+Workers are sync by default, oversubscribed to 2 * CPUs + 1, as before the
+worker model could be chosen. No I/O-bound comparison against Postgres and
+Redis was measured yet: run the benchmark against the backends of the target
+hosts before switching to gthread or gevent.
+"""
+import os
+import subprocess
+import sys
+
+from config import Config
+
+# the uvicorn worker serves app.asgi, Flask behind the WSGI middleware of uvicorn
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "gevent": "gevent",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+
+def available_cpus() -> int:
+    """
+    :return: {int} CPUs the process may run on, which is less than the CPUs of
+    the host when the container is pinned to some of them
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_workers(worker_model: str, cpus: int) -> int:
+    """
+    :param worker_model: {str} one of WORKER_CLASSES
+    :param cpus: {int} CPUs available to the server
+    :return: {int} number of workers when GUNICORN_WORKERS is not set. Sync
+    workers serve one request at a time, so they are oversubscribed to keep the
+    CPUs busy while they wait on I/O; threaded and evented workers already
+    overlap their I/O and only need one process per CPU
+    """
+    if worker_model == "sync":
+        return 2 * cpus + 1
+    return cpus + 1
+
+
+assert (
+    Config.GUNICORN_WORKER_CLASS in WORKER_CLASSES
+), f"GUNICORN_WORKER_CLASS must be one of {tuple(WORKER_CLASSES)}"
+
+worker_model = Config.GUNICORN_WORKER_CLASS
+bind = Config.GUNICORN_BIND
+worker_class = WORKER_CLASSES[worker_model]
+wsgi_app = "app.asgi:app" if worker_model == "uvicorn" else "app.wsgi:app"
+workers = Config.GUNICORN_WORKERS or default_workers(worker_model, available_cpus())
+threads = Config.GUNICORN_THREADS if worker_model == "gthread" else 1
+worker_connections = Config.GUNICORN_WORKER_CONNECTIONS
+# gevent patches the standard library when the worker starts, modules imported
+# by a preloaded app would keep the blocking versions
+preload_app = Config.GUNICORN_PRELOAD and worker_model != "gevent"
+# recycle workers to bound slow memory growth, the jitter keeps them from
+# restarting at the same time
+max_requests = Config.GUNICORN_MAX_REQUESTS
+max_requests_jitter = Config.GUNICORN_MAX_REQUESTS_JITTER
+timeout = Config.GUNICORN_TIMEOUT
+graceful_timeout = Config.GUNICORN_GRACEFUL_TIMEOUT
+keepalive = Config.GUNICORN_KEEPALIVE
+# the heartbeat file is written by every worker, keep it off the container disk
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+loglevel = Config.GUNICORN_LOG_LEVEL
+# gunicorn owns its loggers and writes them to stdout, app.core.log leaves them
+errorlog = "-"
+accesslog = "-"
+
+
+def when_ready(server):
+    """
+    preload the hottest resources into redis once the server is ready. The warm up
+    runs in a separate process so that workers are not delayed or forked while it
+    holds database and redis connections
+    """
+    server.log.info(
+        f"{workers} {worker_model} workers, {threads} threads, "
+        f"preload {'on' if preload_app else 'off'}"
+    )
+    if not Config.CACHE_WARM_ON_START:
+        return
+    server.log.info("warming cache in the background")
+    subprocess.Popen([sys.executable, "-m", "flask", "cache_warm"])
+
+
+def post_fork(server, worker):
+    """
+    a preloaded app was created in the master, so the worker must not reuse the
+    database and redis connections it opened. Evented workers also make
+    psycopg2 yield to other greenlets while it waits on Postgres
+    """
+    if worker_model == "gevent":
+        try:
+            from psycogreen.gevent import patch_psycopg
+
+            patch_psycopg()
+        except ImportError:
+            server.log.warning("psycogreen is not installed, queries block workers")
+    if not server.cfg.preload_app:
+        return
+    from app.core.warmup import reset_connections
+
+    app = server.app.wsgi()
+    # app.asgi wraps the Flask app in a middleware
+    reset_connections(getattr(app, "app", app))
+
+
+def post_worker_init(worker):
+    """
+    warm the worker up before it accepts its first request
+    """
+    if not Config.WARMUP_ENABLED:
+        return
+    from app.core.warmup import warm_up
+
+    elapsed = warm_up(getattr(worker.wsgi, "app", worker.wsgi))
+    worker.log.info(f"worker warmed up in {elapsed * 1000:.1f} ms")
@@ -2,4 +2,5 @@
 
 flask db upgrade
 
-gunicorn -b 0.0.0.0:5000 --log-level error --error-logfile - --access-logfile -  app.wsgi:app
+# the worker model, and app.wsgi or app.asgi, follow the GUNICORN_* variables
+exec gunicorn -c gunicorn.conf.py
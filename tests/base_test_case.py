@@ -11,7 +11,7 @@ from app.enums import TokenTypeEnum
 from app.models import ResourceModel
 from app.repositories import ResourceRepository
 from app.schema import ResourceSchema
-from app.services import AuthService
+from app.services import AuthService, RedisService
 from config import Config
 from tests.data import ResourceTestData
 
@@ -24,7 +24,7 @@ class BaseTestCase(TestCase):
         self.token_type = TokenTypeEnum.access_token.value
         self.headers = {"Authorization": f"Bearer {self.access_token}"}
         self.setup_patches()
-        self.instantiate_classes(self.redis)
+        self.instantiate_classes(RedisService())
         return app
 
     def instantiate_classes(self, redis_service):
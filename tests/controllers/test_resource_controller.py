@@ -23,9 +23,7 @@ class TestResourceController(BaseTestCase):
 
     @pytest.mark.controller
     def test_get_all_resource(self):
-        result = self.resource_controller.get_all_resources(
-            query_param={"page": 1, "per_page": 5}
-        )
+        result = self.resource_controller.get_all_resources(page=1, per_page=5)
         self.assertIsNotNone(result)
         self.assertIsInstance(result, Result)
         self.assert200(result)
@@ -33,6 +31,16 @@ class TestResourceController(BaseTestCase):
         self.assertTrue(result.value)
         self.assertIsInstance(result.value[0], ResourceModel)
 
+    @pytest.mark.controller
+    def test_stream_resources(self):
+        result = self.resource_controller.stream_resources(
+            page=1, per_page=5, chunk_size=1
+        )
+        self.assertIsInstance(result, Result)
+        self.assert200(result)
+        self.assertNotIsInstance(result.value, list)
+        self.assertEqual([obj.id for obj in result.value], [self.resource_model.id])
+
     @pytest.mark.controller
     def test_get_resource(self):
         result = self.resource_controller.get_resource(obj_id=self.resource_model.id)
@@ -97,7 +105,7 @@ class TestResourceController(BaseTestCase):
     def test_refresh_token(self):
         self.token_type = TokenTypeEnum.refresh_token.value
         result = self.resource_controller.get_refresh_token(
-            query_params={"refresh_token": self.refresh_token}
+            refresh_token=self.refresh_token
         )
         self.assertIsNotNone(result)
         self.assert200(result)
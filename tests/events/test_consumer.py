@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+
+import pytest
+
+from app.consumer import InMemorySource, Message, ParallelConsumer, build_event_handler
+from app.core.metrics import metrics
+from app.events import EventSubscriptionHandler
+from app.producer import BufferedProducer, InMemoryBroker
+from app.services import RedisService
+from tests.base_test_case import BaseTestCase
+
+
+class RecordingHandler:
+    lock = threading.Lock()
+
+    def __init__(self, handled: list, fail_on=None):
+        self.handled = handled
+        # sequences failing once each
+        self.fail_on = fail_on if fail_on is not None else set()
+
+    def event_handler(self, event_data: dict):
+        details = event_data["details"]
+        with self.lock:
+            failed = details["sequence"] in self.fail_on
+            self.fail_on.discard(details["sequence"])
+        if failed:
+            raise ValueError("handler failed")
+        time.sleep(random.random() / 1000)
+        with self.lock:
+            self.handled.append((details["customer_id"], details["sequence"]))
+
+
+class TestConsumer(BaseTestCase):
+    def publish(self, count: int, customers: int, keyed=True) -> InMemoryBroker:
+        broker = InMemoryBroker()
+        producer = BufferedProducer(broker, buffer_size=count, batch_size=50, linger=0)
+        for sequence in range(count):
+            customer_id = f"customer-{sequence % customers}"
+            producer.send(
+                "CUST_DEPOSIT",
+                {
+                    "details": {"customer_id": customer_id, "sequence": sequence},
+                    "meta": {"event_action": "cust_deposit", "event_id": f"{sequence}"},
+                },
+                key=customer_id if keyed else None,
+            )
+        self.assertTrue(producer.flush(timeout=5))
+        return broker
+
+    def consume(self, source, handled, batches, **kwargs):
+        consumer = ParallelConsumer(
+            self.app,
+            source,
+            handler_factory=lambda: RecordingHandler(handled, **kwargs),
+            dedup_store=RedisService(),
+            workers=4,
+            batch_size=40,
+            poll_timeout=0,
+        )
+        consumer.run(max_batches=batches)
+
+    def assertPerKeyOrder(self, handled: list, customers: int):
+        for customer in range(customers):
+            sequences = [
+                sequence
+                for customer_id, sequence in handled
+                if customer_id == f"customer-{customer}"
+            ]
+            self.assertEqual(sequences, sorted(sequences))
+
+    @pytest.mark.app
+    def test_per_key_order(self):
+        source = InMemorySource(self.publish(200, customers=7), ["CUST_DEPOSIT"])
+        handled = []
+        self.consume(source, handled, batches=5)
+
+        self.assertEqual(len(handled), 200)
+        self.assertPerKeyOrder(handled, customers=7)
+        self.assertEqual(sum(source.committed.values()), 200)
+
+    @pytest.mark.app
+    def test_unkeyed_events(self):
+        source = InMemorySource(
+            self.publish(200, customers=7, keyed=False), ["CUST_DEPOSIT"]
+        )
+        handled = []
+        self.consume(source, handled, batches=5)
+        # spread over the partitions instead of all in one
+        self.assertEqual(len(source.committed), source.partitions)
+        self.assertEqual(len(handled), 200)
+
+        # laned by the customer of the event, whatever the topic
+        event = {"details": {"customer_id": "customer-0"}}
+        self.assertEqual(Message("CUST_DEPOSIT", 0, 0, None, event).lane, "customer-0")
+        self.assertEqual(Message("CUST_REFUND", 1, 5, None, event).lane, "customer-0")
+        self.assertEqual(
+            Message("CUST_DEPOSIT", 2, 0, None, {}).lane, ("CUST_DEPOSIT", 2)
+        )
+
+    @pytest.mark.app
+    def test_redelivered_events_skipped(self):
+        source = InMemorySource(self.publish(80, customers=3), ["CUST_DEPOSIT"])
+        handled = []
+        self.consume(source, handled, batches=2)
+        duplicates = metrics.counter("consumer_duplicates")
+
+        # a consumer restarted before its last commit gets the batch again
+        source.committed = {}
+        source.rewind()
+        self.consume(source, handled, batches=2)
+        self.assertEqual(len(handled), 80)
+        self.assertEqual(metrics.counter("consumer_duplicates"), duplicates + 80)
+
+    @pytest.mark.app
+    def test_failed_events_retried(self):
+        source = InMemorySource(self.publish(10, customers=2), ["CUST_DEPOSIT"])
+        handled = []
+        failed = metrics.counter("consumer_failed")
+        self.consume(source, handled, batches=1, fail_on={4})
+        # the lane of customer-0 stops at the failed event
+        self.assertNotIn(("customer-0", 4), handled)
+        self.assertNotIn(("customer-0", 6), handled)
+        self.assertIn(("customer-1", 9), handled)
+        self.assertEqual(metrics.counter("consumer_failed"), failed + 1)
+        self.assertLess(sum(source.committed.values()), 10)
+        self.assertIsNone(self.redis.get("consumed:4"))
+
+        # delivered again from the failed event on
+        self.consume(source, handled, batches=1)
+        self.assertEqual(len(handled), 10)
+        self.assertPerKeyOrder(handled, customers=2)
+        self.assertEqual(sum(source.committed.values()), 10)
+
+    @pytest.mark.app
+    def test_consume_command(self):
+        handler = build_event_handler()
+        self.assertIsInstance(handler, EventSubscriptionHandler)
+        self.assertIsNot(build_event_handler(), handler)
+
+        result = self.app.test_cli_runner().invoke(args=["consume"])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("KAFKA_BOOTSTRAP_SERVERS", result.output)
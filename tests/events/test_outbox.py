@@ -0,0 +1,136 @@
+import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.core.metrics import metrics
+from app.core.repository import atomic
+from app.models import EventOutboxModel, ResourceModel
+from app.outbox import OutboxRelay, event_age
+from app.producer import BufferedProducer, InMemoryBroker
+from app.repositories import EventOutboxRepository
+from tests.base_test_case import BaseTestCase
+
+
+class FailingBroker(InMemoryBroker):
+    def send_batch(self, records: list):
+        raise ConnectionError("broker down")
+
+
+class TestOutbox(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.outbox_repository = EventOutboxRepository()
+        self.broker = InMemoryBroker()
+        self.producer = BufferedProducer(
+            self.broker, buffer_size=100, batch_size=10, linger=0
+        )
+
+    def relay(self, producer=None):
+        return OutboxRelay(
+            self.outbox_repository,
+            producer or self.producer,
+            batch_size=3,
+            poll_interval=0,
+            delivery_timeout=5,
+        )
+
+    def add_events(self, count: int):
+        for index in range(count):
+            self.outbox_repository.add_event(
+                "CUST_DEPOSIT", {"meta": {"event_id": f"{index}"}}, key="customer"
+            )
+
+    @pytest.mark.repository
+    def test_event_written_with_the_transaction(self):
+        with self.assertRaises(ValueError):
+            with atomic(db.session):
+                self.resource_repository.create(self.resource_test_data.create_resource)
+                self.outbox_repository.add_event("CUST_DEPOSIT", {"details": {}})
+                raise ValueError("write failed")
+        self.assertEqual(EventOutboxModel.query.count(), 0)
+        self.assertEqual(ResourceModel.query.count(), 1)
+
+        with atomic(db.session):
+            self.resource_repository.create(self.resource_test_data.create_resource)
+            self.outbox_repository.add_event("CUST_DEPOSIT", {"details": {}})
+        self.assertEqual(EventOutboxModel.query.count(), 1)
+
+        # committed on its own outside atomic
+        with self.assertLogs("app.repositories.event_outbox_repository", "WARNING"):
+            self.outbox_repository.add_event("CUST_DEPOSIT", {"details": {}})
+        self.assertEqual(EventOutboxModel.query.count(), 2)
+
+    @pytest.mark.app
+    def test_relay_publishes_in_order(self):
+        self.add_events(7)
+        relayed = metrics.counter("outbox_relayed")
+        self.relay().run(max_batches=4)
+
+        self.assertEqual(
+            [
+                message["meta"]["event_id"]
+                for message in self.broker.messages("CUST_DEPOSIT")
+            ],
+            [f"{index}" for index in range(7)],
+        )
+        self.assertEqual(EventOutboxModel.query.count(), 0)
+        self.assertEqual(metrics.counter("outbox_relayed"), relayed + 7)
+        self.assertEqual(metrics.gauge("outbox_lag_seconds"), 0)
+
+    @pytest.mark.app
+    def test_unacknowledged_events_kept(self):
+        self.add_events(2)
+        producer = BufferedProducer(
+            FailingBroker(), buffer_size=100, batch_size=10, linger=0
+        )
+        failed = metrics.counter("outbox_relay_failed")
+        self.assertEqual(self.relay(producer).relay_batch(), 0)
+        self.assertEqual(EventOutboxModel.query.count(), 2)
+        self.assertEqual(metrics.counter("outbox_relay_failed"), failed + 2)
+
+        self.assertEqual(self.relay().relay_batch(), 2)
+        self.assertEqual(EventOutboxModel.query.count(), 0)
+
+    @pytest.mark.app
+    def test_events_after_unacknowledged_kept(self):
+        self.add_events(3)
+        self.outbox_repository.add_event(
+            "CUST_DEPOSIT", {"meta": {"event_id": "other"}}, key="other"
+        )
+        relay = self.relay()
+        relay.batch_size = 10
+        send = self.producer.send
+
+        def fail_first(topic, value, key=None, on_delivery=None):
+            if value["meta"]["event_id"] == "0":
+                on_delivery(ConnectionError("broker down"), None)
+                return False
+            return send(topic, value, key=key, on_delivery=on_delivery)
+
+        with patch.object(self.producer, "send", fail_first):
+            self.assertEqual(relay.relay_batch(), 1)
+        # the events of the key after the failed one wait for it
+        self.assertEqual(
+            [
+                event.payload["meta"]["event_id"]
+                for event in EventOutboxModel.query.order_by(EventOutboxModel.id)
+            ],
+            ["0", "1", "2"],
+        )
+
+    @pytest.mark.app
+    def test_event_age(self):
+        event = EventOutboxModel(
+            created=datetime.datetime.utcnow() - datetime.timedelta(seconds=30)
+        )
+        self.assertAlmostEqual(event_age(event), 30, delta=1)
+
+    @pytest.mark.app
+    def test_relay_needs_a_broker(self):
+        self.add_events(1)
+        result = self.app.test_cli_runner().invoke(args=["outbox_relay"])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("KAFKA_BOOTSTRAP_SERVERS", result.output)
+        self.assertEqual(EventOutboxModel.query.count(), 1)
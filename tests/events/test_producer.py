@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app import create_app
+from app.core.metrics import metrics
+from app.producer import (
+    BufferedProducer,
+    InMemoryBroker,
+    build_producer,
+    get_producer,
+    publish_to_kafka,
+)
+from tests.base_test_case import BaseTestCase
+
+
+class BlockingBroker(InMemoryBroker):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def send_batch(self, records: list):
+        self.release.wait(5)
+        super().send_batch(records)
+
+
+class FailingBroker(InMemoryBroker):
+    def send_batch(self, records: list):
+        raise ConnectionError("broker down")
+
+
+class TestProducer(BaseTestCase):
+    @pytest.mark.app
+    def test_send_in_batches(self):
+        broker = InMemoryBroker()
+        producer = BufferedProducer(broker, buffer_size=100, batch_size=3, linger=60)
+        delivered = []
+        for index in range(4):
+            self.assertTrue(
+                producer.send(
+                    "TOPIC",
+                    {"index": index},
+                    key="resource",
+                    on_delivery=lambda error, record: delivered.append(error),
+                )
+            )
+        # the full batch is sent without waiting for the linger
+        deadline = time.monotonic() + 5
+        while not broker.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(broker.batches, [3])
+
+        self.assertTrue(producer.flush(timeout=5))
+        self.assertEqual(broker.batches, [3, 1])
+        self.assertEqual(
+            broker.messages("TOPIC"), [{"index": index} for index in range(4)]
+        )
+        self.assertEqual(delivered, [None] * 4)
+
+    @pytest.mark.app
+    def test_linger(self):
+        broker = InMemoryBroker()
+        producer = BufferedProducer(
+            broker, buffer_size=100, batch_size=100, linger=0.05
+        )
+        producer.send("TOPIC", {"index": 0})
+        producer.send("TOPIC", {"index": 1})
+        deadline = time.monotonic() + 5
+        while not broker.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(broker.batches, [2])
+
+    @pytest.mark.app
+    def test_full_buffer_drops_records(self):
+        broker = BlockingBroker()
+        producer = BufferedProducer(broker, buffer_size=2, batch_size=1, linger=0)
+        errors = []
+        dropped = metrics.counter("producer_dropped")
+        producer.send("TOPIC", {"index": 0})
+        deadline = time.monotonic() + 5
+        # wait for the first record to be taken by the blocked broker
+        while producer.depth and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(producer.send("TOPIC", {"index": 1}))
+        self.assertTrue(producer.send("TOPIC", {"index": 2}))
+        started = time.monotonic()
+        self.assertFalse(
+            producer.send(
+                "TOPIC",
+                {"index": 3},
+                on_delivery=lambda error, record: errors.append(error),
+            )
+        )
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertIsInstance(errors[0], BufferError)
+        self.assertEqual(metrics.counter("producer_dropped"), dropped + 1)
+
+        broker.release.set()
+        self.assertTrue(producer.flush(timeout=5))
+        self.assertEqual(len(broker.messages("TOPIC")), 3)
+
+    @pytest.mark.app
+    def test_delivery_errors(self):
+        producer = BufferedProducer(
+            FailingBroker(), buffer_size=10, batch_size=10, linger=0
+        )
+        errors = []
+        producer.send(
+            "TOPIC", {}, on_delivery=lambda error, record: errors.append(error)
+        )
+        self.assertTrue(producer.flush(timeout=5))
+        self.assertIsInstance(errors[0], ConnectionError)
+
+    @pytest.mark.app
+    def test_publish_to_kafka(self):
+        self.assertTrue(publish_to_kafka("PUBLISHED", {"details": {}}))
+        producer = get_producer()
+        self.assertIsInstance(producer.broker, InMemoryBroker)
+        self.assertTrue(producer.flush(timeout=5))
+        self.assertIn({"details": {}}, producer.broker.messages("PUBLISHED"))
+
+    @pytest.mark.app
+    def test_in_memory_broker_refused_in_production(self):
+        with patch.dict(os.environ, {"APP_ENV": "production"}):
+            with self.assertRaises(RuntimeError):
+                build_producer()
+            # the app does not start without a broker to publish its events to
+            with self.assertRaises(RuntimeError):
+                create_app("config.TestingConfig")
+        self.assertIsInstance(build_producer().broker, InMemoryBroker)
@@ -0,0 +1,128 @@
+import datetime
+import threading
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from app import db
+from app.core.metrics import metrics
+from app.core.repository import (
+    WriteBehindExecutor,
+    cache_version_key,
+    cache_write_behind,
+)
+from app.models import ResourceModel
+from app.repositories import ResourceRepository
+from app.services import RedisService
+from tests.base_test_case import BaseTestCase
+
+
+class TestResourceRepository(BaseTestCase):
+    @pytest.mark.repository
+    def test_write_invalidates_cache(self):
+        cache_key = f"resource_{self.resource_model.id}"
+        self.resource_repository.get_by_id(self.resource_model.id)
+        self.redis.set("all_resources", "[]")
+        self.assertIsNotNone(self.redis.get(cache_key))
+        self.resource_repository.update_by_id(
+            self.resource_model.id, self.resource_test_data.update_resource
+        )
+        self.assertIsNone(self.redis.get(cache_key))
+        self.assertIsNone(self.redis.get("all_resources"))
+
+    @pytest.mark.repository
+    def test_rollback_keeps_cache(self):
+        cache_key = f"resource_{self.resource_model.id}"
+        self.resource_repository.get_by_id(self.resource_model.id)
+        self.resource_model.title = "rolled back title"
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        self.assertIsNotNone(self.redis.get(cache_key))
+
+    @pytest.mark.repository
+    def test_write_behind_invalidates_cache(self):
+        self.app.config["CACHE_WRITE_BEHIND"] = True
+        cache_key = f"resource_{self.resource_model.id}"
+        self.resource_repository.get_by_id(self.resource_model.id)
+        self.resource_repository.delete_by_id(self.resource_model.id)
+        self.assertTrue(cache_write_behind.join(timeout=5))
+        self.assertIsNone(self.redis.get(cache_key))
+
+    @pytest.mark.repository
+    def test_write_behind_coalesces_keys(self):
+        executor = WriteBehindExecutor(
+            max_workers=1, max_queue_size=2, name="test_write_behind"
+        )
+        started, release = threading.Event(), threading.Event()
+        calls = []
+        executor.submit("blocking", lambda: started.set() or release.wait())
+        self.assertTrue(started.wait(timeout=5))
+        self.assertTrue(executor.submit("key", lambda: calls.append(1)))
+        self.assertTrue(executor.submit("key", lambda: calls.append(2)))
+        self.assertEqual(metrics.gauge("test_write_behind_queue_depth"), 1)
+        release.set()
+        self.assertTrue(executor.join(timeout=5))
+        self.assertEqual(calls, [2])
+        self.assertTrue(metrics.counter("test_write_behind_coalesced"))
+
+    @pytest.mark.repository
+    def test_warm_cache(self):
+        resource_repository = ResourceRepository(
+            redis_service=RedisService(), resource_schema=self.resource_schema
+        )
+        result = resource_repository.create(self.resource_test_data.create_resource)
+        self.resource_model.modified = datetime.datetime(2020, 1, 1)
+        db.session.commit()
+        self.redis.flushall()
+        count = resource_repository.warm_cache(limit=1, batch_size=1)
+        self.assertEqual(count, 1)
+        self.assertIsNotNone(self.redis.get(f"resource_{result.id}"))
+        self.assertIsNone(self.redis.get(f"resource_{self.resource_model.id}"))
+        self.assertIsNotNone(self.redis.get("all_resources"))
+
+        self.redis.flushall()
+        self.redis.zincrby("resource_access_log", 1, str(self.resource_model.id))
+        count = resource_repository.warm_cache(limit=5, source="access_log")
+        self.assertEqual(count, 1)
+        self.assertIsNotNone(self.redis.get(f"resource_{self.resource_model.id}"))
+
+    @pytest.mark.repository
+    @patch("app.repositories.resource_repository.Config.CACHE_ACCESS_LOG_SIZE", 2)
+    def test_warm_cache_trims_access_log(self):
+        members = [str(uuid.uuid4()) for _ in range(3)]
+        for score, member in enumerate(members):
+            self.redis.zincrby("resource_access_log", score + 1, member)
+        self.resource_repository.warm_cache(limit=1, source="access_log")
+        self.assertEqual(
+            self.redis.zrevrange("resource_access_log", 0, -1),
+            [member.encode() for member in reversed(members[1:])],
+        )
+
+    @pytest.mark.repository
+    def test_cache_warm_command(self):
+        result = self.app.test_cli_runner().invoke(args=["cache_warm", "-l", "5"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("warmed cache with 1 resources", result.output)
+        self.assertIsNotNone(self.redis.get(f"resource_{self.resource_model.id}"))
+
+    @pytest.mark.repository
+    def test_cached_queries(self):
+        hits = "resources.paginate.cache_hits"
+        hit_count = metrics.counter(hits)
+        result = self.resource_repository.paginate(page=1, per_page=5)
+        self.assertEqual(len(result), 1)
+        cached_result = self.resource_repository.paginate(page=1, per_page=5)
+        self.assertEqual(metrics.counter(hits), hit_count + 1)
+        self.assertEqual(cached_result[0].id, self.resource_model.id)
+        self.assertEqual(
+            self.resource_repository.find_all({"title": self.resource_model.title}),
+            self.resource_repository.find_all({"title": self.resource_model.title}),
+        )
+
+        self.resource_repository.create(self.resource_test_data.create_resource)
+        self.assertTrue(self.redis.get(cache_version_key(ResourceModel)))
+        result = self.resource_repository.paginate(page=1, per_page=5)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(metrics.counter(hits), hit_count + 1)
@@ -0,0 +1,90 @@
+import socket
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from app.core.deadline import DEADLINE
+from app.core.exceptions import AppException, HTTPException
+from app.services import RedisService
+from app.services.redis_service import DeadlineConnection, redis_circuit_breaker
+from app.utils import CircuitBreaker
+from tests.base_test_case import BaseTestCase
+
+
+class TestRedisService(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        redis_circuit_breaker.reset()
+        self.addCleanup(redis_circuit_breaker.reset)
+
+    @pytest.mark.service
+    def test_get_set_delete(self):
+        redis_service = RedisService()
+        self.assertTrue(redis_service.set("key", '{"title": "cached"}'))
+        self.assertEqual(redis_service.get("key"), {"title": "cached"})
+        redis_service.delete("key")
+        self.assertIsNone(redis_service.get("key"))
+
+    @pytest.mark.service
+    def test_circuit_opens_after_failures(self):
+        failing_conn = MagicMock()
+        failing_conn.get.side_effect = ConnectionError("redis down")
+        failing_conn.ping.side_effect = ConnectionError("redis down")
+        redis_service = RedisService()
+        with patch("app.services.redis_service.redis_conn", failing_conn):
+            for _ in range(redis_circuit_breaker.failure_threshold):
+                with self.assertRaises(HTTPException) as error:
+                    redis_service.get("key")
+                self.assertEqual(error.exception.code, 500)
+            self.assertEqual(redis_circuit_breaker.state, CircuitBreaker.OPEN)
+            with self.assertRaises(HTTPException) as error:
+                redis_service.get("key")
+            self.assertEqual(error.exception.code, 503)
+        self.assertEqual(
+            failing_conn.get.call_count, redis_circuit_breaker.failure_threshold
+        )
+
+    @pytest.mark.service
+    def test_command_timeout_capped_to_deadline(self):
+        # a server that never replies
+        client_socket, server_socket = socket.socketpair()
+        self.addCleanup(server_socket.close)
+        connection = DeadlineConnection(socket_timeout=5)
+        connection._sock = client_socket
+        connection._parser.on_connect(connection)
+        self.addCleanup(connection.disconnect)
+
+        def get():
+            connection.send_command("GET", "key")
+            return connection.read_response()
+
+        redis_service = RedisService()
+        with self.app.test_request_context(
+            environ_base={DEADLINE: time.monotonic() + 0.05}
+        ):
+            started = time.monotonic()
+            with self.assertRaises(AppException.DeadlineExceeded):
+                redis_service._execute(get, error="Error getting from cache")
+            self.assertLess(time.monotonic() - started, 1)
+        # the request ran out of time, redis is not down
+        self.assertEqual(redis_circuit_breaker._failures, 0)
+        # no reply is left on the connection for the next command
+        self.assertIsNone(connection._sock)
+
+    @pytest.mark.service
+    def test_circuit_closes_after_successful_probe(self):
+        probe = MagicMock()
+        circuit_breaker = CircuitBreaker(
+            failure_threshold=1, reset_timeout=0, probe=probe
+        )
+        circuit_breaker.record_failure()
+        self.assertEqual(circuit_breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(circuit_breaker.allow_request())
+        for _ in range(100):
+            if circuit_breaker.state == CircuitBreaker.CLOSED:
+                break
+            time.sleep(0.01)
+        probe.assert_called_once()
+        self.assertTrue(circuit_breaker.allow_request())
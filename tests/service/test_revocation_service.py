@@ -0,0 +1,90 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.redis_service import redis_circuit_breaker
+from app.services.revocation_service import REVOKED_TOKENS, RevocationService
+from tests.base_test_case import BaseTestCase
+
+
+class TestRevocationService(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        redis_circuit_breaker.reset()
+        self.addCleanup(redis_circuit_breaker.reset)
+
+    @pytest.mark.service
+    def test_revoke(self):
+        revocation_service = RevocationService(capacity=100, error_rate=0.01)
+        self.addCleanup(revocation_service.stop)
+        revocation_service.revoke("revoked", time.time() + 60)
+        self.assertTrue(revocation_service.is_revoked("revoked"))
+        self.assertFalse(revocation_service.is_revoked("valid"))
+
+        # tokens that expired anyway are not kept
+        revocation_service.revoke("expired", time.time() - 1)
+        self.assertFalse(revocation_service.is_revoked("expired"))
+        self.assertIsNone(self.redis.zscore(REVOKED_TOKENS, "expired"))
+
+    @pytest.mark.service
+    def test_revocations_of_other_processes(self):
+        self.redis.zadd(REVOKED_TOKENS, {"before": time.time() + 60, "old": 1})
+        worker = RevocationService(capacity=100, error_rate=0.01, sync_interval=0)
+        self.addCleanup(worker.stop)
+        self.assertTrue(worker.is_revoked("before"))
+        self.assertFalse(worker.is_revoked("old"))
+        self.assertIsNone(self.redis.zscore(REVOKED_TOKENS, "old"))
+
+        # received through pub/sub
+        RevocationService(capacity=100, error_rate=0.01).revoke(
+            "after", time.time() + 60
+        )
+        self.assertTrue(worker.is_revoked("after"))
+
+    @pytest.mark.service
+    def test_refreshed_in_background(self):
+        worker = RevocationService(
+            capacity=100, error_rate=0.01, refresh_interval=0.05, sync_interval=0
+        )
+        self.addCleanup(worker.stop)
+        self.assertFalse(worker.is_revoked("later"))
+        refresh = worker.refresh
+        threads = []
+
+        def record_refresh():
+            threads.append(threading.current_thread().name)
+            refresh()
+
+        worker.refresh = record_refresh
+        # added without a message, only a rebuild of the filter finds it
+        self.redis.zadd(REVOKED_TOKENS, {"later": time.time() + 60})
+        for _ in range(100):
+            if worker.is_revoked("later"):
+                break
+            time.sleep(0.01)
+        self.assertTrue(worker.is_revoked("later"))
+        # requests never rebuild the filter themselves
+        self.assertEqual(set(threads), {"revocation_refresh"})
+
+    @pytest.mark.service
+    def test_started_before_requests(self):
+        self.redis.zadd(REVOKED_TOKENS, {"before": time.time() + 60})
+        worker = RevocationService(
+            capacity=100, error_rate=0.01, sync_interval=0, reconnect_interval=0.05
+        )
+        self.addCleanup(worker.stop)
+        worker.start()
+        with patch.object(worker, "refresh", wraps=worker.refresh) as refresh:
+            self.assertTrue(worker.is_revoked("before"))
+            # a lost subscription is restored by the background thread
+            worker._close()
+            self.assertFalse(worker.is_revoked("before-reconnect"))
+            self.assertIsNone(worker._pubsub)
+            for _ in range(100):
+                if worker._pubsub is not None:
+                    break
+                time.sleep(0.01)
+        self.assertIsNotNone(worker._pubsub)
+        self.assertEqual(refresh.call_count, 1)
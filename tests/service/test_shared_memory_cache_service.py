@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+import pytest
+
+from app.services import (
+    RedisService,
+    SharedMemoryCacheService,
+    TieredCacheService,
+    get_cache_service,
+)
+from app.services.shared_memory_cache_service import WAYS
+from tests.base_test_case import BaseTestCase
+
+
+def write_from_child(path, slots, slot_size):
+    SharedMemoryCacheService(path, slots, slot_size).set("child", '{"pid": 1}')
+
+
+class TestSharedMemoryCacheService(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache")
+        self.cache = SharedMemoryCacheService(self.path, slots=64, slot_size=256)
+
+    @pytest.mark.service
+    def test_get_set_delete(self):
+        self.assertIsNone(self.cache.get("key"))
+        self.assertTrue(self.cache.set("key", '{"title": "cached"}'))
+        self.assertEqual(self.cache.get("key"), {"title": "cached"})
+        self.assertTrue(self.cache.set("key", '{"title": "updated"}'))
+        self.assertEqual(self.cache.get("key"), {"title": "updated"})
+        self.cache.set_many({"first": "1", "second": "2"})
+        self.assertEqual(self.cache.increment("first"), 2)
+        self.assertEqual(self.cache.increment("counter"), 1)
+        self.cache.delete("key", "first")
+        self.assertIsNone(self.cache.get("key"))
+        self.assertIsNone(self.cache.get("first"))
+        self.assertEqual(self.cache.get("second"), 2)
+
+    @pytest.mark.service
+    def test_expiry_and_oversized_objects(self):
+        self.cache.set("key", "1", ex=1)
+        self.assertEqual(self.cache.get("key"), 1)
+        self.cache.set("expired", "1", ex=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get("expired"))
+        self.assertFalse(self.cache.set("key", f'"{"x" * 256}"'))
+        self.assertIsNone(self.cache.get("key"))
+
+    @pytest.mark.service
+    def test_clock_eviction(self):
+        cache = SharedMemoryCacheService(self.path, slots=WAYS, slot_size=256)
+        for index in range(WAYS):
+            cache.set(f"key_{index}", str(index))
+        cache.get("key_0")
+        cache.set("new_key", "8")
+        self.assertEqual(cache.get("new_key"), 8)
+        self.assertEqual(cache.get("key_0"), 0)
+        self.assertEqual(
+            sum(cache.get(f"key_{index}") is None for index in range(WAYS)), 1
+        )
+
+    @pytest.mark.service
+    def test_shared_across_processes(self):
+        self.cache.set("parent", "1")
+        process = multiprocessing.get_context("fork").Process(
+            target=write_from_child, args=(self.path, 64, 256)
+        )
+        process.start()
+        process.join(timeout=10)
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(self.cache.get("child"), {"pid": 1})
+        self.assertEqual(SharedMemoryCacheService(self.path, 64, 256).get("parent"), 1)
+
+    @pytest.mark.service
+    def test_access_log(self):
+        self.cache.increment_score("log", "first")
+        self.cache.increment_score("log", "second", 2)
+        self.assertEqual(self.cache.top_members("log", 1), ["second"])
+        self.assertEqual(self.cache.trim_members("log", 1), 1)
+        self.assertEqual(self.cache.top_members("log", 5), ["second"])
+
+    @pytest.mark.service
+    def test_tiered_cache(self):
+        tiered = TieredCacheService(self.cache, RedisService(), local_ttl=60)
+        self.redis.set("remote", '{"title": "remote"}')
+        self.assertEqual(tiered.get("remote"), {"title": "remote"})
+        self.assertEqual(self.cache.get("remote"), {"title": "remote"})
+        tiered.set("key", "1")
+        self.assertEqual(self.redis.get("key"), b"1")
+        self.assertEqual(tiered.increment("key"), 2)
+        self.assertEqual(self.cache.get("key"), 2)
+        tiered.delete("key", "remote")
+        self.assertIsNone(self.cache.get("remote"))
+        self.assertIsNone(self.redis.get("key"))
+
+    @pytest.mark.service
+    def test_get_cache_service(self):
+        self.assertIsInstance(get_cache_service("redis"), RedisService)
+        self.assertIsInstance(get_cache_service("tiered"), TieredCacheService)
+        with self.assertRaises(ValueError):
+            get_cache_service("memcached")
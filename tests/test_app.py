@@ -1,5 +1,22 @@
+import os
+import runpy
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
 import pytest
+from flask import jsonify
 
+from app import APP_ROOT, create_app
+from app.api.api_v1.endpoints import resource_view
+from app.core.json_provider import OrjsonProvider
+from app.core.log import log_config
+from app.core.metrics import metrics
+from app.core.startup_profile import ImportTiming, parse_importtime
+from app.core.warmup import reset_connections, warm_up
+from app.services.revocation_service import RevocationService
+from config import Config, TestingConfig
 from tests.base_test_case import BaseTestCase
 
 
@@ -10,3 +27,130 @@ class TestAppConfig(BaseTestCase):
         self.assertTrue(self.create_app().config["TESTING"])
         self.assertTrue(self.create_app().config["DEVELOPMENT"])
         self.assertIsNotNone(self.create_app().config["SECRET_KEY"])
+
+    @pytest.mark.app
+    def test_json_provider(self):
+        self.assertIsInstance(self.app.json, OrjsonProvider)
+        response = jsonify(self.resource_model)
+        self.assertEqual(response.mimetype, "application/json")
+        data = self.app.json.loads(response.data)
+        self.assertEqual(data["id"], str(self.resource_model.id))
+        self.assertEqual(data["created"], self.resource_model.created.isoformat())
+
+    @pytest.mark.app
+    def test_api_spec(self):
+        with self.client:
+            response = self.client.get("/static/swagger.json")
+            self.assert200(response)
+            self.assertIn("/api/v1/resource/", response.json["paths"])
+            self.assertEqual(response.cache_control.max_age, Config.API_SPEC_MAX_AGE)
+            response = self.client.get(
+                "/static/swagger.json",
+                headers={"If-None-Match": response.headers["ETag"]},
+            )
+            self.assertStatus(response, 304)
+
+        with patch.object(TestingConfig, "API_DOCS_ENABLED", False):
+            app = create_app("config.TestingConfig")
+        self.assertNotIn("create_swagger_spec", app.view_functions)
+        self.assertNotIn("index", app.view_functions)
+
+    @pytest.mark.app
+    def test_openapi_spec_command(self):
+        # only production loads a document written beforehand
+        self.assertIsNone(self.app.config["API_SPEC_FILE"])
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "instance", "openapi.json")
+            result = self.app.test_cli_runner().invoke(
+                args=["openapi_spec", "--output", output]
+            )
+            self.assertEqual(result.exit_code, 0, result.output)
+            with open(output, "rb") as file:
+                self.assertEqual(file.read(), self.app.extensions["api_spec"].body)
+
+    @pytest.mark.app
+    def test_startup_mode(self):
+        with patch.object(Config, "MAIL_SERVER", None):
+            config = log_config()
+        self.assertNotIn("critical_mail_handler", config["handlers"])
+        self.assertNotIn("critical_mail_handler", config["loggers"]["root"]["handlers"])
+        with patch.object(Config, "MAIL_SERVER", "smtp.example.com"):
+            self.assertIn("critical_mail_handler", log_config()["handlers"])
+
+        timings = parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   app.core\n"
+            "import time:       300 |        420 | app\n"
+        )
+        self.assertEqual(timings[1], ImportTiming("app", 300, 420))
+        self.assertNotIn("healthcheck", self.app.extensions)
+
+        self.assertNotIn("migrate", self.app.extensions)
+        result = self.app.test_cli_runner().invoke(args=["db", "--help"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("upgrade", result.output)
+        self.assertIn("migrate", self.app.extensions)
+
+    @pytest.mark.app
+    def test_resource_controller_built_once(self):
+        with patch.object(resource_view, "_resource_controller", None), patch.object(
+            resource_view,
+            "build_resource_controller",
+            side_effect=lambda: time.sleep(0.05) or object(),
+        ) as build:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                controllers = set(
+                    executor.map(
+                        lambda _: resource_view.get_resource_controller(), range(4)
+                    )
+                )
+        self.assertEqual(len(controllers), 1)
+        self.assertEqual(build.call_count, 1)
+
+    @pytest.mark.app
+    def test_warm_up(self):
+        self.app.config["WARMUP_REQUESTS"] = ["/api/v1/resource/?page=1&per_page=5"]
+        requests = metrics.counter("warmup_requests")
+        revocations = RevocationService(capacity=100, error_rate=0.01)
+        self.addCleanup(revocations.stop)
+        with patch("app.services.revocation_service.revocation_service", revocations):
+            self.assertGreaterEqual(warm_up(self.app), 0)
+            # the filter is loaded before the first request
+            self.assertIsNotNone(revocations._pubsub)
+        self.assertEqual(metrics.counter("warmup_requests"), requests + 1)
+        self.assertIsNotNone(metrics.gauge("warmup_seconds"))
+        self.assertTrue(self.redis.keys("response:*"))
+
+        reset_connections(self.app)
+        self.assertEqual(self.redis.connection_pool._created_connections, 0)
+        response = self.client.get(
+            f"/api/v1/resource/{self.resource_model.id}", headers=self.headers
+        )
+        self.assert200(response)
+
+    @pytest.mark.app
+    def test_gunicorn_config(self):
+        config_file = os.path.join(APP_ROOT, "gunicorn.conf.py")
+        with patch.multiple(Config, GUNICORN_WORKER_CLASS="gevent", GUNICORN_WORKERS=0):
+            settings = runpy.run_path(config_file)
+        self.assertFalse(settings["preload_app"])
+        self.assertEqual(settings["threads"], 1)
+        self.assertEqual(settings["workers"], settings["available_cpus"]() + 1)
+        self.assertEqual(settings["default_workers"]("sync", 2), 5)
+
+        with patch.multiple(
+            Config, GUNICORN_WORKER_CLASS="gthread", GUNICORN_WORKERS=3
+        ):
+            settings = runpy.run_path(config_file)
+        self.assertTrue(settings["preload_app"])
+        self.assertEqual(settings["workers"], 3)
+        self.assertEqual(settings["threads"], Config.GUNICORN_THREADS)
+        self.assertEqual(settings["wsgi_app"], "app.wsgi:app")
+
+        with patch.object(Config, "GUNICORN_WORKER_CLASS", "uvicorn"):
+            settings = runpy.run_path(config_file)
+        self.assertEqual(settings["worker_class"], "uvicorn.workers.UvicornWorker")
+        self.assertEqual(settings["wsgi_app"], "app.asgi:app")
+
+        with patch.object(Config, "GUNICORN_WORKER_CLASS", "eventlet"):
+            self.assertRaises(AssertionError, runpy.run_path, config_file)
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from tests.base_test_case import BaseTestCase
+
+wsgi = pytest.importorskip("uvicorn.middleware.wsgi")
+
+
+class TestAsgi(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # app.asgi serves the app the same way
+        self.asgi_app = wsgi.WSGIMiddleware(self.app, workers=2)
+
+    def request(self, method, path, query=b"", headers=(), body=b""):
+        headers = [*headers, ("Content-Length", str(len(body)))]
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "root_path": "",
+            "query_string": query,
+            "headers": [
+                (name.lower().encode(), value.encode()) for name, value in headers
+            ],
+            "server": ("localhost", 5000),
+            "client": ("127.0.0.1", 50000),
+        }
+        messages = []
+
+        received = []
+
+        async def receive():
+            if received:
+                # the request was read, wait for the response
+                await asyncio.sleep(10)
+                return {"type": "http.disconnect"}
+            received.append(True)
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.asgi_app(scope, receive, send))
+        start = messages[0]
+        return (
+            start["status"],
+            {name.decode(): value.decode() for name, value in start["headers"]},
+            b"".join(message.get("body", b"") for message in messages[1:]),
+        )
+
+    @pytest.mark.app
+    def test_content_negotiation(self):
+        # a cached JSON page is not served to a client asking for NDJSON
+        self.assert200(self.client.get("/api/v1/resource/?page=1&per_page=5"))
+        status, headers, body = self.request(
+            "GET",
+            "/api/v1/resource/",
+            query=b"page=1&per_page=5",
+            headers=[("Accept", "application/x-ndjson")],
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/x-ndjson")
+        self.assertEqual(len(body.splitlines()), 1)
+        self.assertIn("Accept", headers["vary"])
+
+    @pytest.mark.app
+    def test_flask_fallback(self):
+        status, _, body = self.request(
+            "GET", "/api/v1/resource/", query=b"page=1&per_page=5"
+        )
+        self.assertEqual(status, 200)
+        self.assertEqual(len(self.app.json.loads(body)), 1)
+
+        status, _, body = self.request(
+            "POST",
+            "/api/v1/resource/",
+            headers=[("Content-Type", "application/json")],
+            body=self.app.json.dumps(self.resource_test_data.create_resource).encode(),
+        )
+        self.assertEqual(status, 201)
+
+        status, _, _ = self.request(
+            "PATCH", f"/api/v1/resource/{self.resource_model.id}"
+        )
+        self.assertEqual(status, 401)
+
+    @pytest.mark.app
+    def test_admission_control(self):
+        path = f"/api/v1/resource/{self.resource_model.id}"
+        self.assert200(self.client.get(path))
+        self.app.config["ADMISSION_QUEUE_TIMEOUT"] = 0
+        bulkheads, _ = self.app.extensions["admission_control"]
+        default = bulkheads["default"]
+        for _ in range(default.limit):
+            self.assertTrue(default.acquire(timeout=0))
+        self.addCleanup(lambda: [default.release() for _ in range(default.limit)])
+
+        # cached responses are admitted like any other request
+        status, _, _ = self.request("GET", path)
+        self.assertEqual(status, 503)
@@ -0,0 +1,46 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.auth import VerifiedTokenCache, decode_token, verified_tokens
+from tests.base_test_case import BaseTestCase
+
+
+class TestAuth(BaseTestCase):
+    @pytest.mark.app
+    def test_verified_tokens_cached(self):
+        self.addCleanup(verified_tokens.clear)
+        payload = {"token_type": self.token_type, "exp": int(time.time()) + 60}
+        with patch("app.utils.auth.jwt.decode", return_value=payload) as jwt_decode:
+            self.assertEqual(decode_token("token"), payload)
+            self.assertEqual(decode_token("token"), payload)
+            self.assertEqual(jwt_decode.call_count, 1)
+
+            # tokens without an expiry are verified every time
+            jwt_decode.return_value = {"token_type": self.token_type}
+            decode_token("no expiry")
+            decode_token("no expiry")
+            self.assertEqual(jwt_decode.call_count, 3)
+
+    @pytest.mark.app
+    def test_verified_token_cache(self):
+        cache = VerifiedTokenCache(max_size=2)
+        expires_at = time.time() + 60
+        for token in ("a", "b"):
+            cache.set(token, {"token": token, "exp": expires_at})
+        self.assertEqual(cache.get("a")["token"], "a")
+        cache.set("c", {"token": "c", "exp": expires_at})
+        # "b" was the least recently used
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+
+        cache.set("expired", {"exp": time.time() - 1})
+        self.assertIsNone(cache.get("expired"))
+
+        cache.get("a")["token"] = "changed"
+        self.assertEqual(cache.get("a")["token"], "a")
+
+        disabled = VerifiedTokenCache(max_size=0)
+        disabled.set("a", {"exp": expires_at})
+        self.assertIsNone(disabled.get("a"))
@@ -0,0 +1,19 @@
+import uuid
+
+import pytest
+
+from app.utils import BloomFilter
+from tests.base_test_case import BaseTestCase
+
+
+class TestBloomFilter(BaseTestCase):
+    @pytest.mark.app
+    def test_membership(self):
+        bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+        added = [uuid.uuid4().hex for _ in range(1000)]
+        for item in added:
+            bloom_filter.add(item)
+        self.assertTrue(all(item in bloom_filter for item in added))
+
+        false_positives = sum(uuid.uuid4().hex in bloom_filter for _ in range(10000))
+        self.assertLess(false_positives / 10000, 0.03)
@@ -0,0 +1,48 @@
+import datetime
+import json
+import uuid
+
+import pytest
+from marshmallow import Schema, fields, post_dump
+
+from app.core.serializer import get_serializer
+from app.models import ResourceModel
+from app.schema import ResourceSchema
+from tests.base_test_case import BaseTestCase
+
+
+class HookSchema(Schema):
+    title = fields.String()
+
+    @post_dump
+    def upper_title(self, data, **kwargs):
+        data["title"] = data["title"].upper()
+        return data
+
+
+class TestSerializer(BaseTestCase):
+    @pytest.mark.app
+    def test_output_matches_marshmallow(self):
+        resource = ResourceModel(
+            id=str(uuid.uuid4()).upper(),
+            title="title",
+            content=None,
+            created=datetime.datetime(2020, 1, 1, 12, 30, 15, 123),
+            modified=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+        objects = [self.resource_model, resource, {"title": "mapping"}]
+        serializer = get_serializer(ResourceSchema)
+        self.assertIs(serializer, get_serializer(ResourceSchema))
+        self.assertEqual(
+            json.loads(serializer.dumps(objects, many=True)),
+            json.loads(ResourceSchema(many=True).dumps(objects)),
+        )
+        self.assertEqual(
+            json.loads(serializer.dumps(resource)),
+            json.loads(ResourceSchema().dumps(resource)),
+        )
+
+    @pytest.mark.app
+    def test_schema_with_hooks_uses_marshmallow(self):
+        serializer = get_serializer(HookSchema)
+        self.assertEqual(serializer.dump(self.resource_model)["title"], "SAMPLE TITLE")
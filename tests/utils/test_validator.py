@@ -0,0 +1,19 @@
+import pytest
+
+from app.core.exceptions import AppException
+from app.schema import ResourceRequestArgumentSchema
+from app.utils import arg_validator
+from tests.base_test_case import BaseTestCase
+
+
+class TestValidator(BaseTestCase):
+    @pytest.mark.app
+    def test_arg_validator_injects_typed_arguments(self):
+        view = arg_validator(
+            schema=ResourceRequestArgumentSchema, param="page|per_page"
+        )(lambda page, per_page: (page, per_page))
+        with self.app.test_request_context("/?page=2&per_page=5"):
+            self.assertEqual(view(), (2, 5))
+        with self.app.test_request_context("/?page=two&per_page=5"):
+            with self.assertRaises(AppException.ValidationException):
+                view()
@@ -0,0 +1,147 @@
+import importlib.util
+import time
+from unittest.mock import patch
+
+import pytest
+from flask import url_for
+from redis.exceptions import ConnectionError
+
+from app import create_app
+from app.core.admission import queued_for, rate_limit_client
+from app.core.exceptions import AppException
+from app.core.metrics import metrics
+from app.services import RateLimitService
+from app.services.redis_service import redis_circuit_breaker
+from config import TestingConfig
+from tests.base_test_case import BaseTestCase
+
+# fakeredis runs Lua scripts with lupa
+requires_lua = pytest.mark.skipif(
+    importlib.util.find_spec("lupa") is None, reason="lupa is not installed"
+)
+
+
+class TestAdmissionRoutes(BaseTestCase):
+    @pytest.mark.views
+    def test_bulkheads(self):
+        self.app.config["ADMISSION_QUEUE_TIMEOUT"] = 0
+        bulkheads, _ = self.app.extensions["admission_control"]
+        export = bulkheads["export"]
+        for _ in range(export.limit):
+            self.assertTrue(export.acquire(timeout=0))
+        self.addCleanup(lambda: [export.release() for _ in range(export.limit)])
+
+        shed = metrics.counter("admission_shed_over_capacity.export")
+        with self.client:
+            response = self.client.get(
+                url_for("resource.get_all_resources"),
+                query_string={
+                    "page": 1,
+                    "per_page": TestingConfig.STREAM_MIN_PAGE_SIZE,
+                },
+            )
+            self.assertStatus(response, 503)
+            self.assertEqual(response.headers["Retry-After"], "1")
+            self.assertEqual(
+                metrics.counter("admission_shed_over_capacity.export"), shed + 1
+            )
+            # requests of the other bulkheads are still served
+            response = self.client.get(
+                url_for("resource.get_all_resources"),
+                query_string={"page": 1, "per_page": 5},
+            )
+            self.assert200(response)
+        self.assertEqual(bulkheads["default"].in_flight, 0)
+
+    @pytest.mark.views
+    @requires_lua
+    def test_rate_limit(self):
+        with patch.multiple(
+            TestingConfig, ADMISSION_RATE_LIMIT=0.5, ADMISSION_RATE_BURST=2
+        ):
+            app = create_app("config.TestingConfig")
+        shed = metrics.counter("admission_shed_rate_limited")
+        with app.test_client() as client:
+            path = f"/api/v1/resource/{self.resource_model.id}"
+            self.assert200(client.get(path))
+            self.assert200(client.get(path))
+            response = client.get(path)
+            self.assertStatus(response, 429)
+            self.assertEqual(response.headers["Retry-After"], "2")
+        self.assertEqual(metrics.counter("admission_shed_rate_limited"), shed + 1)
+
+    @pytest.mark.views
+    def test_queued_requests_shed(self):
+        path = f"/api/v1/resource/{self.resource_model.id}"
+        shed = metrics.counter("admission_shed_queued")
+        with self.client:
+            response = self.client.get(
+                path, headers={"X-Request-Start": f"t={time.time() - 1:.3f}"}
+            )
+            self.assertStatus(response, 503)
+            self.assertEqual(response.headers["Retry-After"], "1")
+            response = self.client.get(
+                path, headers={"X-Request-Start": f"t={time.time():.3f}"}
+            )
+            self.assert200(response)
+        self.assertEqual(metrics.counter("admission_shed_queued"), shed + 1)
+
+    @pytest.mark.app
+    def test_queued_for(self):
+        now = time.time()
+        self.assertAlmostEqual(queued_for(f"t={now - 2:.3f}"), 2, delta=0.1)
+        self.assertAlmostEqual(queued_for(str(int((now - 2) * 1000))), 2, delta=0.1)
+        self.assertAlmostEqual(queued_for(str(int((now - 2) * 1000000))), 2, delta=0.1)
+        self.assertEqual(queued_for(f"{now + 5}"), 0)
+        self.assertEqual(queued_for("soon"), 0)
+
+    @pytest.mark.app
+    def test_rate_limit_client(self):
+        headers = {"Authorization": "Bearer token"}
+        with self.app.test_request_context(
+            headers=headers, environ_base={"REMOTE_ADDR": "10.0.0.1"}
+        ):
+            with patch("app.utils.auth.decode_token", return_value={"id": "1"}):
+                self.assertEqual(rate_limit_client(), "user:1")
+            with patch(
+                "app.utils.auth.decode_token",
+                side_effect=AppException.Unauthorized("token revoked"),
+            ):
+                self.assertEqual(rate_limit_client(), "addr:10.0.0.1")
+
+    @pytest.mark.views
+    @requires_lua
+    def test_rate_limit_per_forwarded_client(self):
+        with patch.multiple(
+            TestingConfig,
+            ADMISSION_RATE_LIMIT=0.5,
+            ADMISSION_RATE_BURST=1,
+            PROXY_FIX_X_FOR=1,
+        ):
+            app = create_app("config.TestingConfig")
+        with app.test_client() as client:
+            path = f"/api/v1/resource/{self.resource_model.id}"
+            first = {"X-Forwarded-For": "203.0.113.1"}
+            self.assert200(client.get(path, headers=first))
+            self.assertStatus(client.get(path, headers=first), 429)
+            # requests of other clients through the same proxy are served
+            second = {"X-Forwarded-For": "203.0.113.2"}
+            self.assert200(client.get(path, headers=second))
+
+    @pytest.mark.service
+    @requires_lua
+    def test_rate_limit_service(self):
+        rate_limiter = RateLimitService(rate=10, burst=1)
+        self.assertEqual(rate_limiter.take("client"), (True, 0))
+        self.assertEqual(rate_limiter.take("client"), (False, 1))
+        self.assertEqual(rate_limiter.take("other client"), (True, 0))
+        self.assertLessEqual(self.redis.ttl("rate_limit:client"), rate_limiter.ttl)
+
+    @pytest.mark.service
+    def test_rate_limit_fails_open(self):
+        rate_limiter = RateLimitService(rate=10, burst=1)
+        with patch.object(
+            rate_limiter, "script", side_effect=ConnectionError("redis down")
+        ):
+            self.assertEqual(rate_limiter.take("client"), (True, 0))
+        redis_circuit_breaker.record_success()
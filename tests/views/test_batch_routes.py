@@ -0,0 +1,129 @@
+import uuid
+from unittest.mock import patch
+
+import pytest
+from flask import url_for
+
+from app.core.metrics import metrics
+from app.core.repository import cache_version_key
+from app.models import ResourceModel
+from tests.base_test_case import BaseTestCase
+
+
+class TestBatchRoutes(BaseTestCase):
+    def operations(self):
+        resource_path = f"/api/v1/resource/{self.resource_model.id}"
+        return [
+            {
+                "method": "POST",
+                "path": "/api/v1/resource/",
+                "body": self.resource_test_data.create_resource,
+            },
+            {
+                "method": "PATCH",
+                "path": resource_path,
+                "body": self.resource_test_data.update_resource,
+            },
+            {"method": "GET", "path": resource_path},
+        ]
+
+    @pytest.mark.views
+    def test_run_batch(self):
+        self.redis.set(cache_version_key(ResourceModel), 1)
+        with self.client, patch("app.utils.auth.decode_token") as decode_token:
+            # the GET of the batch must not be answered from these entries
+            self.assert200(self.client.get(self.operations()[2]["path"]))
+            decode_token.return_value = self.decoded_token()
+            response = self.client.post(
+                url_for("batch.run_batch_operations"),
+                json={"operations": self.operations()},
+                headers=self.headers,
+            )
+            self.assert200(response)
+            self.assertEqual(decode_token.call_count, 1)
+        results = response.json["results"]
+        self.assertEqual([result["status"] for result in results], [201, 200, 200])
+        self.assertEqual(
+            results[2]["body"]["title"],
+            self.resource_test_data.update_resource["title"],
+        )
+        # the insert and the update are invalidated as each one commits
+        self.assertEqual(int(self.redis.get(cache_version_key(ResourceModel))), 3)
+        self.assertEqual(ResourceModel.query.count(), 2)
+
+    @pytest.mark.views
+    def test_rolled_back_batch_not_cached(self):
+        resource_path = f"/api/v1/resource/{self.resource_model.id}"
+        operations = [
+            {
+                "method": "PATCH",
+                "path": resource_path,
+                "body": {"title": "never committed"},
+            },
+            {"method": "GET", "path": resource_path},
+            {
+                "method": "PATCH",
+                "path": f"/api/v1/resource/{uuid.uuid4()}",
+                "body": self.resource_test_data.update_resource,
+            },
+        ]
+        with self.client:
+            response = self.client.post(
+                url_for("batch.run_batch_operations"),
+                json={"atomic": True, "operations": operations},
+                headers=self.headers,
+            )
+            statuses = [result["status"] for result in response.json["results"]]
+            self.assertEqual(statuses, [424, 424, 404])
+            response = self.client.get(resource_path)
+        self.assertEqual(
+            response.json["title"], self.resource_test_data.existing_resource["title"]
+        )
+        self.assertNotIn(
+            b"never committed",
+            self.redis.get(f"resource_{self.resource_model.id}") or b"",
+        )
+
+    @pytest.mark.views
+    def test_atomic_batch(self):
+        operations = self.operations()
+        operations.insert(1, {"method": "DELETE", "path": "/api/v1/batch/"})
+        rollbacks = metrics.counter("batch_rollbacks")
+        with self.client:
+            response = self.client.post(
+                url_for("batch.run_batch_operations"),
+                json={"atomic": True, "operations": operations},
+                headers=self.headers,
+            )
+        self.assert200(response)
+        statuses = [result["status"] for result in response.json["results"]]
+        self.assertEqual(statuses, [424, 405, 424, 424])
+        self.assertEqual(ResourceModel.query.count(), 1)
+        self.assertEqual(metrics.counter("batch_rollbacks"), rollbacks + 1)
+
+        # batches are not nested
+        operations[1] = {"method": "POST", "path": "/api/v1/batch/", "body": {}}
+        with self.client:
+            response = self.client.post(
+                url_for("batch.run_batch_operations"),
+                json={"operations": operations},
+                headers=self.headers,
+            )
+        statuses = [result["status"] for result in response.json["results"]]
+        self.assertEqual(statuses, [201, 400, 200, 200])
+        self.assertEqual(ResourceModel.query.count(), 2)
+
+    @pytest.mark.views
+    def test_invalid_batch(self):
+        with self.client:
+            response = self.client.post(
+                url_for("batch.run_batch_operations"),
+                json={"operations": self.operations()},
+            )
+            self.assert401(response)
+            response = self.client.post(
+                url_for("batch.run_batch_operations"),
+                json={"operations": [{"method": "PUT", "path": "/"}]},
+                headers=self.headers,
+            )
+            self.assert400(response)
@@ -0,0 +1,93 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.core.deadline import (
+    DEADLINE,
+    QUERY_CANCELED,
+    raise_deadline_exceeded,
+    set_statement_timeout,
+)
+from app.core.exceptions import AppException
+from app.core.metrics import metrics
+from tests.base_test_case import BaseTestCase
+
+
+class TestDeadlineRoutes(BaseTestCase):
+    @pytest.mark.views
+    def test_deadline_header(self):
+        path = f"/api/v1/resource/{self.resource_model.id}"
+        with self.client:
+            response = self.client.get(path, headers={"X-Request-Timeout": "5"})
+            self.assert200(response)
+
+            exceeded = metrics.counter("deadline_exceeded")
+            response = self.client.get(path, headers={"X-Request-Timeout": "0"})
+            self.assertStatus(response, 504)
+            self.assertEqual(response.json["app_exception"], "DeadlineExceeded")
+            self.assertEqual(metrics.counter("deadline_exceeded"), exceeded + 1)
+
+            response = self.client.get(path, headers={"X-Request-Timeout": "1e-9"})
+            self.assertStatus(response, 504)
+
+            response = self.client.get(path, headers={"X-Request-Timeout": "soon"})
+            self.assert400(response)
+
+    @pytest.mark.views
+    def test_statement_timeout(self):
+        connection = MagicMock()
+        connection.dialect.name = "postgresql"
+        with self.app.test_request_context(
+            environ_overrides={DEADLINE: time.monotonic() + 2}
+        ):
+            set_statement_timeout(None, None, connection)
+            statement = connection.exec_driver_sql.call_args.args[0]
+            self.assertTrue(statement.startswith("SET LOCAL statement_timeout = "))
+            self.assertTrue(1000 < int(statement.rpartition(" ")[2]) <= 2000)
+
+            context = MagicMock()
+            context.original_exception = Exception("canceling statement")
+            context.original_exception.pgcode = QUERY_CANCELED
+            with self.assertRaises(AppException.DeadlineExceeded):
+                raise_deadline_exceeded(context)
+
+        connection.reset_mock()
+        with self.app.test_request_context():
+            set_statement_timeout(None, None, connection)
+            raise_deadline_exceeded(context)
+        connection.exec_driver_sql.assert_not_called()
+
+        connection.dialect.name = "sqlite"
+        with self.app.test_request_context(
+            environ_overrides={DEADLINE: time.monotonic() + 2}
+        ):
+            set_statement_timeout(None, None, connection)
+        connection.exec_driver_sql.assert_not_called()
+
+    @pytest.mark.views
+    def test_committed_write_not_timed_out(self):
+        path = f"/api/v1/resource/{self.resource_model.id}"
+        with self.client:
+            self.assert200(self.client.get(path))
+
+            def slow_flush(session, flush_context):
+                time.sleep(0.25)
+
+            event.listen(db.session, "after_flush", slow_flush)
+            try:
+                response = self.client.patch(
+                    path,
+                    json=self.resource_test_data.update_resource,
+                    headers={**self.headers, "X-Request-Timeout": "0.2"},
+                )
+            finally:
+                event.remove(db.session, "after_flush", slow_flush)
+            self.assert200(response)
+            # the cache was invalidated although the deadline had passed
+            self.assertEqual(
+                self.client.get(path).json["title"],
+                self.resource_test_data.update_resource["title"],
+            )
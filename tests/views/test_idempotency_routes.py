@@ -0,0 +1,141 @@
+import datetime
+import uuid
+
+import pytest
+from flask import url_for
+from jwt import decode as jwt_decode
+
+from app.core.exceptions import AppException
+from app.core.idempotency import REPLAYED_HEADER, release_lock, wait_for_response
+from app.core.metrics import metrics
+from app.enums import TokenTypeEnum
+from app.models import ResourceModel
+from app.services import AuthService, RedisService
+from tests.base_test_case import BaseTestCase
+
+
+class TestIdempotencyRoutes(BaseTestCase):
+    def decoded_token(self, *args, **kwargs):
+        # keys are scoped to the user of the token, verify real ones
+        return jwt_decode(*args, **kwargs)
+
+    def auth_headers(self, user_id: str) -> dict:
+        token = AuthService().generate_token(
+            user_id,
+            TokenTypeEnum.access_token.value,
+            datetime.datetime.now(datetime.timezone.utc)
+            + datetime.timedelta(minutes=5),
+        )
+        return {"Authorization": f"Bearer {token}"}
+
+    @pytest.mark.views
+    def test_create_resource_replayed(self):
+        headers = {"Idempotency-Key": "create-1"}
+        replays = metrics.counter("idempotency_replays")
+        with self.client:
+            first = self.client.post(
+                url_for("resource.create_resource"),
+                json=self.resource_test_data.create_resource,
+                headers=headers,
+            )
+            self.assertStatus(first, 201)
+            self.assertNotIn(REPLAYED_HEADER, first.headers)
+
+            second = self.client.post(
+                url_for("resource.create_resource"),
+                json=self.resource_test_data.create_resource,
+                headers=headers,
+            )
+            self.assertStatus(second, 201)
+            self.assertEqual(second.headers[REPLAYED_HEADER], "true")
+            self.assertEqual(second.json, first.json)
+            self.assertEqual(ResourceModel.query.count(), 2)
+            self.assertEqual(metrics.counter("idempotency_replays"), replays + 1)
+            self.assertEqual(self.redis.keys("idempotency:*:lock"), [])
+
+            response = self.client.post(
+                url_for("resource.create_resource"),
+                json=self.resource_test_data.existing_resource,
+                headers=headers,
+            )
+            self.assert400(response)
+
+            response = self.client.post(
+                url_for("resource.create_resource"),
+                json=self.resource_test_data.existing_resource,
+                headers={"Idempotency-Key": "k" * 256},
+            )
+            self.assert400(response)
+
+    @pytest.mark.views
+    def test_keys_scoped_to_client(self):
+        # creating a resource needs no token, keys are scoped to the address
+        headers = {"Idempotency-Key": "create-1"}
+        with self.client:
+            for address in ("10.0.0.1", "10.0.0.2"):
+                response = self.client.post(
+                    url_for("resource.create_resource"),
+                    json=self.resource_test_data.create_resource,
+                    headers=headers,
+                    environ_base={"REMOTE_ADDR": address},
+                )
+                self.assertStatus(response, 201)
+                self.assertNotIn(REPLAYED_HEADER, response.headers)
+            self.assertEqual(ResourceModel.query.count(), 3)
+
+    @pytest.mark.views
+    def test_update_resource_replayed(self):
+        path = url_for("resource.update_resource", resource_id=self.resource_model.id)
+        headers = {
+            **self.auth_headers(str(uuid.uuid4())),
+            "Idempotency-Key": "update-1",
+        }
+        with self.client:
+            first = self.client.patch(
+                path, json=self.resource_test_data.update_resource, headers=headers
+            )
+            self.assert200(first)
+            second = self.client.patch(
+                path, json=self.resource_test_data.update_resource, headers=headers
+            )
+            self.assert200(second)
+            self.assertEqual(second.headers[REPLAYED_HEADER], "true")
+
+            # another user behind the same address reusing the key
+            other = self.client.patch(
+                path,
+                json=self.resource_test_data.update_resource,
+                headers={
+                    **self.auth_headers(str(uuid.uuid4())),
+                    "Idempotency-Key": "update-1",
+                },
+            )
+            self.assert200(other)
+            self.assertNotIn(REPLAYED_HEADER, other.headers)
+
+    @pytest.mark.views
+    def test_concurrent_duplicate(self):
+        redis_service = RedisService()
+        with self.app.test_request_context():
+            self.assertIsNone(
+                wait_for_response(redis_service, "idempotency:k", 0, owner="first")
+            )
+            # the lock outlives the request, not only the wait of a duplicate
+            self.assertGreater(
+                self.redis.ttl("idempotency:k:lock"),
+                self.app.config["GUNICORN_TIMEOUT"],
+            )
+            with self.assertRaises(AppException.Conflict):
+                wait_for_response(redis_service, "idempotency:k", 0, owner="second")
+
+            # a request only releases its own lock
+            release_lock(redis_service, "idempotency:k", "second")
+            self.assertEqual(self.redis.get("idempotency:k:lock"), b"first")
+            release_lock(redis_service, "idempotency:k", "first")
+            self.assertIsNone(self.redis.get("idempotency:k:lock"))
+
+            redis_service.set("idempotency:k", b"201 fingerprint application/json\n{}")
+            self.assertEqual(
+                wait_for_response(redis_service, "idempotency:k", 0, owner="third"),
+                b"201 fingerprint application/json\n{}",
+            )
@@ -1,9 +1,15 @@
+import gzip
+import time
 import uuid
+from unittest.mock import patch
 
 import pytest
-from flask import url_for
+from flask import jsonify, url_for
 
+from app.core.compression import no_compression
+from app.core.metrics import metrics
 from app.enums import TokenTypeEnum
+from app.utils.auth import verified_tokens
 from tests.base_test_case import BaseTestCase
 
 
@@ -109,3 +115,86 @@ class TestResourceRoutes(BaseTestCase):
             self.assert200(response)
             self.assertIsInstance(response_data, dict)
             self.assertTrue(response_data)
+
+    @pytest.mark.views
+    def test_compressed_responses(self):
+        self.app.config["COMPRESSION_MIN_SIZE"] = 0
+        self.app.add_url_rule(
+            "/uncompressed",
+            "uncompressed",
+            no_compression(lambda: jsonify(self.resource_test_data.create_resource)),
+        )
+        headers = {"Accept-Encoding": "gzip"}
+        with self.client:
+            response = self.client.get("/static/swagger.json", headers=headers)
+            self.assertEqual(response.headers["Content-Encoding"], "gzip")
+            self.assertIn(b"paths", gzip.decompress(response.data))
+            response = self.client.get("/uncompressed", headers=headers)
+            self.assertNotIn("Content-Encoding", response.headers)
+
+            hits = metrics.counter("response_cache_hits")
+            url = url_for("resource.get_all_resources", page=1, per_page=5)
+            first = self.client.get(url, headers=headers)
+            second = self.client.get(url, headers=headers)
+            self.assertEqual(second.headers["Content-Encoding"], "gzip")
+            self.assertEqual(set(second.vary), {"Accept", "Accept-Encoding"})
+            self.assertEqual(first.data, second.data)
+            self.assertEqual(metrics.counter("response_cache_hits"), hits + 1)
+            self.assertEqual(
+                self.client.get(url).json,
+                self.app.json.loads(gzip.decompress(first.data)),
+            )
+
+            self.client.post(
+                url_for("resource.create_resource"),
+                json=self.resource_test_data.create_resource,
+            )
+            response = self.client.get(url, headers=headers)
+            self.assertEqual(
+                len(self.app.json.loads(gzip.decompress(response.data))), 2
+            )
+
+    @pytest.mark.views
+    def test_streamed_resources(self):
+        self.resource_repository.create(self.resource_test_data.create_resource)
+        url = url_for("resource.get_all_resources", page=1, per_page=5)
+        with self.client:
+            response = self.client.get(url, headers={"Accept": "application/x-ndjson"})
+            self.assert200(response)
+            self.assertTrue(response.is_streamed)
+            self.assertEqual(response.mimetype, "application/x-ndjson")
+            self.assertIn("Accept", response.vary)
+            lines = response.data.splitlines()
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(
+                {self.app.json.loads(line)["id"] for line in lines},
+                {item["id"] for item in self.client.get(url).json},
+            )
+
+        with patch("app.api.api_v1.endpoints.resource_view.Config") as config:
+            config.STREAM_MIN_PAGE_SIZE = 2
+            config.STREAM_CHUNK_SIZE = 1
+            response = self.client.get(url)
+            self.assertTrue(response.is_streamed)
+            self.assertEqual(len(response.json), 2)
+
+    @pytest.mark.views
+    def test_revoke_token(self):
+        payload = {
+            "token_type": self.token_type,
+            "jti": uuid.uuid4().hex,
+            "exp": int(time.time()) + 60,
+        }
+        self.addCleanup(verified_tokens.clear)
+        with self.client, patch("app.utils.auth.jwt.decode", return_value=payload):
+            response = self.client.post(
+                url_for("resource.revoke_access_token"), headers=self.headers
+            )
+            self.assertStatus(response, 204)
+            response = self.client.patch(
+                url_for("resource.update_resource", resource_id=self.resource_model.id),
+                json=self.resource_test_data.update_resource,
+                headers=self.headers,
+            )
+            self.assert401(response)
+            self.assertEqual(response.json["errorMessage"], "token revoked")